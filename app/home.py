@@ -1,5 +1,9 @@
+import time
+_debut = time.perf_counter()
+
 import streamlit as st
 from PIL import Image
+from scripts.streamlit_cache import page_timer, timing_report
 st.set_page_config(page_title="Prédiction de Défaut de Prêt", page_icon=":bar_chart:", layout="wide")
 def main():
     # Titre de la page d'accueil
@@ -10,5 +14,14 @@ def main():
         Cette application permet de prédire la probabilité de défaut de prêt pour un client en fonction de ses caractéristiques.
         Utilisez les menus déroulants et les champs de saisie pour spécifier les informations du client et cliquez sur le bouton pour obtenir la prédiction.
     """)
+
+    # Temps d'import et de premier rendu des pages ouvertes depuis le démarrage du serveur
+    with st.expander("Temps de chargement des pages"):
+        rapport = timing_report()
+        if rapport:
+            st.table(rapport)
+        else:
+            st.write("Aucune page n'a encore été ouverte.")
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with page_timer('home', _debut):
+        main()
\ No newline at end of file
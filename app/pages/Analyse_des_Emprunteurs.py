@@ -1,19 +1,20 @@
-import os
+import time
+_debut = time.perf_counter()
+
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-from scripts.BorrowerCharacteristicsAnalyzer import BorrowerCharacteristicsAnalyzer
+from scripts.streamlit_cache import get_columns, page_timer
+
+# Colonnes à analyser
+colonnes_a_analyser = [
+    'NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY', 'CNT_CHILDREN',
+    'NAME_TYPE_SUITE', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS',
+    'NAME_HOUSING_TYPE', 'OCCUPATION_TYPE', 'CNT_FAM_MEMBERS', 'REGION_RATING_CLIENT'
+]
 
 def analyser_caracteristiques_emprunteurs(data):
     st.title("Analyse des Caractéristiques des Emprunteurs")
 
-    # Colonnes à analyser
-    colonnes_a_analyser = [
-        'NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY', 'CNT_CHILDREN',
-        'NAME_TYPE_SUITE', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS',
-        'NAME_HOUSING_TYPE', 'OCCUPATION_TYPE', 'CNT_FAM_MEMBERS', 'REGION_RATING_CLIENT'
-    ]
-
     # Sélection des colonnes à analyser
     colonnes_selectionnees = st.multiselect("Sélectionnez les colonnes pour l'analyse", colonnes_a_analyser)
 
@@ -21,8 +22,11 @@ def analyser_caracteristiques_emprunteurs(data):
         st.warning("Veuillez sélectionner au moins une colonne pour l'analyse.")
         return
 
-    # Initialisation de l'analyseur avec les données de prêt
-    analyseur = BorrowerCharacteristicsAnalyzer(data)
+    # Initialisation de l'analyseur avec les données de prêt et les agrégats pré-calculés
+    # (plotly et l'analyseur ne sont importés qu'une fois des colonnes sélectionnées)
+    from scripts.BorrowerCharacteristicsAnalyzer import BorrowerCharacteristicsAnalyzer
+    from scripts.dataset_store import load_target_cube
+    analyseur = BorrowerCharacteristicsAnalyzer(data, cube=load_target_cube())
 
     # Afficher les meilleures et pires caractéristiques des emprunteurs
     if st.button("Afficher les Meilleures et Pires Caractéristiques des Emprunteurs"):
@@ -48,13 +52,13 @@ def analyser_caracteristiques_emprunteurs(data):
 
 def main():
 
-    # Chargement des données de prêt
-    chemin_fichier_csv = os.path.join(os.getcwd(), 'data', 'application_train.csv')
-    donnees_emprunt = pd.read_csv(chemin_fichier_csv)
+    # Chargement des données de prêt (colonnes analysées uniquement)
+    donnees_emprunt = get_columns(colonnes_a_analyser + ['TARGET'])
 
     # Affichage de l'analyse des caractéristiques des emprunteurs
     analyser_caracteristiques_emprunteurs(donnees_emprunt)
 
 # Exécution de l'application Streamlit
 if __name__ == "__main__":
-    main()
+    with page_timer('Analyse_des_Emprunteurs', _debut):
+        main()
@@ -0,0 +1,85 @@
+import time
+_debut = time.perf_counter()
+
+import streamlit as st
+from scripts.streamlit_cache import get_segment_index, page_timer
+
+# Colonnes indexées : une bitmap par modalité, construite une fois par version du jeu de données
+colonnes_segments = [
+    'NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY', 'CNT_CHILDREN',
+    'NAME_TYPE_SUITE', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS',
+    'NAME_HOUSING_TYPE', 'OCCUPATION_TYPE', 'CNT_FAM_MEMBERS', 'REGION_RATING_CLIENT'
+]
+
+def choisir_filtres(index):
+    filtres = {}
+    colonnes_filtrees = st.multiselect('Filtres', index.columns)
+    for colonne in colonnes_filtrees:
+        valeurs = st.multiselect(f'Valeurs retenues pour {colonne}', list(index.categories[colonne]))
+        if valeurs:
+            filtres[colonne] = valeurs
+    return filtres
+
+def graphique_segments(segments, colonnes):
+    import plotly.express as px
+
+    donnees = segments.reset_index()
+    donnees['Taux de défaut (%)'] = donnees['default_rate'] * 100
+    for colonne in colonnes:
+        donnees[colonne] = donnees[colonne].astype(str)
+    if len(colonnes) == 1:
+        return px.bar(donnees, x=colonnes[0], y='Taux de défaut (%)', hover_data=['count'],
+                      title=f'Taux de défaut par {colonnes[0]}', color_discrete_sequence=['skyblue'])
+    if len(colonnes) == 2:
+        tableau = donnees.pivot(index=colonnes[0], columns=colonnes[1], values='Taux de défaut (%)')
+        return px.imshow(tableau, text_auto='.1f', aspect='auto', color_continuous_scale='RdYlGn_r',
+                         labels={'color': 'Taux de défaut (%)'},
+                         title=f'Taux de défaut par {colonnes[0]} et {colonnes[1]}')
+    return px.bar(donnees, x=colonnes[0], y='Taux de défaut (%)', color=colonnes[1], facet_col=colonnes[2],
+                  barmode='group', hover_data=['count'],
+                  title=f'Taux de défaut par {colonnes[0]}, {colonnes[1]} et {colonnes[2]}')
+
+def main():
+    st.title("Analyse des Segments")
+
+    index = get_segment_index(colonnes_segments)
+
+    colonnes = st.multiselect('Variables croisées (une à trois)', index.columns,
+                              default=['NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE'], max_selections=3)
+    filtres = choisir_filtres(index)
+    effectif_minimal = st.number_input('Effectif minimal par segment', min_value=1, value=30)
+
+    debut_requete = time.perf_counter()
+    total, defauts = index.count(filtres)
+    if not colonnes:
+        segments = None
+    else:
+        try:
+            segments = index.query(colonnes, filtres, min_count=int(effectif_minimal))
+        except ValueError as e:
+            st.error(f"Erreur lors du croisement : {str(e)}")
+            return
+    duree_requete = time.perf_counter() - debut_requete
+
+    col1, col2 = st.columns(2)
+    col1.metric('Clients sélectionnés', f'{total:,}'.replace(',', ' '))
+    col2.metric('Taux de défaut', f'{defauts / total * 100:.2f} %' if total else 'n/a')
+
+    if segments is None:
+        st.warning("Veuillez sélectionner au moins une variable à croiser.")
+        return
+    if segments.empty:
+        st.info("Aucun segment n'atteint l'effectif minimal.")
+        return
+
+    st.plotly_chart(graphique_segments(segments, colonnes))
+
+    st.subheader('Segments')
+    tableau = segments.rename(columns={'count': 'Effectif', 'defaults': 'Défauts', 'default_rate': 'Taux de défaut'})
+    st.dataframe(tableau.sort_values('Taux de défaut', ascending=False))
+    st.caption(f"{len(segments)} segments calculés en {duree_requete * 1000:.1f} ms "
+               f"sur {index.n_rows:,} lignes".replace(',', ' '))
+
+if __name__ == "__main__":
+    with page_timer('Analyse_des_segments', _debut):
+        main()
@@ -1,41 +1,39 @@
-import os
-import pandas as pd
+import time
+_debut = time.perf_counter()
+
 import streamlit as st
 import plotly.express as px
+from scripts.dataset_store import load_age_histogram
+from scripts.streamlit_cache import get_target_cube, page_timer
+
+def main():
+    # Graphiques construits à partir d'agrégats calculés une fois par version du jeu de données :
+    # seules les barres et les parts sont envoyées au navigateur, pas les clients un par un
+
+    # Titre principal
+    st.title("Analyse des Prêts Immobiliers")
+
+    # Affichage de la répartition des types de contrat de prêt (seules cette colonne et la cible sont lues)
+    contract_type_counts = get_target_cube(['NAME_CONTRACT_TYPE']).stats('NAME_CONTRACT_TYPE')['count']
+    fig_contract_type = px.pie(values=contract_type_counts.values,
+                               names=contract_type_counts.index,
+                               title="Répartition des Types de Contrat de Prêt")
+    st.plotly_chart(fig_contract_type)
+
+    histogramme_ages = load_age_histogram()
+
+    # Histogramme pour l'âge des clients capables
+    st.subheader("Répartition d'âge des clients capables")
+    fig_capable_clients_age = histogramme_ages.plot(0, title="Âge des Clients Capables à la Demande de Prêt",
+                                                    color='green')
+    st.plotly_chart(fig_capable_clients_age)
+
+    # Histogramme pour l'âge des clients non capables
+    st.subheader("Répartition d'âge des clients non capables")
+    fig_not_capable_clients_age = histogramme_ages.plot(1, title="Âge des Clients Non Capables à la Demande de Prêt",
+                                                        color='red')
+    st.plotly_chart(fig_not_capable_clients_age)
 
-# Chargement des données
-csv_file_path = os.path.join(os.getcwd(), 'data', 'application_train.csv')
-loan_data = pd.read_csv(csv_file_path)
-
-# Titre principal
-st.title("Analyse des Prêts Immobiliers")
-
-# Affichage de la répartition des types de contrat de prêt
-contract_type_counts = loan_data['NAME_CONTRACT_TYPE'].value_counts()
-fig_contract_type = px.pie(values=contract_type_counts.values,
-                           names=contract_type_counts.index,
-                           title="Répartition des Types de Contrat de Prêt")
-st.plotly_chart(fig_contract_type)
-
-
-# Histogramme pour l'âge des clients capables
-st.subheader("Répartition d'âge des clients capables")
-capable_days_birth = loan_data[loan_data['TARGET'] == 0]['DAYS_BIRTH'] / 365
-fig_capable_clients_age = px.histogram(x=capable_days_birth,
-                                       nbins=10,
-                                       title="Âge des Clients Capables à la Demande de Prêt",
-                                       labels={'x': 'Âge (années)', 'y': 'Nombre de Clients'},
-                                       color_discrete_sequence=['green'])
-fig_capable_clients_age.update_traces(hovertemplate="Âge: %{x}<br>Nombre de Clients: %{y}")
-st.plotly_chart(fig_capable_clients_age)
-
-# Histogramme pour l'âge des clients non capables
-st.subheader("Répartition d'âge des clients non capables")
-not_capable_days_birth = loan_data[loan_data['TARGET'] == 1]['DAYS_BIRTH'] / 365
-fig_not_capable_clients_age = px.histogram(x=not_capable_days_birth,
-                                           nbins=10,
-                                           title="Âge des Clients Non Capables à la Demande de Prêt",
-                                           labels={'x': 'Âge (années)', 'y': 'Nombre de Clients'},
-                                           color_discrete_sequence=['red'])
-fig_not_capable_clients_age.update_traces(hovertemplate="Âge: %{x}<br>Nombre de Clients: %{y}")
-st.plotly_chart(fig_not_capable_clients_age)
+if __name__ == "__main__":
+    with page_timer('Analyse_globale_des_prets', _debut):
+        main()
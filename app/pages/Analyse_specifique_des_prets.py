@@ -1,27 +1,30 @@
-import pandas as pd
+import time
+_debut = time.perf_counter()
+
 import streamlit as st
-import plotly.express as px
-from scripts.LoanApprovalAnalyzer import LoanApprovalAnalyzer  # Adjust import based on your package structure
+from scripts.dataset_store import dataset_columns, load_target_cube
+from scripts.streamlit_cache import get_columns, page_timer
 
-@st.cache
-def load_loan_data():
-    csv_file_path = "data/application_train.csv"
-    return pd.read_csv(csv_file_path)
+def load_loan_data(column):
+    # Only the selected column and the target, shared by every session
+    return get_columns(list(dict.fromkeys([column, 'TARGET'])))
 
 def main():
     st.title("Loan Approval Analysis")
 
-    # Load loan data
-    loan_data = load_loan_data()
-
     # Select loan column for analysis
-    selected_loan_column = st.selectbox("Select a variable for loan approval analysis", loan_data.columns)
+    selected_loan_column = st.selectbox("Select a variable for loan approval analysis", dataset_columns())
 
     # Display loan approval statistics
     if st.button("Show Loan Approval Statistics"):
         try:
-            # Initialize LoanApprovalAnalyzer with loan data
-            analyzer = LoanApprovalAnalyzer(loan_data)
+            # Load loan data
+            loan_data = load_loan_data(selected_loan_column)
+
+            # Initialize LoanApprovalAnalyzer with loan data and the precomputed aggregates
+            # (imported here: plotly is only needed once a chart is requested)
+            from scripts.LoanApprovalAnalyzer import LoanApprovalAnalyzer
+            analyzer = LoanApprovalAnalyzer(loan_data, cube=load_target_cube())
 
             # Plot and display loan approval statistics
             fig_loan_approval_stats = analyzer.plot_loan_approval_stats(column=selected_loan_column)
@@ -33,4 +36,5 @@ def main():
             st.error(f"An error occurred: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    with page_timer('Analyse_specifique_des_prets', _debut):
+        main()
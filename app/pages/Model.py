@@ -1,40 +1,111 @@
-import os
-import pandas as pd
+import time
+_debut = time.perf_counter()
+
 import numpy as np
 import streamlit as st
-import joblib
+from scripts.streamlit_cache import (get_artifacts, get_artifacts_state, get_global_importance, get_prediction_cache,
+                                     page_timer)
+from scripts.tracing import traced
+from scripts.what_if import SWEEP_FEATURES
+
+# Le modèle et le prétraitement (lightgbm, sklearn) ne sont chargés qu'à la première prédiction,
+# une seule fois par processus
+MODEL_DIR = 'model'
+
+# Correspondance entre les libellés du formulaire et les valeurs du jeu d'entraînement
+LIBELLES = {
+    'NAME_CONTRACT_TYPE': {'Prêts personnels': 'Cash loans', 'Crédits renouvelables': 'Revolving loans'},
+    'CODE_GENDER': {'Homme': 'M', 'Femme': 'F'},
+    'FLAG_OWN_CAR': {'Oui': 'Y', 'Non': 'N'},
+    'FLAG_OWN_REALTY': {'Oui': 'Y', 'Non': 'N'},
+    'NAME_INCOME_TYPE': {'Travailleur': 'Working', 'Retraité': 'Pensioner', 'Fonctionnaire': 'State servant',
+                         'Associé commercial': 'Commercial associate', 'Sans emploi': 'Unemployed'},
+    'NAME_EDUCATION_TYPE': {'Secondaire / spécial secondaire': 'Secondary / secondary special',
+                            'Enseignement supérieur': 'Higher education',
+                            'Enseignement incomplet supérieur': 'Incomplete higher',
+                            'Secondaire inférieur': 'Lower secondary',
+                            'Diplôme universitaire': 'Academic degree'},
+}
 
-# Chargement du modèle pré-entraîné, du scaler et des noms de colonnes
-model = joblib.load('model/lgb_model.pkl')
-scaler = joblib.load('model/scaler.pkl')
-with open('model/column_names.pkl', 'rb') as f:
-    column_names = joblib.load(f)
+# Valeur de DAYS_EMPLOYED du jeu d'entraînement pour les demandeurs sans emploi salarié ; le
+# transformer du modèle la remplace par une valeur manquante et un indicateur, comme à l'entraînement
+JOURS_SANS_EMPLOI_SALARIE = 365243
+TYPES_SANS_EMPLOI_SALARIE = ['Retraité', 'Sans emploi']
+
+# Variables pouvant varier dans l'analyse de sensibilité (clés de what_if.SWEEP_FEATURES, qui
+# donne aussi leurs bornes)
+VARIABLES_SIMULATION = {'Montant du Crédit': 'AMT_CREDIT', 'Revenu': 'AMT_INCOME_TOTAL',
+                        'Prix du Bien': 'AMT_GOODS_PRICE', 'Âge': 'AGE'}
+
+def traduire_libelles(data):
+    # Libellés du formulaire -> valeurs du jeu d'entraînement
+    return {col: LIBELLES.get(col, {}).get(value, value) for col, value in data.items()}
 
 # Fonction pour prétraiter les données utilisateur
-def preprocess_input(data):
-    # Assurer la présence de toutes les colonnes attendues dans les données utilisateur
-    for col in column_names:
-        if col not in data.columns:
-            # Si une colonne est manquante, l'ajouter avec une valeur par défaut (par exemple, NaN)
-            data[col] = np.nan
-    
-    # Encodage des caractéristiques catégorielles
-    data_encode = data.copy()
-    categorical_cols = ['NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY',
-                         'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE']
-
-    for col in categorical_cols:
-        # Utilisation de l'encodage label pour les colonnes catégorielles binaires
-        if data_encode[col].dtype == 'object':
-            data_encode[col] = data_encode[col].astype('category').cat.codes
-    
-    # Remplissage des valeurs manquantes avec la moyenne (utilisation de la moyenne des données d'entraînement)
-    data_encode = data_encode.fillna(data_encode.mean())
+@traced('Model.preprocess_input')
+def preprocess_input(data, transformer):
+    # Traduction des libellés puis encodage direct en matrice float32 (vocabulaires, moyennes
+    # d'entraînement et mise à l'échelle sauvegardés avec le modèle)
+    return transformer.transform(traduire_libelles(data))
+
+def afficher_explication(etat_modele, donnees_pretraitees, nombre_raisons=5):
+    from scripts.explanations import explain, top_reasons
+    import plotly.express as px
+
+    _, (model, transformer) = etat_modele
+    contributions = explain(model, donnees_pretraitees, transformer.column_names).iloc[0]
+    raisons = top_reasons(contributions, nombre_raisons).iloc[::-1]
+
+    st.subheader('Principales raisons de la prédiction')
+    fig = px.bar(x=raisons.values, y=raisons.index, orientation='h',
+                 color=raisons.values > 0, color_discrete_map={True: 'red', False: 'green'},
+                 labels={'x': 'Contribution (log-odds, positive = vers le défaut)', 'y': 'Variable'})
+    fig.update_layout(showlegend=False)
+    st.plotly_chart(fig)
+
+    with st.expander('Importance globale des variables'):
+        importance = get_global_importance(MODEL_DIR, state=etat_modele)
+        st.bar_chart(importance.rename('Contribution absolue moyenne'))
+
+def analyse_sensibilite(donnees_utilisateur):
+    # Toute la grille est construite comme une seule matrice et scorée en un seul appel au modèle
+    st.subheader('Analyse de sensibilité')
+    libelles = st.multiselect('Variables à faire varier (une ou deux)', list(VARIABLES_SIMULATION),
+                              max_selections=2)
+    if not libelles:
+        return
 
-    # Mise à l'échelle des caractéristiques à l'aide du scaler pré-chargé
-    data_scaled = scaler.transform(data_encode[column_names])
+    grilles = {}
+    for libelle in libelles:
+        variable = VARIABLES_SIMULATION[libelle]
+        minimum, maximum, pas = SWEEP_FEATURES[variable][2]
+        debut, fin = st.slider(f'Plage de {libelle}', min_value=minimum, max_value=maximum,
+                               value=(minimum, maximum), step=pas)
+        points = st.number_input(f'Nombre de points pour {libelle}', min_value=2, max_value=5000,
+                                 value=500 if len(libelles) == 1 else 60)
+        grilles[variable] = np.linspace(debut, fin, int(points))
 
-    return data_scaled
+    if st.button('Lancer la simulation'):
+        from scripts.what_if import sweep
+        import plotly.express as px
+
+        model, transformer = get_artifacts(MODEL_DIR)
+        probabilites, temps = sweep(model, transformer, traduire_libelles(donnees_utilisateur), grilles)
+
+        if len(libelles) == 1:
+            fig = px.line(x=grilles[VARIABLES_SIMULATION[libelles[0]]], y=probabilites,
+                          labels={'x': libelles[0], 'y': 'Probabilité de Défaut'},
+                          title=f'Probabilité de Défaut selon {libelles[0]}')
+        else:
+            valeurs_x = grilles[VARIABLES_SIMULATION[libelles[1]]]
+            valeurs_y = grilles[VARIABLES_SIMULATION[libelles[0]]]
+            fig = px.imshow(probabilites, x=valeurs_x, y=valeurs_y, origin='lower', aspect='auto',
+                            color_continuous_scale='RdYlGn_r',
+                            labels={'x': libelles[1], 'y': libelles[0], 'color': 'Probabilité de Défaut'},
+                            title=f'Probabilité de Défaut selon {libelles[0]} et {libelles[1]}')
+        st.plotly_chart(fig)
+        st.caption(f"{temps['points']} points : grille construite en {temps['grid_s'] * 1000:.1f} ms, "
+                   f"scorée en {temps['score_s'] * 1000:.1f} ms")
 
 # Application Streamlit
 def main():
@@ -48,42 +119,71 @@ def main():
     type_revenu = st.selectbox('Type de Revenu', ['Travailleur', 'Retraité', 'Fonctionnaire', 'Associé commercial', 'Sans emploi'])
     education = st.selectbox('Niveau d\'Éducation', ['Secondaire / spécial secondaire', 'Enseignement supérieur', 'Enseignement incomplet supérieur', 'Secondaire inférieur', 'Diplôme universitaire'])
     age = st.slider('Âge', min_value=18, max_value=100, value=30)
+    if type_revenu in TYPES_SANS_EMPLOI_SALARIE:
+        anciennete = None
+    else:
+        anciennete = st.slider('Ancienneté dans l\'Emploi (années)', min_value=0, max_value=50, value=5)
+    enfants = st.number_input('Nombre d\'Enfants', min_value=0, max_value=20, value=0)
+    membres_famille = st.number_input('Nombre de Membres de la Famille', min_value=1, max_value=20, value=2)
     revenu = st.number_input('Revenu', min_value=0, value=50000)
     montant_credit = st.number_input('Montant du Crédit', min_value=0, value=100000)
+    annuite = st.number_input('Annuité du Prêt', min_value=0, value=10000)
     prix_bien = st.number_input('Prix du Bien', min_value=0, value=100000)
+    # Scores d'organismes externes, entre 0 et 1 ; laissés vides, ils sont remplacés par la moyenne d'entraînement
+    with st.expander('Scores externes (facultatifs)'):
+        scores_externes = [st.number_input(f'Score Externe {numero}', min_value=0.0, max_value=1.0, value=None,
+                                           step=0.01) for numero in (1, 2, 3)]
     
-    # Création du DataFrame à partir des saisies utilisateur
-    donnees_utilisateur = pd.DataFrame({
-        'NAME_CONTRACT_TYPE': [type_contrat],
-        'CODE_GENDER': [genre],
-        'FLAG_OWN_CAR': [possede_voiture],
-        'FLAG_OWN_REALTY': [possede_immobilier],
-        'NAME_INCOME_TYPE': [type_revenu],
-        'NAME_EDUCATION_TYPE': [education],
-        'DAYS_BIRTH': [-age * 365],  # Conversion de l'âge au format DAYS_BIRTH
-        'AMT_INCOME_TOTAL': [revenu],
-        'AMT_CREDIT': [montant_credit],
-        'AMT_GOODS_PRICE': [prix_bien]
-    })
+    # Création de l'enregistrement à partir des saisies utilisateur
+    donnees_utilisateur = {
+        'NAME_CONTRACT_TYPE': type_contrat,
+        'CODE_GENDER': genre,
+        'FLAG_OWN_CAR': possede_voiture,
+        'FLAG_OWN_REALTY': possede_immobilier,
+        'NAME_INCOME_TYPE': type_revenu,
+        'NAME_EDUCATION_TYPE': education,
+        'DAYS_BIRTH': -age * 365,  # Conversion de l'âge au format DAYS_BIRTH
+        'DAYS_EMPLOYED': JOURS_SANS_EMPLOI_SALARIE if anciennete is None else -anciennete * 365,
+        'CNT_CHILDREN': enfants,
+        'CNT_FAM_MEMBERS': membres_famille,
+        'AMT_INCOME_TOTAL': revenu,
+        'AMT_CREDIT': montant_credit,
+        'AMT_ANNUITY': annuite,
+        'AMT_GOODS_PRICE': prix_bien,
+        'EXT_SOURCE_1': scores_externes[0],
+        'EXT_SOURCE_2': scores_externes[1],
+        'EXT_SOURCE_3': scores_externes[2],
+    }
 
     # Bouton de prédiction
     if st.button('Prédire le Défaut de Prêt'):
+        # Un seul modèle pour tout le clic : encodage, prédiction, seuil et explication ne mélangent
+        # pas deux versions si le modèle servi change pendant le calcul
+        etat_modele = get_artifacts_state(MODEL_DIR)
+        version, (model, transformer) = etat_modele
+
         # Prétraitement des données utilisateur
-        donnees_utilisateur_pretraitees = preprocess_input(donnees_utilisateur)
+        donnees_utilisateur_pretraitees = preprocess_input(donnees_utilisateur, transformer)
 
-        # Prédiction
-        prediction = model.predict_proba(donnees_utilisateur_pretraitees)[:, 1]
+        # Prédiction (profils déjà évalués servis par le cache partagé)
+        from scripts.scoring import model_default_proba
+        cache = get_prediction_cache(MODEL_DIR)
+        prediction = cache.predict(donnees_utilisateur_pretraitees,
+                                   lambda features: model_default_proba(model, features), version=version)
 
-        # Affichage du résultat de prédiction
+        # Affichage du résultat de prédiction : probabilité calibrée comparée au seuil de coût minimal
+        # choisi à l'entraînement (0,5 pour un modèle sans calibration)
+        from scripts.calibration import decision_threshold
+        seuil = decision_threshold(model)
         st.subheader('Prédiction')
-        if prediction > 0.5:
-            st.write('Ce client est susceptible de rembourser le prêt.')
-        else:
+        if prediction[0] >= seuil:
             st.write('Ce client est susceptible de faire défaut.')
-
+        else:
+            st.write('Ce client est susceptible de rembourser le prêt.')
 
         # Affichage des détails
         st.write('Probabilité de Défaut:', prediction[0])
+        st.write(f"Seuil de décision: {seuil:.3f}")
         st.write(f"Type de Contrat: {type_contrat}")
         st.write(f"Genre: {genre}")
         st.write(f"Possède une Voiture: {possede_voiture}")
@@ -91,9 +191,25 @@ def main():
         st.write(f"Type de Revenu: {type_revenu}")
         st.write(f"Niveau d'Éducation: {education}")
         st.write(f"Âge: {age}")
+        st.write(f"Ancienneté dans l'Emploi: {'sans emploi salarié' if anciennete is None else anciennete}")
+        st.write(f"Nombre d'Enfants: {enfants}")
+        st.write(f"Nombre de Membres de la Famille: {membres_famille}")
         st.write(f"Revenu: {revenu}")
         st.write(f"Montant du Crédit: {montant_credit}")
+        st.write(f"Annuité du Prêt: {annuite}")
         st.write(f"Prix du Bien: {prix_bien}")
+        for numero, score in enumerate(scores_externes, start=1):
+            st.write(f"Score Externe {numero}: {'non renseigné' if score is None else score}")
+
+        # Explication de la décision : contributions TreeSHAP regroupées par variable d'origine
+        afficher_explication(etat_modele, donnees_utilisateur_pretraitees)
+
+        statistiques = cache.stats()
+        st.caption(f"Cache de prédictions : {statistiques['hits']} réponses en cache, "
+                   f"{statistiques['misses']} calculées, {statistiques['size']} profils conservés")
+
+    analyse_sensibilite(donnees_utilisateur)
 
 if __name__ == '__main__':
-    main()
+    with page_timer('Model', _debut):
+        main()
@@ -0,0 +1,101 @@
+import time
+_debut = time.perf_counter()
+
+import streamlit as st
+from scripts.streamlit_cache import get_artifacts, get_partitions_profile, get_reference_profile, page_timer
+
+MODEL_DIR = 'model'
+TAILLE_BLOC = 50_000
+
+STATUTS = {'stable': 'Stable', 'moderate': 'Dérive modérée', 'significant': 'Dérive forte', 'n/a': 'n/a'}
+COULEURS_STATUTS = {'Stable': 'green', 'Dérive modérée': 'orange', 'Dérive forte': 'red', 'n/a': 'grey'}
+
+def profil_fichier(reference, fichier):
+    # Lecture par blocs : seuls les comptages par classe sont conservés entre deux blocs
+    import pandas as pd
+    from scripts.drift_monitoring import profile_chunks
+
+    model, transformer = get_artifacts(MODEL_DIR)
+    colonnes = set(reference.features)
+    blocs = pd.read_csv(fichier, usecols=lambda nom: nom in colonnes, chunksize=TAILLE_BLOC)
+    return profile_chunks(reference, blocs, model, transformer)
+
+def graphique_distributions(reference, courant, titre):
+    import plotly.graph_objects as go
+
+    parts_reference = reference / max(reference.sum(), 1)
+    parts_courantes = courant.reindex(reference.index.union(courant.index, sort=False), fill_value=0)
+    parts_courantes = parts_courantes / max(parts_courantes.sum(), 1)
+    fig = go.Figure([go.Bar(x=parts_reference.index, y=parts_reference.values, name='Entraînement'),
+                     go.Bar(x=parts_courantes.index, y=parts_courantes.values, name='Nouvelles demandes')])
+    fig.update_layout(title=titre, barmode='group', yaxis_title='Part des lignes')
+    return fig
+
+def main():
+    from scripts.dataset_store import DEFAULT_STORE_PATH, is_partition_store, partitioned_dataset
+    from scripts.drift_monitoring import SCORE_COLUMN, compare
+
+    st.title("Surveillance du modèle")
+
+    reference = get_reference_profile(MODEL_DIR)
+    if reference is None:
+        st.warning("Le modèle n'a pas de profil de référence (reference_profile.json) : "
+                   "réentraînez-le avec my_credit_risk_model pour activer la surveillance.")
+        return
+
+    sources = ['Fichier de demandes']
+    if is_partition_store(DEFAULT_STORE_PATH):
+        sources.insert(0, 'Partitions ingérées')
+    source = st.radio('Données surveillées', sources, horizontal=True)
+
+    if source == 'Partitions ingérées':
+        partitions = partitioned_dataset(DEFAULT_STORE_PATH).partitions
+        premiere = st.number_input('Première partition surveillée', min_value=0, max_value=len(partitions) - 1,
+                                   value=len(partitions) - 1)
+        st.caption(f"{len(partitions) - premiere} partition(s) : "
+                   f"{', '.join(entry['name'] for entry in partitions[premiere:])}")
+        with st.spinner('Profil des partitions...'):
+            courant = get_partitions_profile(int(premiere), MODEL_DIR, DEFAULT_STORE_PATH)
+    else:
+        fichier = st.file_uploader('Fichier CSV de nouvelles demandes', type=['csv'])
+        if fichier is None:
+            return
+        with st.spinner('Profil du fichier...'):
+            courant = profil_fichier(reference, fichier)
+
+    if not courant.n_rows:
+        st.info('Aucune ligne à surveiller.')
+        return
+
+    rapport = compare(reference, courant)
+    rapport['status'] = rapport['status'].map(STATUTS)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric('Demandes surveillées', f'{courant.n_rows:,}'.replace(',', ' '))
+    col2.metric('Probabilité de défaut moyenne', f'{courant.mean_score:.3f}',
+                delta=f'{courant.mean_score - reference.mean_score:+.3f}', delta_color='inverse')
+    col3.metric('Variables en dérive forte', int((rapport['status'] == 'Dérive forte').sum()))
+
+    st.subheader('Indicateurs de dérive par variable')
+    st.dataframe(rapport.rename(columns={'psi': 'PSI', 'ks': 'KS', 'missing_reference': 'Manquants (entraînement)',
+                                         'missing_current': 'Manquants (nouvelles demandes)', 'status': 'Statut'}))
+
+    import plotly.express as px
+    fig_psi = px.bar(rapport.reset_index(), x='feature', y='psi', color='status',
+                     color_discrete_map=COULEURS_STATUTS,
+                     labels={'feature': 'Variable', 'psi': 'PSI', 'status': 'Statut'},
+                     title='Indice de stabilité (PSI) par variable')
+    st.plotly_chart(fig_psi)
+
+    variable = st.selectbox('Distribution à comparer', list(rapport.index))
+    if variable == SCORE_COLUMN:
+        fig = graphique_distributions(reference.score_distribution(), courant.score_distribution(),
+                                      'Distribution des probabilités de défaut')
+    else:
+        fig = graphique_distributions(reference.distribution(variable), courant.distribution(variable),
+                                      f'Distribution de {variable}')
+    st.plotly_chart(fig)
+
+if __name__ == "__main__":
+    with page_timer('Surveillance_du_modele', _debut):
+        main()
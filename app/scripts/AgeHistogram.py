@@ -0,0 +1,76 @@
+import numpy as np
+
+from .FeatureTransformer import convert_age
+
+# Bornes fixes (en années) : deux histogrammes construits sur des lots différents s'additionnent
+AGE_BIN_EDGES = np.arange(20, 75, 5, dtype=np.float64)
+
+
+class AgeHistogram:
+    """
+    Number of clients per age bin, for repaid (TARGET = 0) and defaulted (TARGET = 1) loans.
+
+    Counts are computed server-side with a single np.bincount, so a chart only carries one bar
+    per bin instead of every client. Ages outside the edges go to the first or last bin.
+    """
+
+    def __init__(self, edges=AGE_BIN_EDGES):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros((2, len(self.edges) - 1), dtype=np.int64)
+
+    @classmethod
+    def build(cls, data, edges=AGE_BIN_EDGES, days_column='DAYS_BIRTH', target_column='TARGET'):
+        """
+        Count the clients of a DataFrame per age bin and target value.
+
+        Parameters:
+        - data (pd.DataFrame): Loan data with the DAYS_BIRTH and TARGET columns.
+        - edges (array-like): Bin edges in years.
+
+        Returns:
+        - AgeHistogram: The histogram.
+        """
+        histogram = cls(edges)
+        histogram.update(data[days_column].to_numpy(), data[target_column].to_numpy())
+        return histogram
+
+    def update(self, days_birth, target):
+        """Add clients to the counts (days_birth in negative days, target in {0, 1})."""
+        ages = convert_age(np.asarray(days_birth, dtype=np.float64))
+        target = np.asarray(target, dtype=np.float64)
+        valid = ~np.isnan(ages) & ((target == 0) | (target == 1))
+        n_bins = self.counts.shape[1]
+        bins = np.clip(np.searchsorted(self.edges, ages[valid], side='right') - 1, 0, n_bins - 1)
+        cells = target[valid].astype(np.int64) * n_bins + bins
+        self.counts += np.bincount(cells, minlength=2 * n_bins).reshape(2, n_bins)
+
+    def merge(self, other):
+        """Add the counts of a histogram built with the same edges."""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bin edges cannot be merged.")
+        self.counts += other.counts
+        return self
+
+    def bin_labels(self):
+        return [f'{low:.0f}-{high:.0f}' for low, high in zip(self.edges[:-1], self.edges[1:])]
+
+    def plot(self, target_value, title, color):
+        """
+        Plot the age distribution of the clients with the given target value.
+
+        Parameters:
+        - target_value (int): 0 for repaid loans, 1 for defaults.
+        - title (str): Chart title.
+        - color (str): Bar color.
+
+        Returns:
+        - go.Figure: Plotly bar chart object (one bar per bin).
+        """
+        # Import local : dataset_store construit les histogrammes sans dépendre de plotly.
+        # go.Bar directement : les barres sont déjà agrégées, plotly.express n'apporterait que son coût
+        import plotly.graph_objects as go
+
+        fig = go.Figure(go.Bar(x=self.bin_labels(), y=self.counts[target_value], marker_color=color,
+                               hovertemplate="Âge: %{x}<br>Nombre de Clients: %{y}<extra></extra>"))
+        fig.update_layout(title=title, xaxis_title='Âge (années)', yaxis_title='Nombre de Clients', bargap=0)
+        return fig
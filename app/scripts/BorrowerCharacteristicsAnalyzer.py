@@ -1,25 +1,43 @@
 import pandas as pd
 import plotly.express as px
 
+from .TargetCube import TargetCube
+from .dataset_schema import is_categorical_column
+from .tracing import traced
+
 class BorrowerCharacteristicsAnalyzer:
-    def __init__(self, data):
+    def __init__(self, data, cube=None):
         if not isinstance(data, pd.DataFrame):
             raise TypeError("Input data must be a pandas DataFrame.")
         self.data = data
+        # Shared aggregates of the full dataset (read only) and private aggregates of data
+        # (TargetCube), each column is aggregated once
+        self.shared_cube = cube
+        self.cube = None
+
+    def _target_cube(self, column, target_column):
+        if self.shared_cube is not None and self.shared_cube.covers(self.data, column, target_column):
+            return self.shared_cube
+        # Other rows or column: aggregated from data, the shared cube is never modified
+        if self.cube is None or self.cube.target_column != target_column:
+            self.cube = TargetCube(target_column)
+        return self.cube
 
+    @traced
     def calculate_default_rate(self, column, target_column='TARGET'):
         if column not in self.data.columns:
             raise ValueError(f"Column '{column}' not found in the DataFrame.")
 
         # Calculate default rate (% of defaults) for each unique value in the column
-        default_rates = self.data.groupby(column)[target_column].mean() * 100
+        default_rates = self._target_cube(column, target_column).mean(column, self.data) * 100
         return default_rates
 
+    @traced
     def identify_best_borrower_characteristics(self, columns_to_analyze, target_column='TARGET'):
         best_characteristics = {}
 
         for column in columns_to_analyze:
-            if self.data[column].dtype == 'object':
+            if is_categorical_column(self.data[column]):
                 non_default_rates = 100 - self.calculate_default_rate(column, target_column)
                 best_category = non_default_rates.idxmax()
                 best_repayment_rate = non_default_rates.max()
@@ -27,11 +45,12 @@ class BorrowerCharacteristicsAnalyzer:
 
         return best_characteristics
 
+    @traced
     def identify_worst_borrower_characteristics(self, columns_to_analyze, target_column='TARGET'):
         worst_characteristics = {}
 
         for column in columns_to_analyze:
-            if self.data[column].dtype == 'object':
+            if is_categorical_column(self.data[column]):
                 default_rates = self.calculate_default_rate(column, target_column)
                 worst_category = default_rates.idxmax()
                 worst_default_rate = default_rates.max()
@@ -39,8 +58,9 @@ class BorrowerCharacteristicsAnalyzer:
 
         return worst_characteristics
 
+    @traced
     def plot_default_rates(self, column, target_column='TARGET'):
-        if self.data[column].dtype != 'object':
+        if not is_categorical_column(self.data[column]):
             raise ValueError(f"Column '{column}' must be of type 'object' (categorical) for plotting.")
 
         default_rates = self.calculate_default_rate(column, target_column)
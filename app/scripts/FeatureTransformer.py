@@ -0,0 +1,366 @@
+import numpy as np
+import pandas as pd
+
+from .feature_definitions import add_features, compute_features, dependencies, derived_columns, input_columns
+
+# Colonnes encodées par label (classes triées, comme LabelEncoder) et par one-hot (comme pd.get_dummies)
+BINARY_COLUMNS = ['NAME_CONTRACT_TYPE', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY']
+ONE_HOT_COLUMNS = ['CODE_GENDER', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE']
+AGE_COLUMNS = ['DAYS_BIRTH', 'DAYS_EMPLOYED']
+
+# Classes vues à l'entraînement du modèle livré, utilisées quand aucun transformer n'a été sauvegardé
+DEFAULT_BINARY_CATEGORIES = {
+    'NAME_CONTRACT_TYPE': ['Cash loans', 'Revolving loans'],
+    'FLAG_OWN_CAR': ['N', 'Y'],
+    'FLAG_OWN_REALTY': ['N', 'Y'],
+}
+
+
+def convert_age(age_days_negative):
+    """Convert a (negative) number of days into years; works on scalars and arrays."""
+    age_days_positive = -age_days_negative
+    age_years = age_days_positive / 365
+    return age_years
+
+
+def _column_values(data, name):
+    # Accepte un DataFrame, un dict de tableaux ou un pyarrow.RecordBatch
+    if hasattr(data, 'schema') and hasattr(data, 'column') and not isinstance(data, pd.DataFrame):
+        if name not in data.schema.names:
+            return None
+        return data.column(name).to_numpy(zero_copy_only=False)
+    if name not in data:
+        return None
+    return np.asarray(data[name])
+
+
+def _to_float(values):
+    if values.dtype.kind in 'fiub':
+        return values.astype(np.float32, copy=False)
+    return pd.to_numeric(values, errors='coerce').astype(np.float32)
+
+
+def _record_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FeatureTransformer:
+    """
+    Fitted preprocessing of raw application features into the model matrix.
+
+    Holds the category vocabularies, the one-hot layout, the training means used to fill
+    missing values and the min-max scaling, so that serving does not depend on the
+    content of the request. A transformer fitted with feature definitions (see
+    feature_definitions) also cleans the sentinel values and computes the derived columns
+    of every request; those of older models have none.
+    """
+
+    def __init__(self, raw_features, binary_categories, one_hot_categories, means=None,
+                 scale=None, offset=None, definitions=None):
+        self.raw_features = list(raw_features)
+        self.binary_categories = {column: list(values) for column, values in binary_categories.items()}
+        self.one_hot_categories = {column: list(values) for column, values in one_hot_categories.items()}
+        self.definitions = definitions
+        self.derived_features = [column for column in derived_columns(definitions or {})
+                                 if column not in self.raw_features]
+        # Variables encodées : brutes (lues dans la requête) puis dérivées
+        self.features = self.raw_features + self.derived_features
+
+        # Disposition des colonnes : features (hors one-hot) puis blocs one-hot, comme preprocess_data
+        self.column_names = [column for column in self.features if column not in self.one_hot_categories]
+        for column, categories in self.one_hot_categories.items():
+            self.column_names += [f'{column}_{category}' for category in categories]
+
+        n_features = len(self.column_names)
+        self.means = (np.full(n_features, np.nan, dtype=np.float32) if means is None
+                      else np.asarray(means, dtype=np.float32))
+        self.scale = (np.ones(n_features, dtype=np.float32) if scale is None
+                      else np.asarray(scale, dtype=np.float32))
+        self.offset = (np.zeros(n_features, dtype=np.float32) if offset is None
+                       else np.asarray(offset, dtype=np.float32))
+        self._compile()
+
+    def _compile(self):
+        index = {name: j for j, name in enumerate(self.column_names)}
+        # Pour chaque feature brute : (type, position ou table de correspondance)
+        self._plan = []
+        for column in self.features:
+            if column in self.one_hot_categories:
+                lookup = {category: index[f'{column}_{category}'] for category in self.one_hot_categories[column]}
+                self._plan.append((column, 'one_hot', lookup))
+            elif column in self.binary_categories:
+                lookup = {category: code for code, category in enumerate(self.binary_categories[column])}
+                self._plan.append((column, 'binary', (index[column], lookup)))
+            elif column in AGE_COLUMNS:
+                self._plan.append((column, 'age', index[column]))
+            else:
+                self._plan.append((column, 'numeric', index[column]))
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_plan', None)
+        return state
+
+    @classmethod
+    def fit(cls, data, raw_features=None, definitions=None):
+        """
+        Learn vocabularies, one-hot layout and training means from raw training rows.
+
+        Parameters:
+        - data (pd.DataFrame): Raw training rows (DAYS_* still in negative days).
+        - raw_features (list or None): Feature columns, all columns of data except TARGET if None.
+        - definitions (dict or None): Feature definitions (sentinels and derived columns), none if None.
+
+        Returns:
+        - FeatureTransformer: Fitted transformer (without scaling, see set_scaler).
+        """
+        return cls.fit_chunks([data], raw_features, definitions)
+
+    @classmethod
+    def fit_chunks(cls, chunks, raw_features=None, definitions=None):
+        """
+        Fit the transformer in a single pass over an iterable of DataFrame chunks.
+
+        Only category counts and per-column sums are kept between chunks, so the memory
+        used does not depend on the number of rows.
+
+        Parameters:
+        - chunks (iterable of pd.DataFrame): Raw training rows, with or without the derived
+          columns (feature_chunks already adds them).
+        - raw_features (list or None): Feature columns, all columns of the first chunk except TARGET if None.
+        - definitions (dict or None): Feature definitions (sentinels and derived columns), none if None.
+
+        Returns:
+        - FeatureTransformer: Fitted transformer (without scaling, see set_scaler).
+        """
+        derived = derived_columns(definitions or {})
+        category_counts = {}
+        sums, counts = {}, {}
+        n_rows = 0
+        for chunk in chunks:
+            if raw_features is None:
+                raw_features = [column for column in chunk.columns if column != 'TARGET' and column not in derived]
+            if definitions:
+                chunk = add_features(chunk, definitions)
+            n_rows += len(chunk)
+            for column in raw_features + [column for column in derived if column not in raw_features]:
+                if column in BINARY_COLUMNS or column in ONE_HOT_COLUMNS:
+                    chunk_counts = chunk[column].value_counts()
+                    totals = category_counts.setdefault(column, {})
+                    for category, count in chunk_counts.items():
+                        totals[category] = totals.get(category, 0) + int(count)
+                else:
+                    values = _to_float(np.asarray(chunk[column]))
+                    if column in AGE_COLUMNS:
+                        values = convert_age(values)
+                    sums[column] = sums.get(column, 0.0) + float(np.nansum(values, dtype=np.float64))
+                    counts[column] = counts.get(column, 0) + int(np.count_nonzero(~np.isnan(values)))
+
+        binary_categories = {column: sorted(category_counts.get(column, {}))
+                             for column in BINARY_COLUMNS if column in raw_features}
+        one_hot_categories = {column: sorted(category_counts.get(column, {}))
+                              for column in ONE_HOT_COLUMNS if column in raw_features}
+        transformer = cls(raw_features, binary_categories, one_hot_categories, definitions=definitions)
+
+        # Moyennes d'entraînement dans l'espace encodé (codes binaires, fréquences one-hot)
+        means = np.full(len(transformer.column_names), np.nan)
+        for column, kind, target in transformer._plan:
+            if kind == 'one_hot':
+                for category, j in target.items():
+                    means[j] = category_counts[column][category] / n_rows if n_rows else np.nan
+            elif kind == 'binary':
+                totals = category_counts.get(column, {})
+                observed = sum(totals.values())
+                if observed:
+                    means[target[0]] = sum(code * totals[category] for category, code in target[1].items()) / observed
+            elif counts.get(column):
+                means[target] = sums[column] / counts[column]
+        transformer.means = means.astype(np.float32)
+        return transformer
+
+    def to_dict(self):
+        """Return the fitted state as plain Python/NumPy objects (pickles without this class)."""
+        return {'raw_features': self.raw_features, 'binary_categories': self.binary_categories,
+                'one_hot_categories': self.one_hot_categories, 'means': self.means,
+                'scale': self.scale, 'offset': self.offset, 'definitions': self.definitions}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+    @classmethod
+    def from_artifacts(cls, column_names, scaler=None):
+        """
+        Rebuild a transformer from column_names.pkl and scaler.pkl of an older model.
+
+        Training means were not saved with those models, so missing values stay NaN and are
+        routed by LightGBM like in the previous preprocessing.
+        """
+        one_hot_categories = {}
+        raw_features = []
+        for name in column_names:
+            prefix = next((column for column in ONE_HOT_COLUMNS if name.startswith(f'{column}_')), None)
+            if prefix is None:
+                raw_features.append(name)
+            else:
+                if prefix not in one_hot_categories:
+                    one_hot_categories[prefix] = []
+                    raw_features.append(prefix)
+                one_hot_categories[prefix].append(name[len(prefix) + 1:])
+        binary_categories = {column: DEFAULT_BINARY_CATEGORIES[column]
+                             for column in BINARY_COLUMNS if column in raw_features}
+        transformer = cls(raw_features, binary_categories, one_hot_categories)
+        if list(column_names) != transformer.column_names:
+            raise ValueError("column_names does not follow the preprocess_data layout.")
+        if scaler is not None:
+            transformer.set_scaler(scaler)
+        return transformer
+
+    def set_scaler(self, scaler):
+        """Fold a fitted MinMaxScaler into the transformer (x * scale_ + min_)."""
+        self.scale = np.asarray(scaler.scale_, dtype=np.float32)
+        self.offset = np.asarray(scaler.min_, dtype=np.float32)
+
+    def add_features(self, data):
+        """Return raw rows (DataFrame) with the sentinels cleaned and the derived columns of the model added."""
+        return add_features(data, self.definitions) if self.definitions else data
+
+    def derived_from(self, record, columns):
+        """
+        Recompute the derived columns of one applicant whose raw columns take several values.
+
+        Parameters:
+        - record (dict): Raw applicant.
+        - columns (dict): Raw column -> 1-D array of values replacing the one of the record.
+
+        Returns:
+        - dict: Every computed column (derived or cleaned raw column) depending on the varied
+          columns -> float32 array, to encode with transform_column.
+        """
+        if not self.definitions:
+            return {}
+        n_rows = len(next(iter(columns.values())))
+        values = {column: columns[column] if column in columns else np.full(n_rows, _record_float(record.get(column)))
+                  for column in input_columns(self.definitions)}
+        varied = {name for name, inputs in dependencies(self.definitions).items() if set(inputs) & set(columns)}
+        return {name: computed for name, computed in compute_features(values, self.definitions).items()
+                if name in varied}
+
+    def transform_column(self, column, values, scale=True):
+        """
+        Encode the values of one numeric raw feature (DAYS_* converted to years), vectorized.
+
+        Parameters:
+        - column (str): Numeric raw feature.
+        - values (array-like): Raw values.
+        - scale (bool): Apply the folded min-max scaling.
+
+        Returns:
+        - tuple: (position in column_names, float32 encoded values)
+        """
+        kind, j = next(((kind, target) for name, kind, target in self._plan if name == column), (None, None))
+        if kind not in ('numeric', 'age'):
+            raise ValueError(f"Column '{column}' is not a numeric feature of the model.")
+        encoded = _to_float(np.asarray(values))
+        if kind == 'age':
+            encoded = convert_age(encoded)
+        if scale:
+            encoded = encoded * self.scale[j] + self.offset[j]
+        return j, encoded.astype(np.float32, copy=False)
+
+    def transform(self, data, scale=True, fill_missing=True):
+        """
+        Turn raw applicant data into a float32 feature matrix in column_names order.
+
+        Parameters:
+        - data (dict, list of dict, pd.DataFrame, dict of arrays or pyarrow.RecordBatch):
+          One applicant (dict of scalars), a list of applicants or a batch of columns. Derived
+          columns are computed from the raw ones; a batch of columns that already holds them
+          (chunk of the feature cache) is used as is.
+        - scale (bool): Apply the folded min-max scaling.
+        - fill_missing (bool): Replace missing values with the training means.
+
+        Returns:
+        - np.ndarray: Matrix of shape (n_rows, len(column_names)).
+        """
+        if isinstance(data, dict) and not any(np.ndim(value) for value in data.values()):
+            matrix = self._transform_records([data])
+        elif isinstance(data, (list, tuple)):
+            matrix = self._transform_records(data)
+        else:
+            matrix = self._transform_columns(data)
+
+        if fill_missing:
+            missing = np.isnan(matrix)
+            if missing.any():
+                matrix[missing] = np.take(self.means, np.nonzero(missing)[1])
+        if scale:
+            matrix *= self.scale
+            matrix += self.offset
+        return matrix
+
+    def _transform_records(self, records):
+        matrix = np.full((len(records), len(self.column_names)), np.nan, dtype=np.float32)
+        computed = {}
+        if self.definitions:
+            # Variables dérivées calculées pour toutes les demandes à la fois
+            computed = compute_features({column: np.array([_record_float(record.get(column)) for record in records])
+                                         for column in input_columns(self.definitions)}, self.definitions)
+        for i, record in enumerate(records):
+            row = matrix[i]
+            for column, kind, target in self._plan:
+                value = computed[column][i] if column in computed else record.get(column)
+                if kind == 'one_hot':
+                    # Catégorie absente ou inconnue : toutes les colonnes du bloc à 0
+                    for j in target.values():
+                        row[j] = 0.0
+                    j = target.get(value)
+                    if j is not None:
+                        row[j] = 1.0
+                elif value is None:
+                    continue
+                elif kind == 'binary':
+                    code = target[1].get(value)
+                    if code is not None:
+                        row[target[0]] = code
+                else:
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                    row[target] = convert_age(value) if kind == 'age' else value
+        return matrix
+
+    def _transform_columns(self, data):
+        values = {column: _column_values(data, column) for column in self.features}
+        n_rows = next((len(column) for column in values.values() if column is not None), 0)
+        if self.definitions:
+            values.update(compute_features(values, self.definitions))
+        matrix = np.full((n_rows, len(self.column_names)), np.nan, dtype=np.float32)
+        for column, kind, target in self._plan:
+            column_values = values[column]
+            if kind == 'one_hot':
+                for j in target.values():
+                    matrix[:, j] = 0.0
+                if column_values is None:
+                    continue
+                codes = pd.Categorical(column_values, categories=list(target)).codes
+                rows = np.nonzero(codes >= 0)[0]
+                matrix[rows, np.asarray(list(target.values()))[codes[rows]]] = 1.0
+            elif column_values is None:
+                continue
+            elif kind == 'binary':
+                codes = pd.Categorical(column_values, categories=list(target[1])).codes
+                matrix[:, target[0]] = np.where(codes >= 0, codes, np.nan)
+            elif kind == 'age':
+                matrix[:, target] = convert_age(_to_float(column_values))
+            else:
+                matrix[:, target] = _to_float(column_values)
+        return matrix
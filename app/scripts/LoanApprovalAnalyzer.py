@@ -1,21 +1,37 @@
 import pandas as pd
 import plotly.express as px
 
+from .TargetCube import TargetCube
+from .tracing import traced
+
 class LoanApprovalAnalyzer:
-    def __init__(self, loan_data):
+    def __init__(self, loan_data, cube=None):
         """
         Initialize LoanApprovalAnalyzer with loan data.
 
         Parameters:
         - loan_data (pd.DataFrame): DataFrame containing loan data.
+        - cube (TargetCube or None): Precomputed default-rate aggregates of the full dataset,
+          shared and read only; used for the columns it covers when loan_data holds all its rows.
         """
         self.loan_data = loan_data
+        self.shared_cube = cube
+        self.cube = None
         self.columns_to_analyze = [
             'NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY', 'CNT_CHILDREN',
             'NAME_TYPE_SUITE', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS',
             'NAME_HOUSING_TYPE', 'OCCUPATION_TYPE', 'CNT_FAM_MEMBERS', 'REGION_RATING_CLIENT'
         ]
 
+    def _target_cube(self, column, target_column):
+        if self.shared_cube is not None and self.shared_cube.covers(self.loan_data, column, target_column):
+            return self.shared_cube
+        # Other rows or column: aggregated from loan_data, the shared cube is never modified
+        if self.cube is None or self.cube.target_column != target_column:
+            self.cube = TargetCube(target_column)
+        return self.cube
+
+    @traced
     def plot_loan_approval_stats(self, column, target_column='TARGET', top_n=10):
         """
         Plot loan approval statistics for a specific column using Plotly.
@@ -31,8 +47,8 @@ class LoanApprovalAnalyzer:
         if column not in self.loan_data.columns:
             raise ValueError(f"Column '{column}' not found in the dataset.")
 
-        # Calculate loan approval statistics by grouping data
-        default_rates = self.loan_data.groupby(column)[target_column].mean() * 100
+        # Calculate loan approval statistics from the aggregate cube
+        default_rates = self._target_cube(column, target_column).mean(column, self.loan_data) * 100
         default_rates = default_rates.sort_values(ascending=False).head(top_n)
 
         # Create a Plotly bar chart for loan approval statistics
@@ -43,6 +59,7 @@ class LoanApprovalAnalyzer:
 
         return fig
 
+    @traced
     def plot_loan_repayment_pie(self) -> px.pie:
         """
         Plot a pie chart showing loan repayment status using Plotly.
@@ -50,11 +67,14 @@ class LoanApprovalAnalyzer:
         Returns:
         - px.pie: Plotly pie chart object.
         """
-        # Calculate loan repayment counts
-        repayment_counts = self.loan_data['TARGET'].value_counts()
+        # Loan repayment counts from the aggregate cube; labels follow the TARGET value
+        # (0 = repaid, 1 = default) instead of the frequency order of value_counts
+        stats = self._target_cube('TARGET', 'TARGET').stats('TARGET', self.loan_data)
+        repayment_labels = {0: 'Will Repay', 1: 'Will Not Repay'}
+        names = [repayment_labels.get(int(value), str(value)) for value in stats.index]
 
         # Create a Plotly pie chart for loan repayment status
-        fig = px.pie(values=repayment_counts, names=['Will Repay', 'Will Not Repay'],
+        fig = px.pie(values=stats['count'].to_numpy(), names=names,
                      labels={'label': 'Loan Repayment Status'}, title='Loan Repayment Status')
 
         return fig
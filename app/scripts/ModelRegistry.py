@@ -0,0 +1,276 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+ACTIVE_FILE = 'ACTIVE'
+VERSIONS_DIR = 'versions'
+METADATA_FILE = 'metadata.json'
+# Rapport écrit par my_credit_risk_model : AUC, paramètres et durée des étapes
+TRAINING_REPORT_FILE = 'training_report.json'
+# Modèle texte de fast_inference, dont l'échelle du transformer est intégrée
+NATIVE_MODEL_FILE = 'lgb_model.txt'
+
+
+def active_version(registry_dir):
+    """Return the name of the active version of a registry, None if the directory is not a registry."""
+    try:
+        with open(os.path.join(registry_dir, ACTIVE_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_model_dir(model_dir):
+    """
+    Return the directory holding the artifacts to load.
+
+    A registry resolves to the bundle of its active version; any other directory is a plain
+    model directory and is returned unchanged.
+    """
+    version = active_version(model_dir)
+    return os.path.join(model_dir, VERSIONS_DIR, version) if version else model_dir
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the BLAKE2b digest of a file, read by chunks (training CSVs may not fit in memory)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Local file-based registry of versioned model bundles.
+
+    Layout of the registry directory:
+    - versions/<version>/: the artifacts of one trained model (lgb_model.pkl, scaler.pkl,
+      column_names.pkl, feature_transformer.pkl, reference_profile.json, the native
+      lgb_model.txt of fast_inference...) and metadata.json
+      (features, AUC, hash of the training data, stage timings). A bundle is never modified
+      once registered.
+    - ACTIVE: name of the version served by the app, the prediction server and the batch jobs.
+
+    Registering copies the bundle into a temporary directory renamed into versions/ in one
+    step; activating replaces ACTIVE with os.replace. A reader sees either the previous or the
+    new version, never a partial one, so running processes can switch models without a restart.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, version):
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def versions(self):
+        """Return the registered version names, oldest first."""
+        try:
+            names = os.listdir(os.path.join(self.root, VERSIONS_DIR))
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if not name.startswith('.'))
+
+    @property
+    def active(self):
+        return active_version(self.root)
+
+    def metadata(self, version):
+        """Return the metadata of a version."""
+        with open(os.path.join(self.path(version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def register(self, source_dir, metadata=None, activate=False):
+        """
+        Copy the artifacts of a model directory into a new version of the registry.
+
+        Parameters:
+        - source_dir (str): Directory written by my_credit_risk_model (or hyperparameter_search).
+        - metadata (dict or None): Extra metadata, e.g. {'data_path': ..., 'data_hash': ...}.
+        - activate (bool): Make the new version the active one.
+
+        Returns:
+        - str: Name of the new version.
+        """
+        files = sorted(name for name in os.listdir(source_dir)
+                       if os.path.isfile(os.path.join(source_dir, name)) and name != METADATA_FILE)
+        if 'lgb_model.pkl' not in files:
+            raise FileNotFoundError(f"No lgb_model.pkl in '{source_dir}'.")
+
+        info = {}
+        if TRAINING_REPORT_FILE in files:
+            with open(os.path.join(source_dir, TRAINING_REPORT_FILE)) as f:
+                info.update(json.load(f))
+        info.update(metadata or {})
+
+        versions_dir = os.path.join(self.root, VERSIONS_DIR)
+        os.makedirs(versions_dir, exist_ok=True)
+        tmp_dir = os.path.join(versions_dir, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            for name in files:
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(tmp_dir, name))
+            if NATIVE_MODEL_FILE not in files:
+                # Modèle natif exporté dès l'enregistrement : le bundle n'est plus jamais modifié
+                from .fast_inference import export_native_model
+                export_native_model(tmp_dir)
+                files.append(NATIVE_MODEL_FILE)
+            info['features'] = info.get('features') or self._features(tmp_dir)
+            info['files'] = {name: {'bytes': os.path.getsize(os.path.join(tmp_dir, name)),
+                                    'blake2b': file_hash(os.path.join(tmp_dir, name))} for name in files}
+            info['created_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+            info['source_dir'] = os.path.abspath(source_dir)
+
+            # Numéro suivant ; deux enregistrements simultanés ne peuvent pas prendre le même nom
+            while True:
+                existing = [int(name[1:]) for name in self.versions() if name[:1] == 'v' and name[1:].isdigit()]
+                version = f'v{max(existing, default=0) + 1:04d}'
+                info['version'] = version
+                with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                    json.dump(info, f, indent=2)
+                try:
+                    os.rename(tmp_dir, self.path(version))
+                    break
+                except OSError:
+                    if not os.path.isdir(self.path(version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    @staticmethod
+    def _features(bundle_dir):
+        # Variables brutes attendues par le transformer du bundle
+        from .scoring import load_transformer
+        return list(load_transformer(bundle_dir).raw_features)
+
+    def activate(self, version):
+        """Make a registered version the active one (atomic replacement of the ACTIVE file)."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown version '{version}', registered: {', '.join(self.versions()) or 'none'}.")
+        path = os.path.join(self.root, ACTIVE_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """Return one dict per version: name, active flag, creation date, test AUC and number of rows."""
+        active = self.active
+        rows = []
+        for version in self.versions():
+            try:
+                metadata = self.metadata(version)
+            except FileNotFoundError:
+                metadata = {}
+            rows.append({'version': version, 'active': version == active,
+                         'created_at': metadata.get('created_at'), 'auc_test': metadata.get('auc_test'),
+                         'n_rows': metadata.get('n_rows'), 'data_hash': metadata.get('data_hash')})
+        return rows
+
+
+class ActiveModel:
+    """
+    Model of a model directory or registry, swapped in the background when the active version changes.
+
+    get() checks the artifact version at most every check_interval seconds. The first model is
+    loaded synchronously; later versions are loaded and warmed up by a background thread while
+    the previous model keeps serving, then swapped in with a single assignment. Requests never
+    wait for a model load after startup.
+
+    Parameters:
+    - model_dir (str): Plain model directory or registry.
+    - loader (callable or None): Function loading a resolved model directory,
+      scoring.load_artifacts if None (e.g. fast_inference.load_fast_predictor).
+    - warmup (callable or None): Called with the loaded model before it is swapped in.
+    - check_interval (float): Minimum time between two checks of the artifact files.
+    """
+
+    def __init__(self, model_dir, loader=None, warmup=None, check_interval=1.0):
+        from .scoring import load_artifacts
+        self.model_dir = model_dir
+        self.loader = loader or load_artifacts
+        self.warmup = warmup
+        self.check_interval = check_interval
+        # (version, model) : une seule référence, lue et remplacée atomiquement
+        self._state = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self._checked_at = float('-inf')
+        self.swaps = 0
+        self.last_error = None
+
+    def _load(self):
+        from .scoring import artifact_version
+        bundle_dir = resolve_model_dir(self.model_dir)
+        version = artifact_version(bundle_dir)
+        model = self.loader(bundle_dir)
+        if self.warmup is not None:
+            self.warmup(model)
+        return version, model
+
+    def _swap_in_background(self):
+        try:
+            state = self._load()
+            if self._state is None or state[0] != self._state[0]:
+                self._state = state
+                self.swaps += 1
+            self.last_error = None
+        except Exception as e:
+            # Bundle incomplet ou illisible : l'ancien modèle continue de servir
+            self.last_error = repr(e)
+        finally:
+            self._loading = False
+
+    def _check(self):
+        from .scoring import artifact_version
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if artifact_version(resolve_model_dir(self.model_dir)) == self._state[0]:
+            return
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._swap_in_background, name='model-swap', daemon=True).start()
+
+    @property
+    def loaded(self):
+        return self._state is not None
+
+    def state(self):
+        """Return (version, model) of the model currently served."""
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._state = self._load()
+                    self._checked_at = time.monotonic()
+        else:
+            self._check()
+        return self._state
+
+    def get(self):
+        """Return the model currently served."""
+        return self.state()[1]
+
+    @property
+    def version(self):
+        return self.state()[0]
+
+    @property
+    def version_name(self):
+        """Name of the served bundle (registry version, or the plain model directory)."""
+        return os.path.basename(self.state()[0][0])
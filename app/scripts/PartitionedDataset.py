@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .AgeHistogram import AgeHistogram
+from .TargetCube import TargetCube
+
+MANIFEST_FILE = 'manifest.json'
+CACHE_DIR_NAME = '.cache'
+
+
+def is_partition_store(path):
+    """Return True if path is a partition store directory (it holds a manifest)."""
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(store_dir):
+    """Return the manifest of a partition store (empty manifest if the store does not exist yet)."""
+    try:
+        with open(os.path.join(store_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'partitions': [], 'watermark_column': None, 'watermark': None}
+
+
+class PartitionedDataset:
+    """
+    Reader of an append-only store of Arrow partitions listed by a manifest (see ingestion).
+
+    Partitions are memory-mapped once; refresh() only opens the partitions appended since the
+    previous call. The target cube and the age histogram are updated with the rows of those
+    new partitions instead of being recomputed over the whole history.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.partitions = []
+        self.watermark = None
+        self._tables = []
+        self._manifest_mtime = None
+        self._cubes = {}
+        self._histogram = None
+        self._lock = threading.RLock()
+
+    def refresh(self):
+        """
+        Open the partitions added to the manifest since the last call.
+
+        Returns:
+        - int: Number of new partitions.
+        """
+        with self._lock:
+            manifest_path = os.path.join(self.store_dir, MANIFEST_FILE)
+            mtime = os.stat(manifest_path).st_mtime_ns
+            if mtime == self._manifest_mtime:
+                return 0
+            manifest = read_manifest(self.store_dir)
+            new_partitions = manifest['partitions'][len(self.partitions):]
+            for entry in new_partitions:
+                path = os.path.join(self.store_dir, entry['name'])
+                self._tables.append(ipc.open_file(pa.memory_map(path, 'r')).read_all())
+            self.partitions += new_partitions
+            self.watermark = manifest.get('watermark')
+            self._manifest_mtime = mtime
+            return len(new_partitions)
+
+    @property
+    def version(self):
+        """Hashable token of the loaded state: it changes with every appended partition."""
+        return (os.path.abspath(self.store_dir), len(self.partitions), self.watermark)
+
+    @property
+    def column_names(self):
+        return self._tables[0].column_names if self._tables else []
+
+    def table(self, first_partition=0, stop_partition=None):
+        """Return the partitions from first_partition to stop_partition (excluded) as one table (no copy)."""
+        tables = self._tables[first_partition:stop_partition]
+        if not tables:
+            raise ValueError(f"No partition to read in '{self.store_dir}'.")
+        return pa.concat_tables(tables)
+
+    def load_columns(self, columns=None, first_partition=0, stop_partition=None):
+        """
+        Load a projection of the partitions from first_partition on as a pandas DataFrame.
+
+        Parameters:
+        - columns (list or None): Columns to load, all columns if None.
+        - first_partition (int): Index of the first partition read.
+        - stop_partition (int or None): Index of the first partition not read, up to the last one if None.
+
+        Returns:
+        - pd.DataFrame: DataFrame with the requested columns.
+        """
+        table = self.table(first_partition, stop_partition)
+        if columns is not None:
+            missing = [column for column in columns if column not in table.column_names]
+            if missing:
+                raise ValueError(f"Columns {missing} not found in the dataset.")
+            table = table.select(list(columns))
+        return table.to_pandas(split_blocks=True, self_destruct=False)
+
+    def new_rows(self, since, columns=None):
+        """
+        Return the rows of the partitions appended after the first `since` ones.
+
+        Returns:
+        - tuple: (pd.DataFrame or None, number of partitions read so far)
+        """
+        self.refresh()
+        if since >= len(self.partitions):
+            return None, len(self.partitions)
+        return self.load_columns(columns, first_partition=since), len(self.partitions)
+
+    def _cube_path(self, target_column):
+        return os.path.join(self.store_dir, CACHE_DIR_NAME, f'{target_column}.cube.pkl')
+
+    def _saved_cube(self, target_column):
+        # Cube sauvegardé pour les k premières partitions : réutilisable tant que ces partitions n'ont pas changé
+        cube, names = TargetCube.read(self._cube_path(target_column))
+        names = names or ()
+        current = tuple(entry['name'] for entry in self.partitions)
+        if cube is None or current[:len(names)] != tuple(names):
+            return None, 0
+        return cube, len(names)
+
+    def target_cube(self, target_column='TARGET'):
+        """
+        Return the aggregate cube of the target, updated with the partitions not aggregated yet.
+
+        Returns:
+        - TargetCube: Counts, sums and means of the target per category.
+        """
+        with self._lock:
+            self.refresh()
+            cube, aggregated = self._cubes.get(target_column, (None, 0))
+            if cube is None:
+                cube, aggregated = self._saved_cube(target_column)
+            if cube is None:
+                cube, aggregated = TargetCube(target_column), len(self.partitions)
+                cube.n_rows = sum(entry['rows'] for entry in self.partitions)
+                # Une colonne à la fois : seules deux colonnes sont matérialisées simultanément
+                for column in self.column_names:
+                    if column != target_column:
+                        part = self.load_columns([column, target_column])
+                        cube.groups.update(TargetCube.build(part, target_column=target_column).groups)
+            elif aggregated < len(self.partitions):
+                cube.update(self.load_columns(list(cube.groups) + [target_column], first_partition=aggregated))
+                aggregated = len(self.partitions)
+            else:
+                # À jour (en mémoire ou sur disque) : gardé en mémoire pour ne plus relire le fichier
+                self._cubes[target_column] = (cube, aggregated)
+                return cube
+
+            os.makedirs(os.path.dirname(self._cube_path(target_column)), exist_ok=True)
+            cube.save(self._cube_path(target_column), tuple(entry['name'] for entry in self.partitions))
+            self._cubes[target_column] = (cube, aggregated)
+            return cube
+
+    def age_histogram(self):
+        """Return the age histogram per target value, updated with the new partitions only."""
+        with self._lock:
+            self.refresh()
+            histogram, aggregated = self._histogram or (AgeHistogram(), 0)
+            if aggregated < len(self.partitions):
+                new_rows = self.load_columns(['DAYS_BIRTH', 'TARGET'], first_partition=aggregated)
+                histogram.update(new_rows['DAYS_BIRTH'].to_numpy(), new_rows['TARGET'].to_numpy())
+            self._histogram = (histogram, len(self.partitions))
+            return histogram
@@ -0,0 +1,139 @@
+import collections
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+from .scoring import MODEL_DIR, artifact_version
+
+
+class PredictionCache:
+    """
+    Bounded LRU/TTL cache of default probabilities keyed on the transformed feature vector.
+
+    The key is a BLAKE2b hash of the float32 model row (labels already mapped, categories
+    encoded, missing values filled), keyed by the version of the model artifacts. When
+    lgb_model.pkl, scaler.pkl or the transformer file is replaced, the cache is emptied.
+
+    Parameters:
+    - max_size (int): Maximum number of cached rows, least recently used rows are evicted first.
+    - ttl (float or None): Lifetime of an entry in seconds, no expiry if None.
+    - model_dir (str): Directory holding the model artifacts whose version is watched.
+    - decimals (int or None): Round the features before hashing so that near-identical
+      profiles share an entry; exact match if None.
+    - version_check_interval (float): Minimum time between two checks of the artifact files.
+    - version_source (callable or None): Returns the version of the model actually scoring
+      (e.g. ActiveModel.version while a new registry version loads in the background);
+      artifact_version(model_dir) if None.
+    """
+
+    def __init__(self, max_size=10_000, ttl=None, model_dir=MODEL_DIR, decimals=None, version_check_interval=1.0,
+                 version_source=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.model_dir = model_dir
+        self.decimals = decimals
+        self.version_check_interval = version_check_interval
+        self.version_source = version_source or (lambda: artifact_version(self.model_dir))
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_key = b''
+        self._checked_at = float('-inf')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _refresh_version(self, version=None):
+        now = time.monotonic()
+        if version is None:
+            if now - self._checked_at < self.version_check_interval:
+                return self._version_key
+            self._checked_at = now
+            version = self.version_source()
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            # Nouveau modèle : les probabilités en cache ne sont plus valables
+            self._entries.clear()
+            self._version = version
+            self._version_key = hashlib.blake2b(repr(version).encode(), digest_size=16).digest()
+        return self._version_key
+
+    def _keys(self, features, version_key):
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if self.decimals is not None:
+            features = np.round(features, self.decimals)
+        # + 0.0 : -0.0 et 0.0 donnent la même clé
+        features = features + np.float32(0.0)
+        return [hashlib.blake2b(row, digest_size=16, key=version_key).digest() for row in features]
+
+    def predict(self, features, predict, version=None):
+        """
+        Return the probabilities of a feature matrix, scoring only the rows not in the cache.
+
+        Parameters:
+        - features (np.ndarray): Transformed matrix (FeatureTransformer.transform or FastPredictor.features).
+        - predict (callable): Function scoring a matrix, e.g. lambda X: model_default_proba(model, X).
+        - version (object or None): Version of the model behind predict (get_artifacts_state);
+          version_source() if None.
+
+        Returns:
+        - np.ndarray: Probabilities of default, one per row.
+        """
+        features = np.atleast_2d(features)
+        probabilities = np.empty(len(features), dtype=np.float64)
+        with self._lock:
+            version_key = self._refresh_version(version)
+            keys = self._keys(features, version_key)
+            now = time.monotonic()
+            # Lignes à scorer : une seule fois par clé, même si elle apparaît plusieurs fois dans le lot
+            missing = collections.OrderedDict()
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    probabilities[i] = entry[0]
+                    self.hits += 1
+
+        if not missing:
+            return probabilities
+
+        rows = [positions[0] for positions in missing.values()]
+        scored = np.asarray(predict(features[rows]), dtype=np.float64)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            # Pas d'insertion si le modèle a changé pendant le calcul
+            store = version_key == self._version_key
+            for (key, positions), probability in zip(missing.items(), scored):
+                probabilities[positions] = probability
+                if store and self.max_size > 0:
+                    self._entries[key] = (float(probability), expires_at)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return probabilities
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the size of the cache and its hit, miss and eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'invalidations': self.invalidations}
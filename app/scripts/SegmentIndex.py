@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from .TargetCube import MAX_CATEGORIES, _column_codes
+
+# Au-delà de ce nombre de cellules un croisement n'est plus lisible (et plus interactif)
+MAX_CELLS = 10_000
+
+
+def _popcount(words):
+    # Nombre de bits à 1 d'un bitmap (mots de 64 bits)
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(np.unpackbits(words.view(np.uint8)).sum(dtype=np.int64))
+
+
+def _bitmap(flags, n_words):
+    # Un bit par ligne (ordre little-endian), complété par des zéros jusqu'à un multiple de 64 lignes
+    packed = np.packbits(flags, bitorder='little')
+    words = np.zeros(n_words * 8, dtype=np.uint8)
+    words[:len(packed)] = packed
+    return words.view(np.uint64)
+
+
+class SegmentIndex:
+    """
+    Bitmap indexes of the categories of the analyzed columns, for filtered multi-column default rates.
+
+    Each category of each column is a bitmap with one bit per row, built once. A segment
+    (filters plus one combination of the grouped columns) is the bitwise AND of its bitmaps,
+    the OR of the selected categories within a filtered column; its size and its number of
+    defaults are population counts. Queries never go back to the rows: their cost depends on
+    the number of rows / 64 and on the number of non-empty cells, not on a table scan.
+    """
+
+    def __init__(self, target_column='TARGET'):
+        self.target_column = target_column
+        self.n_rows = 0
+        self.n_words = 0
+        self.bitmaps = {}
+        self.categories = {}
+        self.target_bitmap = None
+        self.valid_bitmap = None
+
+    @classmethod
+    def build(cls, data, columns=None, target_column='TARGET', max_categories=MAX_CATEGORIES):
+        """
+        Index the categories of the columns of a DataFrame.
+
+        Parameters:
+        - data (pd.DataFrame): Loan data containing the target column.
+        - columns (list or None): Columns to index; every column with at most max_categories
+          distinct values if None.
+        - target_column (str): Target column (1 = default).
+        - max_categories (int): Cardinality limit of the indexed columns.
+
+        Returns:
+        - SegmentIndex: The bitmap index.
+        """
+        index = cls(target_column)
+        index.n_rows = len(data)
+        index.n_words = (len(data) + 63) // 64
+        target = data[target_column].to_numpy(dtype=np.float64)
+        index.target_bitmap = _bitmap(target == 1, index.n_words)
+        if np.isnan(target).any():
+            # Lignes sans cible (demandes non encore remboursées) : exclues de tous les segments
+            index.valid_bitmap = _bitmap(~np.isnan(target), index.n_words)
+        for column in (data.columns if columns is None else columns):
+            if column != target_column:
+                index.add_column(data[column], max_categories)
+        return index
+
+    def add_column(self, series, max_categories=MAX_CATEGORIES):
+        """Index one more column of the rows the index was built from (skipped above max_categories)."""
+        codes, categories = _column_codes(series)
+        if len(categories) > max_categories:
+            return False
+        observed = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+        self.categories[series.name] = pd.Index(categories)[observed]
+        self.bitmaps[series.name] = [_bitmap(codes == code, self.n_words) for code in np.flatnonzero(observed)]
+        return True
+
+    @property
+    def columns(self):
+        return list(self.bitmaps)
+
+    def _check(self, column):
+        if column not in self.bitmaps:
+            raise ValueError(f"Column '{column}' is not indexed.")
+
+    def filter_bitmap(self, filters=None):
+        """
+        Return the bitmap of the rows matching the filters, None if every row matches.
+
+        Parameters:
+        - filters (dict or None): Column -> list of accepted categories (OR within a column,
+          AND between columns). An empty list accepts every row.
+
+        Rows without a target value never match.
+        """
+        mask = self.valid_bitmap
+        for column, values in (filters or {}).items():
+            self._check(column)
+            if values is None or not len(values):
+                continue
+            positions = self.categories[column].get_indexer(list(values))
+            column_mask = np.zeros(self.n_words, dtype=np.uint64)
+            for position in positions[positions >= 0]:
+                column_mask |= self.bitmaps[column][position]
+            mask = column_mask if mask is None else mask & column_mask
+        return mask
+
+    def count(self, filters=None):
+        """Return the number of rows and of defaults matching the filters."""
+        mask = self.filter_bitmap(filters)
+        if mask is None:
+            return self.n_rows, _popcount(self.target_bitmap)
+        return _popcount(mask), _popcount(mask & self.target_bitmap)
+
+    def _cells(self, mask, by, prefix=()):
+        # Parcours en profondeur : une combinaison vide n'est pas développée plus loin
+        if not by:
+            yield prefix, mask
+            return
+        for position, bitmap in enumerate(self.bitmaps[by[0]]):
+            cell = bitmap if mask is None else mask & bitmap
+            if not cell.any():
+                continue
+            yield from self._cells(cell, by[1:], prefix + (position,))
+
+    def query(self, by, filters=None, min_count=1):
+        """
+        Return the size and default rate of every segment of the grouped columns within the filters.
+
+        Parameters:
+        - by (list): Grouped columns (one to three in practice), in display order.
+        - filters (dict or None): Column -> list of accepted categories.
+        - min_count (int): Segments with fewer rows are dropped.
+
+        Returns:
+        - pd.DataFrame: Columns 'count', 'defaults' and 'default_rate', indexed by the
+          categories of the grouped columns (missing values are not a segment).
+        """
+        by = list(by)
+        if not by:
+            raise ValueError("Select at least one column to group by.")
+        for column in by:
+            self._check(column)
+        n_cells = int(np.prod([len(self.categories[column]) for column in by]))
+        if n_cells > MAX_CELLS:
+            raise ValueError(f"{n_cells} segments requested, at most {MAX_CELLS} are supported.")
+
+        mask = self.filter_bitmap(filters)
+        keys, counts, defaults = [], [], []
+        for positions, cell in self._cells(mask, by):
+            count = _popcount(cell)
+            if count < min_count:
+                continue
+            keys.append(tuple(self.categories[column][position] for column, position in zip(by, positions)))
+            counts.append(count)
+            defaults.append(_popcount(cell & self.target_bitmap))
+
+        index = pd.MultiIndex.from_tuples(keys, names=by) if keys else pd.MultiIndex.from_arrays(
+            [[] for _ in by], names=by)
+        if len(by) == 1:
+            index = index.get_level_values(0)
+        result = pd.DataFrame({'count': np.asarray(counts, dtype=np.int64),
+                               'defaults': np.asarray(defaults, dtype=np.int64)}, index=index)
+        result['default_rate'] = result['defaults'] / result['count']
+        return result
+
+    @property
+    def nbytes(self):
+        """Memory held by the bitmaps."""
+        extra = [bitmap for bitmap in (self.target_bitmap, self.valid_bitmap) if bitmap is not None]
+        return sum(bitmap.nbytes for bitmaps in list(self.bitmaps.values()) + [extra] for bitmap in bitmaps)
@@ -0,0 +1,174 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+# Au-delà de ce nombre de modalités une colonne n'est pas pré-agrégée (montants, identifiants...)
+MAX_CATEGORIES = 100
+
+
+def _column_codes(series):
+    # Codes entiers des modalités (-1 pour les valeurs manquantes) et modalités triées
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return np.asarray(series.cat.codes), series.cat.categories
+    codes, categories = pd.factorize(series, sort=True)
+    return codes, categories
+
+
+def _group_stats(series, target):
+    codes, categories = _column_codes(series)
+    valid = (codes >= 0) & ~np.isnan(target)
+    codes = codes[valid]
+    counts = np.bincount(codes, minlength=len(categories))
+    sums = np.bincount(codes, weights=target[valid], minlength=len(categories))
+    return pd.Index(categories), counts.astype(np.int64), sums
+
+
+class TargetCube:
+    """
+    Count, sum and mean of the target for every category of the analyzed columns.
+
+    All figures come from np.bincount over integer category codes, computed once per column;
+    the default-rate functions of the analyzers read them instead of running a groupby.
+    """
+
+    def __init__(self, target_column='TARGET'):
+        self.target_column = target_column
+        self.groups = {}
+        self.n_rows = 0
+        self._frames = {}
+
+    @classmethod
+    def build(cls, data, columns=None, target_column='TARGET', max_categories=MAX_CATEGORIES):
+        """
+        Aggregate the target over the columns of a DataFrame.
+
+        Parameters:
+        - data (pd.DataFrame): Loan data containing the target column.
+        - columns (list or None): Columns to aggregate; every column with at most
+          max_categories distinct values if None.
+        - target_column (str): Target column (1 = default).
+        - max_categories (int): Cardinality limit used when columns is None.
+
+        Returns:
+        - TargetCube: The aggregate cube.
+        """
+        cube = cls(target_column)
+        cube.n_rows = len(data)
+        target = data[target_column].to_numpy(dtype=np.float64)
+        for column in (data.columns if columns is None else columns):
+            if column == target_column:
+                continue
+            categories, counts, sums = _group_stats(data[column], target)
+            if columns is None and len(categories) > max_categories:
+                continue
+            cube.groups[column] = (categories, counts, sums)
+        return cube
+
+    def covers(self, data, column, target_column='TARGET'):
+        """
+        Return True if the cube can answer for a column of data without aggregating anything.
+
+        The rows must be those the cube was built from (same row count: a filtered or sampled
+        frame is not covered) and the column must already be aggregated.
+        """
+        return self.target_column == target_column and column in self.groups and len(data) == self.n_rows
+
+    def add_column(self, data, column):
+        """Aggregate one more column of data (the rows the cube was built from)."""
+        target = data[self.target_column].to_numpy(dtype=np.float64)
+        self.groups[column] = _group_stats(data[column], target)
+        self._frames.pop(column, None)
+
+    def update(self, new_rows):
+        """
+        Add newly appended rows to the aggregates without rescanning the history.
+
+        Parameters:
+        - new_rows (pd.DataFrame): Appended rows with the aggregated columns and the target.
+        """
+        target = new_rows[self.target_column].to_numpy(dtype=np.float64)
+        for column, (categories, counts, sums) in self.groups.items():
+            new_categories, new_counts, new_sums = _group_stats(new_rows[column], target)
+            if not new_categories.isin(categories).all():
+                # Nouvelles modalités : extension des agrégats existants
+                merged = categories.union(new_categories)
+                counts = pd.Series(counts, index=categories).reindex(merged, fill_value=0).to_numpy(copy=True)
+                sums = pd.Series(sums, index=categories).reindex(merged, fill_value=0.0).to_numpy(copy=True)
+                categories = merged
+            else:
+                counts, sums = counts.copy(), sums.copy()
+            positions = categories.get_indexer(new_categories)
+            counts[positions] += new_counts
+            sums[positions] += new_sums
+            self.groups[column] = (categories, counts, sums)
+        self.n_rows += len(new_rows)
+        self._frames.clear()
+
+    def stats(self, column, data=None):
+        """
+        Return the sum, count and mean of the target per category of a column.
+
+        Parameters:
+        - column (str): Aggregated column.
+        - data (pd.DataFrame or None): Source rows, used to aggregate a column missing from the cube.
+
+        Returns:
+        - pd.DataFrame: Columns 'sum', 'count' and 'mean', indexed by category (empty categories dropped).
+        """
+        if column in self._frames:
+            return self._frames[column][0]
+        if column not in self.groups:
+            if data is None:
+                raise ValueError(f"Column '{column}' is not aggregated in the cube.")
+            self.add_column(data, column)
+        categories, counts, sums = self.groups[column]
+        observed = counts > 0
+        index = categories[observed].rename(column)
+        frame = pd.DataFrame({'sum': sums[observed], 'count': counts[observed],
+                              'mean': sums[observed] / counts[observed]}, index=index)
+        # Résultats mis en mémoire : les requêtes suivantes ne recalculent rien
+        self._frames[column] = (frame, frame['mean'].rename(self.target_column))
+        return frame
+
+    def mean(self, column, data=None):
+        """Return the mean of the target per category, like data.groupby(column)[target].mean()."""
+        self.stats(column, data)
+        return self._frames[column][1]
+
+    def to_dict(self):
+        """Return the aggregates as plain Python/NumPy objects (pickles without this class)."""
+        return {'target_column': self.target_column, 'n_rows': self.n_rows,
+                'groups': {column: {'categories': np.asarray(categories), 'counts': counts, 'sums': sums}
+                           for column, (categories, counts, sums) in self.groups.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        cube = cls(state['target_column'])
+        cube.n_rows = state['n_rows']
+        cube.groups = {column: (pd.Index(group['categories']), np.asarray(group['counts'], dtype=np.int64),
+                                np.asarray(group['sums'], dtype=np.float64))
+                       for column, group in state['groups'].items()}
+        return cube
+
+    def save(self, path, version=None):
+        # Dictionnaire et non l'objet : le fichier se relit quel que soit le chemin d'import
+        # du module (scripts.TargetCube dans les pages, app.scripts.TargetCube dans les scripts)
+        joblib.dump({'version': version, 'cube': self.to_dict()}, path)
+
+    @classmethod
+    def read(cls, path):
+        """Return (cube, version) of a saved cube, (None, None) if it is missing or unreadable."""
+        try:
+            saved = joblib.load(path)
+            return cls.from_dict(saved['cube']), saved.get('version')
+        except (OSError, EOFError, KeyError, ValueError, TypeError, ImportError, AttributeError):
+            # Fichier absent, tronqué ou d'un ancien format (objet picklé) : cache à reconstruire
+            return None, None
+
+    @classmethod
+    def load(cls, path, version=None):
+        """Load a saved cube, or return None when it was built for another dataset version."""
+        cube, saved_version = cls.read(path)
+        if cube is None or saved_version != version:
+            return None
+        return cube
@@ -0,0 +1,211 @@
+"""
+Batch scoring of application files with the trained LightGBM model.
+
+Usage (from the repository root):
+    python -m app.scripts.batch_scoring applications.csv scores.csv --workers 4
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .PredictionCache import PredictionCache
+from .fast_inference import load_fast_predictor
+from .feature_definitions import feature_chunks
+from .scoring import MODEL_DIR, load_artifacts, load_transformer, model_default_proba
+
+PROBABILITY_COLUMN = 'default_probability'
+
+# Artefacts chargés une seule fois par processus de travail
+_worker_artifacts = None
+
+
+def _init_worker(model_dir, fast=False, cache_size=0):
+    global _worker_artifacts
+    # Un seul thread LightGBM par processus : le parallélisme vient du pool
+    if fast:
+        predictor = load_fast_predictor(model_dir)
+        predictor.num_threads = 1
+        features, predict = predictor.features, predictor.predict_features
+    else:
+        model, transformer = load_artifacts(model_dir)
+        features = transformer.transform
+        predict = lambda matrix: model_default_proba(model, matrix, num_threads=1)
+
+    if cache_size:
+        # Un cache par processus : les demandes répétées ne sont scorées qu'une fois
+        cache = PredictionCache(max_size=cache_size, model_dir=model_dir)
+        _worker_artifacts = lambda chunk: cache.predict(features(chunk), predict)
+    else:
+        _worker_artifacts = lambda chunk: predict(features(chunk))
+
+
+def _score_chunk(chunk):
+    return _worker_artifacts(chunk)
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_chunks(input_path, chunksize, columns, definitions=None):
+    """
+    Yield the input file as DataFrames of at most chunksize rows.
+
+    Only the requested columns (raw model features and identifier) are read from disk.
+
+    Parameters:
+    - input_path (str): CSV or Parquet file of applications.
+    - chunksize (int): Number of rows per chunk.
+    - columns (list): Columns to read; columns absent from the file are ignored.
+    - definitions (dict or None): Feature definitions of the model; a CSV is then read through
+      the feature cache, so scoring the same file again neither parses it nor recomputes the
+      derived features (see feature_definitions).
+
+    Yields:
+    - pd.DataFrame: Chunk of raw application rows.
+    """
+    wanted = set(columns)
+
+    if _is_parquet(input_path):
+        parquet_file = pq.ParquetFile(input_path)
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif definitions:
+        yield from feature_chunks(input_path, columns, chunksize, definitions)
+    else:
+        yield from pd.read_csv(input_path, usecols=lambda name: name in wanted, chunksize=chunksize)
+
+
+class ScoreWriter:
+    """Append scored chunks to a CSV or Parquet output file."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._csv_file = None
+
+    def write(self, frame):
+        if _is_parquet(self.output_path):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            header = self._csv_file is None
+            if header:
+                self._csv_file = open(self.output_path, 'w', newline='')
+            frame.to_csv(self._csv_file, header=header, index=False)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._csv_file is not None:
+            self._csv_file.close()
+
+
+def _result_frame(chunk, probabilities, id_column):
+    result = pd.DataFrame({PROBABILITY_COLUMN: probabilities})
+    if id_column and id_column in chunk.columns:
+        result.insert(0, id_column, chunk[id_column].to_numpy())
+    return result
+
+
+def score_file(input_path, output_path, model_dir=MODEL_DIR, chunksize=100_000, workers=None,
+               id_column='SK_ID_CURR', fast=False, cache_size=0, feature_cache=False, log=print):
+    """
+    Score an application file chunk by chunk and write the probabilities incrementally.
+
+    Chunks are scored in parallel by a process pool; at most two chunks per worker are in
+    flight so memory stays bounded whatever the size of the input.
+
+    Parameters:
+    - input_path (str): CSV or Parquet file of applications.
+    - output_path (str): CSV or Parquet file receiving the scores.
+    - model_dir (str): Directory holding the model artifacts.
+    - chunksize (int): Number of rows scored per batch.
+    - workers (int or None): Number of worker processes (cpu count if None, inline if <= 1).
+    - id_column (str): Identifier column copied to the output when present.
+    - fast (bool): Score with the native folded Booster (see fast_inference).
+    - cache_size (int): Rows kept in each worker's PredictionCache, no cache if 0.
+    - feature_cache (bool): Read a CSV input through the feature cache of the model's definitions;
+      off by default, since the first pass writes an Arrow copy of the input next to it, only
+      worth it for a file scored several times.
+    - log (callable): Progress reporting function.
+
+    Returns:
+    - int: Number of scored rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    transformer = load_transformer(model_dir)
+    columns = transformer.raw_features + ([id_column] if id_column else [])
+    definitions = transformer.definitions if feature_cache else None
+    writer = ScoreWriter(output_path)
+    start = time.perf_counter()
+    total_rows = 0
+
+    def report(chunk, probabilities):
+        nonlocal total_rows
+        writer.write(_result_frame(chunk, probabilities, id_column))
+        total_rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        log(f"{total_rows} rows scored ({total_rows / elapsed:,.0f} rows/s)")
+
+    try:
+        if workers <= 1:
+            _init_worker(model_dir, fast, cache_size)
+            for chunk in iter_chunks(input_path, chunksize, columns, definitions):
+                report(chunk, _score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_dir, fast, cache_size)) as executor:
+                pending = collections.deque()
+                for chunk in iter_chunks(input_path, chunksize, columns, definitions):
+                    pending.append((chunk, executor.submit(_score_chunk, chunk)))
+                    # Les résultats sont écrits dans l'ordre d'entrée
+                    while len(pending) >= 2 * workers:
+                        done_chunk, future = pending.popleft()
+                        report(done_chunk, future.result())
+                while pending:
+                    done_chunk, future = pending.popleft()
+                    report(done_chunk, future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    log(f"Done: {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score loan applications with the LightGBM default model.")
+    parser.add_argument('input', help="CSV or Parquet file of applications")
+    parser.add_argument('output', help="CSV or Parquet file receiving the default probabilities")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Directory holding the model artifacts")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows scored per batch")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: cpu count)")
+    parser.add_argument('--id-column', default='SK_ID_CURR', help="Identifier column copied to the output")
+    parser.add_argument('--fast', action='store_true', help="Use the native LightGBM Booster with folded scaling")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="Cache the scores of up to this many distinct applicants per worker (0: no cache)")
+    parser.add_argument('--feature-cache', action='store_true',
+                        help="Keep an Arrow copy of a CSV input with its derived features, for files scored again")
+    args = parser.parse_args(argv)
+
+    if args.fast:
+        # Export fait une seule fois avant de lancer les processus
+        load_fast_predictor(args.model_dir)
+    score_file(args.input, args.output, model_dir=args.model_dir, chunksize=args.chunksize,
+               workers=args.workers, id_column=args.id_column, fast=args.fast, cache_size=args.cache_size,
+               feature_cache=args.feature_cache, log=lambda message: print(message, file=sys.stderr))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Probability calibration and cost-based decision threshold of the default model.
+
+The model is trained with balanced class weights: its scores rank applicants well (AUC) but
+overestimate the default rate. After training, on the held-out rows:
+
+1. a calibrator maps the scores to observed default frequencies, either isotonic regression
+   (piecewise linear, stored as its breakpoints) or Platt scaling (logistic regression on the
+   log-odds of the score, stored as two coefficients),
+2. the expected cost of every decision threshold is computed from the calibrated scores sorted
+   once and cumulative sums of defaults and non-defaults: O(n log n) for the whole curve, no
+   re-scoring per candidate threshold. The threshold of minimal cost is kept.
+
+Both are saved in calibration.json next to the model. load_artifacts wraps the model in a
+CalibratedModel, so every serving path (Model page, batch scoring, prediction server,
+sensitivity analysis) returns calibrated probabilities; applying the calibrator is one
+np.interp (or one sigmoid) per batch.
+
+Threshold curve of a trained model on a labelled file (from the repository root):
+    python -m app.scripts.calibration data/application_train.csv --model-dir model
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CALIBRATION_FILE = 'calibration.json'
+METHODS = ['isotonic', 'platt']
+
+# Coût d'un prêt accordé à un client qui fera défaut (faux négatif) rapporté à celui d'un
+# prêt refusé à un client qui aurait remboursé (faux positif)
+COST_FALSE_NEGATIVE = 5.0
+COST_FALSE_POSITIVE = 1.0
+SCORE_EPSILON = 1e-6
+
+
+def _logit(scores):
+    scores = np.clip(np.asarray(scores, dtype=np.float64), SCORE_EPSILON, 1 - SCORE_EPSILON)
+    return np.log(scores / (1 - scores))
+
+
+class Calibrator:
+    """
+    Monotonic mapping from model scores to calibrated default probabilities, with the decision threshold.
+
+    Parameters:
+    - method (str): 'isotonic' or 'platt'.
+    - x, y (list or None): Breakpoints of the isotonic mapping (scores, probabilities).
+    - a, b (float or None): Platt coefficients, p = sigmoid(a * logit(score) + b).
+    - threshold (float): Calibrated probability from which an applicant is predicted to default.
+    - cost_false_negative, cost_false_positive (float): Costs the threshold was optimized for.
+    """
+
+    def __init__(self, method, x=None, y=None, a=None, b=None, threshold=0.5,
+                 cost_false_negative=COST_FALSE_NEGATIVE, cost_false_positive=COST_FALSE_POSITIVE):
+        if method not in METHODS:
+            raise ValueError(f"Unknown calibration method '{method}', expected one of {METHODS}.")
+        self.method = method
+        self.x = None if x is None else np.asarray(x, dtype=np.float64)
+        self.y = None if y is None else np.asarray(y, dtype=np.float64)
+        self.a = a
+        self.b = b
+        self.threshold = threshold
+        self.cost_false_negative = cost_false_negative
+        self.cost_false_positive = cost_false_positive
+
+    @classmethod
+    def fit(cls, scores, labels, method='isotonic'):
+        """
+        Fit the calibrator on held-out scores (the threshold is set separately by optimize_threshold).
+
+        Parameters:
+        - scores (np.ndarray): Raw model probabilities of the held-out rows.
+        - labels (np.ndarray): Observed targets (1 = default).
+        - method (str): 'isotonic' or 'platt'.
+
+        Returns:
+        - Calibrator: The fitted calibrator.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.float64)
+        if method == 'isotonic':
+            from sklearn.isotonic import IsotonicRegression
+            isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(scores, labels)
+            return cls(method, x=isotonic.X_thresholds_, y=isotonic.y_thresholds_)
+        if method == 'platt':
+            from sklearn.linear_model import LogisticRegression
+            logistic = LogisticRegression(C=1e6).fit(_logit(scores)[:, None], labels)
+            return cls(method, a=float(logistic.coef_[0, 0]), b=float(logistic.intercept_[0]))
+        raise ValueError(f"Unknown calibration method '{method}', expected one of {METHODS}.")
+
+    def transform(self, scores):
+        """Return the calibrated probabilities of raw model scores."""
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.method == 'isotonic':
+            return np.interp(scores, self.x, self.y)
+        return 1.0 / (1.0 + np.exp(-(self.a * _logit(scores) + self.b)))
+
+    def optimize_threshold(self, scores, labels, cost_false_negative=COST_FALSE_NEGATIVE,
+                           cost_false_positive=COST_FALSE_POSITIVE):
+        """
+        Set the threshold minimizing the expected cost on held-out rows.
+
+        Returns:
+        - pd.DataFrame: The whole threshold curve (see threshold_curve).
+        """
+        curve = threshold_curve(self.transform(scores), labels, cost_false_negative, cost_false_positive)
+        self.threshold = float(curve['threshold'].iloc[int(curve['cost'].to_numpy().argmin())])
+        self.cost_false_negative = cost_false_negative
+        self.cost_false_positive = cost_false_positive
+        return curve
+
+    def to_dict(self):
+        state = {'method': self.method, 'threshold': self.threshold,
+                 'cost_false_negative': self.cost_false_negative, 'cost_false_positive': self.cost_false_positive}
+        if self.method == 'isotonic':
+            state.update(x=self.x.tolist(), y=self.y.tolist())
+        else:
+            state.update(a=self.a, b=self.b)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+def threshold_curve(probabilities, labels, cost_false_negative=COST_FALSE_NEGATIVE,
+                    cost_false_positive=COST_FALSE_POSITIVE):
+    """
+    Return the confusion counts and expected cost of every decision threshold.
+
+    An applicant is predicted to default when its probability is >= threshold. The rows are
+    sorted once by decreasing probability: the defaults and non-defaults above each distinct
+    probability are cumulative sums, so the curve costs one sort whatever the number of thresholds.
+
+    Parameters:
+    - probabilities (np.ndarray): Default probabilities of labelled rows.
+    - labels (np.ndarray): Observed targets (1 = default).
+    - cost_false_negative (float): Cost of a defaulting applicant predicted to repay.
+    - cost_false_positive (float): Cost of a repaying applicant predicted to default.
+
+    Returns:
+    - pd.DataFrame: Columns threshold, true_positives, false_positives, false_negatives,
+      true_negatives, recall, false_positive_rate, precision, cost (total) and mean_cost
+      (per applicant). The first row (threshold +inf) refuses no one.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    # L'ordre entre ex aequo est sans effet : seuls les cumuls en fin de groupe sont gardés
+    order = np.argsort(-probabilities)
+    sorted_probabilities = probabilities[order]
+    true_positives = np.cumsum(labels[order])
+    false_positives = np.arange(1, len(labels) + 1) - true_positives
+    # Un seuil par probabilité distincte : la dernière ligne de chaque groupe d'ex aequo
+    last = np.r_[np.flatnonzero(np.diff(sorted_probabilities)), len(labels) - 1] if len(labels) else []
+
+    thresholds = np.r_[np.inf, sorted_probabilities[last]]
+    true_positives = np.r_[0.0, true_positives[last]]
+    false_positives = np.r_[0.0, false_positives[last]]
+    positives, negatives = labels.sum(), len(labels) - labels.sum()
+    false_negatives = positives - true_positives
+    cost = cost_false_negative * false_negatives + cost_false_positive * false_positives
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'threshold': thresholds, 'true_positives': true_positives, 'false_positives': false_positives,
+            'false_negatives': false_negatives, 'true_negatives': negatives - false_positives,
+            'recall': true_positives / positives, 'false_positive_rate': false_positives / negatives,
+            'precision': true_positives / (true_positives + false_positives),
+            'cost': cost, 'mean_cost': cost / max(len(labels), 1)})
+
+
+def calibration_report(scores, labels, calibrator):
+    """Return the Brier score and log loss of the raw and calibrated scores, and the threshold kept."""
+    from sklearn.metrics import brier_score_loss, log_loss
+
+    labels = np.asarray(labels)
+    calibrated = calibrator.transform(scores)
+    clip = lambda values: np.clip(values, SCORE_EPSILON, 1 - SCORE_EPSILON)
+    return {'method': calibrator.method, 'threshold': calibrator.threshold,
+            'cost_false_negative': calibrator.cost_false_negative,
+            'cost_false_positive': calibrator.cost_false_positive,
+            'default_rate': float(labels.mean()), 'mean_score_raw': float(np.mean(scores)),
+            'mean_score_calibrated': float(calibrated.mean()),
+            'brier_raw': float(brier_score_loss(labels, scores)),
+            'brier_calibrated': float(brier_score_loss(labels, calibrated)),
+            'log_loss_raw': float(log_loss(labels, clip(scores), labels=[0, 1])),
+            'log_loss_calibrated': float(log_loss(labels, clip(calibrated), labels=[0, 1]))}
+
+
+def save_calibration(calibrator, model_dir):
+    with open(os.path.join(model_dir, CALIBRATION_FILE), 'w') as f:
+        json.dump(calibrator.to_dict(), f)
+
+
+def load_calibration(model_dir):
+    """Return the calibrator saved with a model, None for models trained without one."""
+    try:
+        with open(os.path.join(model_dir, CALIBRATION_FILE)) as f:
+            return Calibrator.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+class CalibratedModel:
+    """Trained LightGBM model (LGBMClassifier or Booster) whose probabilities go through a Calibrator."""
+
+    def __init__(self, model, calibrator):
+        self.model = model
+        self.calibrator = calibrator
+
+
+def decision_threshold(model, default=0.5):
+    """Return the probability from which the model predicts a default (default for uncalibrated models)."""
+    # Pas d'isinstance : sous python -m, ce module est aussi chargé sous le nom __main__
+    calibrator = getattr(model, 'calibrator', None)
+    return default if calibrator is None else calibrator.threshold
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threshold curve of the calibrated model on a labelled file.")
+    parser.add_argument('input', help="Labelled CSV (application_train.csv layout)")
+    parser.add_argument('--model-dir', default='model', help="Directory holding the model artifacts, or a registry")
+    parser.add_argument('--cost-fn', type=float, default=None, help="Cost of a false negative (default: saved cost)")
+    parser.add_argument('--cost-fp', type=float, default=None, help="Cost of a false positive (default: saved cost)")
+    parser.add_argument('--output', default=None, help="Write the whole curve to this CSV file")
+    args = parser.parse_args(argv)
+
+    from .scoring import load_artifacts, model_default_proba
+
+    model, transformer = load_artifacts(args.model_dir)
+    data = pd.read_csv(args.input, usecols=transformer.raw_features + ['TARGET']).dropna(subset=['TARGET'])
+    probabilities = model_default_proba(model, transformer.transform(data))
+    calibrator = getattr(model, 'calibrator', None)
+    cost_fn = args.cost_fn if args.cost_fn is not None else (
+        calibrator.cost_false_negative if calibrator else COST_FALSE_NEGATIVE)
+    cost_fp = args.cost_fp if args.cost_fp is not None else (
+        calibrator.cost_false_positive if calibrator else COST_FALSE_POSITIVE)
+    threshold = decision_threshold(model)
+
+    curve = threshold_curve(probabilities, data['TARGET'].to_numpy(), cost_fn, cost_fp)
+    best = curve.iloc[int(curve['cost'].to_numpy().argmin())]
+    current = curve.iloc[int(np.searchsorted(-curve['threshold'].to_numpy(), -threshold, side='right')) - 1]
+    print(f"{len(data)} rows, {len(curve)} thresholds, costs FN={cost_fn:g} FP={cost_fp:g}")
+    for name, row in [('saved threshold', current), ('optimal threshold', best)]:
+        print(f"{name:<18} {row['threshold']:.4f}  mean cost {row['mean_cost']:.4f}  recall {row['recall']:.3f}  "
+              f"false positive rate {row['false_positive_rate']:.3f}")
+    if args.output:
+        curve.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
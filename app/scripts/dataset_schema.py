@@ -0,0 +1,150 @@
+"""
+Compact column types of the application dataset.
+
+With default dtypes pandas stores every text column as strings and every flag, count and
+score as int64/float64. The schema below assigns a type per column instead:
+
+- text columns (NAME_*, CODE_*, FLAG_OWN_*, OCCUPATION_TYPE...) -> category,
+- 0/1 flags (FLAG_*, REG_*, LIVE_*) -> bool,
+- counts, ratings, days and identifiers -> the smallest integer type holding their range
+  (float32 when they have missing values),
+- amounts, scores and normalized building statistics -> float32.
+
+Memory before and after, per column (from the repository root):
+    python -m app.scripts.dataset_schema data/application_train.csv
+"""
+import argparse
+import fnmatch
+
+import numpy as np
+import pandas as pd
+
+# Incrémentée à chaque changement des règles : les caches Arrow construits avec d'autres types sont reconstruits
+SCHEMA_VERSION = 1
+
+# (motif du nom de colonne, type) ; la première règle qui correspond s'applique
+COLUMN_RULES = [
+    ('SK_ID_*', 'int'),
+    ('TARGET', 'int'),
+    ('FLAG_*', 'bool'),
+    ('REG_*', 'bool'),
+    ('LIVE_*', 'bool'),
+    ('CNT_*', 'int'),
+    ('REGION_RATING_*', 'int'),
+    ('HOUR_APPR_PROCESS_START', 'int'),
+    ('OBS_*', 'int'),
+    ('DEF_*', 'int'),
+    ('AMT_REQ_CREDIT_BUREAU_*', 'int'),
+    ('DAYS_*', 'int'),
+    ('OWN_CAR_AGE', 'int'),
+    ('AMT_*', 'float'),
+    ('EXT_SOURCE_*', 'float'),
+    ('REGION_POPULATION_RELATIVE', 'float'),
+    ('*_AVG', 'float'),
+    ('*_MODE', 'float'),
+    ('*_MEDI', 'float'),
+]
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def is_categorical_column(series):
+    """
+    Return True if the series holds categories (object, string or category dtype).
+
+    Bool columns (compact 0/1 flags) are not categorical: the observation helpers skip them,
+    as they skipped the int64 flags of the CSV.
+    """
+    return (isinstance(series.dtype, pd.CategoricalDtype)
+            or pd.api.types.is_object_dtype(series.dtype)
+            or pd.api.types.is_string_dtype(series.dtype))
+
+
+def column_kind(name, series):
+    """Return the compact type family of a column: 'category', 'bool', 'int' or 'float'."""
+    if is_categorical_column(series):
+        return 'category'
+    for pattern, kind in COLUMN_RULES:
+        if fnmatch.fnmatchcase(name, pattern):
+            return kind
+    return 'int' if pd.api.types.is_integer_dtype(series.dtype) else 'float'
+
+
+def _smallest_integer(values, min_type=np.int8):
+    low, high = values.min(), values.max()
+    candidates = INTEGER_TYPES[INTEGER_TYPES.index(min_type):]
+    return next(dtype for dtype in candidates if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max)
+
+
+def compact_series(series, kind, min_integer_type=np.int8):
+    """
+    Convert a column to the compact dtype of its kind, falling back when its values do not fit.
+
+    A 'bool' column with values other than 0/1 becomes an integer; an 'int' column with
+    missing or fractional values becomes float32. Integers take the smallest type holding
+    their range, never narrower than min_integer_type.
+    """
+    if kind == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    values = series.to_numpy()
+    if not len(values):
+        return series.astype(np.float32) if kind == 'float' else series
+    if kind == 'bool':
+        if not np.isnan(values.astype(np.float64)).any() and np.isin(values, (0, 1)).all():
+            return series.astype(bool)
+        kind = 'int'
+    if kind == 'int':
+        floats = values.astype(np.float64)
+        if not np.isnan(floats).any() and (floats == np.round(floats)).all():
+            return series.astype(_smallest_integer(floats, min_integer_type))
+    return series.astype(np.float32)
+
+
+def compact_dtypes(data, min_integer_type=np.int8):
+    """
+    Return the DataFrame with the compact dtype of every column.
+
+    Parameters:
+    - data (pd.DataFrame): Rows read with default dtypes (pd.read_csv).
+    - min_integer_type (type): Narrowest integer dtype used; a wider one (np.int32) gives
+      integer columns a width that does not depend on the range of this particular batch.
+
+    Returns:
+    - pd.DataFrame: New DataFrame with category, bool, int8/16/32 and float32 columns.
+    """
+    return pd.DataFrame({name: compact_series(data[name], column_kind(name, data[name]), min_integer_type)
+                         for name in data.columns}, index=data.index)
+
+
+def memory_report(before, after):
+    """
+    Compare the memory used by two versions of the same DataFrame, column by column.
+
+    Returns:
+    - pd.DataFrame: dtype and MB of every column before and after, plus a 'TOTAL' row.
+    """
+    mb_before = before.memory_usage(index=False, deep=True) / 1024 ** 2
+    mb_after = after.memory_usage(index=False, deep=True) / 1024 ** 2
+    report = pd.DataFrame({'dtype_before': before.dtypes.astype(str), 'dtype_after': after.dtypes.astype(str),
+                           'mb_before': mb_before, 'mb_after': mb_after})
+    report.loc['TOTAL'] = ['', '', mb_before.sum(), mb_after.sum()]
+    report['ratio'] = report['mb_before'] / report['mb_after']
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory of the dataset with default and compact dtypes.")
+    parser.add_argument('csv', help="Application CSV (application_train.csv layout)")
+    parser.add_argument('--all-columns', action='store_true', help="Print every column, not only the total")
+    args = parser.parse_args(argv)
+
+    before = pd.read_csv(args.csv)
+    report = memory_report(before, compact_dtypes(before))
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print((report if args.all_columns else report.loc[['TOTAL']]).to_string(float_format=lambda value: f'{value:.2f}'))
+
+
+if __name__ == '__main__':
+    main()
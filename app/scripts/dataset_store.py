@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .AgeHistogram import AgeHistogram
+from .PartitionedDataset import PartitionedDataset, is_partition_store
+from .TargetCube import TargetCube
+from .dataset_schema import SCHEMA_VERSION, compact_dtypes
+from .tracing import add, span, traced
+
+DEFAULT_CSV_PATH = os.path.join('data', 'application_train.csv')
+# Magasin de partitions alimenté par ingestion ; utilisé à la place du CSV dès qu'il existe
+DEFAULT_STORE_PATH = os.path.join('data', 'partitions')
+CACHE_DIR_NAME = '.cache'
+
+_tables = {}
+_cubes = {}
+_histograms = {}
+_stores = {}
+_lock = threading.Lock()
+
+
+def source_fingerprint(csv_path=DEFAULT_CSV_PATH):
+    """
+    Return a fingerprint of the source CSV used to invalidate the columnar cache.
+
+    Parameters:
+    - csv_path (str): Path to the source CSV file.
+
+    Returns:
+    - dict: Size and modification time (ns) of the file.
+    """
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def default_source():
+    """Return the partition store if it has been created, else the source CSV."""
+    return DEFAULT_STORE_PATH if is_partition_store(DEFAULT_STORE_PATH) else DEFAULT_CSV_PATH
+
+
+def partitioned_dataset(store_dir=DEFAULT_STORE_PATH):
+    """Return the process-wide reader of a partition store, refreshed with the new partitions."""
+    key = os.path.abspath(store_dir)
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = PartitionedDataset(store_dir)
+    store.refresh()
+    return store
+
+
+def cache_paths(csv_path=DEFAULT_CSV_PATH):
+    """Return the (arrow, metadata) cache paths stored next to the source CSV."""
+    directory = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(directory, f'{stem}.arrow'), os.path.join(directory, f'{stem}.meta.json')
+
+
+@traced
+def build_cache(csv_path=DEFAULT_CSV_PATH):
+    """
+    Parse the CSV once and write it as an uncompressed Arrow IPC file.
+
+    Columns are stored with the compact dtypes of dataset_schema: string columns as
+    categoricals (every page shares the same dictionary-encoded buffers once the file is
+    memory-mapped), flags as bool, counts and days as small integers, amounts and scores
+    as float32.
+
+    Parameters:
+    - csv_path (str): Path to the source CSV file.
+
+    Returns:
+    - str: Path of the written Arrow file.
+    """
+    arrow_path, meta_path = cache_paths(csv_path)
+    os.makedirs(os.path.dirname(arrow_path), exist_ok=True)
+
+    fingerprint = source_fingerprint(csv_path)
+    # Les colonnes texte (NAME_*, CODE_*, FLAG_OWN_*, OCCUPATION_TYPE...) sont dictionnaire-encodées
+    with span('dataset_store.read_csv', path=csv_path):
+        data = compact_dtypes(pd.read_csv(csv_path))
+    add('dataset_store.cache_builds')
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+
+    # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+    tmp_path = f'{arrow_path}.{os.getpid()}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+    tmp_meta = f'{meta_path}.{os.getpid()}.tmp'
+    with open(tmp_meta, 'w') as f:
+        json.dump({'source': os.path.abspath(csv_path), 'fingerprint': fingerprint,
+                   'num_rows': table.num_rows, 'schema_version': SCHEMA_VERSION}, f)
+    os.replace(tmp_meta, meta_path)
+
+    return arrow_path
+
+
+def _cache_is_fresh(csv_path, fingerprint):
+    arrow_path, meta_path = cache_paths(csv_path)
+    if not (os.path.exists(arrow_path) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('fingerprint') == fingerprint and meta.get('schema_version') == SCHEMA_VERSION
+
+
+def load_table(csv_path=None):
+    """
+    Return the memory-mapped Arrow table for the dataset, building the cache if needed.
+
+    The table is shared by the whole process and rebuilt only when the source CSV changes.
+
+    Parameters:
+    - csv_path (str or None): Source CSV or partition store (default_source() if None).
+
+    Returns:
+    - pa.Table: Memory-mapped table.
+    """
+    csv_path = csv_path or default_source()
+    if is_partition_store(csv_path):
+        return partitioned_dataset(csv_path).table()
+
+    key = os.path.abspath(csv_path)
+    fingerprint = source_fingerprint(csv_path)
+
+    cached = _tables.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    with _lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        if not _cache_is_fresh(csv_path, fingerprint):
+            build_cache(csv_path)
+
+        arrow_path, _ = cache_paths(csv_path)
+        table = ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+        _tables[key] = (fingerprint, table)
+        return table
+
+
+def dataset_columns(csv_path=None):
+    """Return the list of column names of the dataset without materializing any data."""
+    return load_table(csv_path).column_names
+
+
+def dataset_version(csv_path=None):
+    """Return a hashable token identifying the current version of the dataset."""
+    csv_path = csv_path or default_source()
+    if is_partition_store(csv_path):
+        return partitioned_dataset(csv_path).version
+    fingerprint = source_fingerprint(csv_path)
+    return (os.path.abspath(csv_path), fingerprint['size'], fingerprint['mtime_ns'])
+
+
+@traced
+def load_columns(columns=None, csv_path=None):
+    """
+    Load a projection of the dataset as a pandas DataFrame.
+
+    Only the requested columns are converted; numeric columns without missing values
+    reference the memory-mapped buffers directly.
+
+    Parameters:
+    - columns (list or None): Columns to load, all columns if None.
+    - csv_path (str or None): Source CSV or partition store (default_source() if None).
+
+    Returns:
+    - pd.DataFrame: DataFrame with the requested columns.
+    """
+    csv_path = csv_path or default_source()
+    if is_partition_store(csv_path):
+        return partitioned_dataset(csv_path).load_columns(columns)
+
+    table = load_table(csv_path)
+    if columns is not None:
+        missing = [column for column in columns if column not in table.column_names]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in the dataset.")
+        table = table.select(list(columns))
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+@traced
+def load_target_cube(csv_path=None, target_column='TARGET'):
+    """
+    Return the aggregate cube of the target for the dataset, computing it once per version.
+
+    The cube is persisted next to the Arrow cache and shared by the whole process.
+
+    Parameters:
+    - csv_path (str or None): Source CSV or partition store (default_source() if None).
+    - target_column (str): Target column (1 = default).
+
+    Returns:
+    - TargetCube: Counts, sums and means of the target per category.
+    """
+    csv_path = csv_path or default_source()
+    if is_partition_store(csv_path):
+        # Mis à jour avec les seules nouvelles partitions
+        return partitioned_dataset(csv_path).target_cube(target_column)
+
+    version = dataset_version(csv_path)
+    key = (version, target_column)
+    if key in _cubes:
+        return _cubes[key]
+
+    arrow_path, _ = cache_paths(csv_path)
+    cube_path = os.path.join(os.path.dirname(arrow_path),
+                             f'{os.path.splitext(os.path.basename(arrow_path))[0]}.{target_column}.cube.pkl')
+    cube = TargetCube.load(cube_path, version) if os.path.exists(cube_path) else None
+    if cube is None:
+        table = load_table(csv_path)
+        cube = TargetCube(target_column)
+        cube.n_rows = table.num_rows
+        # Une colonne à la fois : seules deux colonnes sont matérialisées simultanément
+        for column in table.column_names:
+            if column != target_column:
+                part = load_columns([column, target_column], csv_path)
+                cube.groups.update(TargetCube.build(part, target_column=target_column).groups)
+        cube.save(cube_path, version)
+
+    _cubes[key] = cube
+    return cube
+
+
+@traced
+def load_age_histogram(csv_path=None):
+    """
+    Return the age histogram per target value of the dataset, computed once per version.
+
+    Parameters:
+    - csv_path (str or None): Source CSV or partition store (default_source() if None).
+
+    Returns:
+    - AgeHistogram: Clients per age bin for repaid and defaulted loans.
+    """
+    csv_path = csv_path or default_source()
+    if is_partition_store(csv_path):
+        return partitioned_dataset(csv_path).age_histogram()
+
+    version = dataset_version(csv_path)
+    histogram = _histograms.get(version)
+    if histogram is None:
+        histogram = AgeHistogram.build(load_columns(['DAYS_BIRTH', 'TARGET'], csv_path))
+        _histograms[version] = histogram
+    return histogram
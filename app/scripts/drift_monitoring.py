@@ -0,0 +1,371 @@
+"""
+Drift and data-quality monitoring of incoming applications against the training data.
+
+At training time a reference profile of the raw model features is saved next to the model
+(reference_profile.json): fixed bin edges (deciles of a uniform sample of the training rows)
+with the training counts per bin, category counts, missing-value counts and the histogram of
+the held-out default probabilities.
+
+Incoming batches are profiled in one streaming pass with the same bins. A profile only holds
+counts, so its memory does not depend on the number of rows and profiles of separate batches
+(files, partitions, processes) can be merged. Drift is measured per feature with the PSI
+(population stability index) and the KS statistic computed on the binned distributions.
+
+Usage (from the repository root):
+    python -m app.scripts.drift_monitoring nouvelles_demandes.csv --report drift.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .FeatureTransformer import BINARY_COLUMNS, ONE_HOT_COLUMNS
+from .ModelRegistry import resolve_model_dir
+
+REFERENCE_FILE = 'reference_profile.json'
+SCORE_COLUMN = 'default_probability'
+N_BINS = 10
+SCORE_EDGES = np.linspace(0.0, 1.0, 21)[1:-1]
+SAMPLE_SIZE = 20_000
+
+# Seuils usuels du PSI : < 0,1 stable, 0,1 à 0,25 dérive modérée, > 0,25 dérive forte
+PSI_THRESHOLDS = (0.1, 0.25)
+PSI_EPSILON = 1e-4
+
+
+def is_categorical_feature(column):
+    return column in BINARY_COLUMNS or column in ONE_HOT_COLUMNS
+
+
+def _as_float(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+
+class UniformSample:
+    """
+    Fixed-size uniform sample of rows (bottom-k on random priorities), mergeable across chunks.
+
+    Every row gets a random priority and the sample keeps the `size` smallest ones, so the
+    result does not depend on how the rows are split into chunks.
+    """
+
+    def __init__(self, columns, size=SAMPLE_SIZE, seed=22):
+        self.columns = list(columns)
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.priorities = np.empty(0)
+        self.values = np.empty((0, len(self.columns)))
+
+    def update(self, chunk):
+        values = np.column_stack([_as_float(chunk[column]) for column in self.columns])
+        return self._keep(np.concatenate([self.priorities, self.rng.random(len(values))]),
+                          np.concatenate([self.values, values]))
+
+    def merge(self, other):
+        return self._keep(np.concatenate([self.priorities, other.priorities]),
+                          np.concatenate([self.values, other.values]))
+
+    def _keep(self, priorities, values):
+        if len(priorities) > self.size:
+            kept = np.argpartition(priorities, self.size)[:self.size]
+            priorities, values = priorities[kept], values[kept]
+        self.priorities, self.values = priorities, values
+        return self
+
+    def bin_edges(self, n_bins=N_BINS):
+        """Return the inner bin edges of each column (distinct quantiles of the sample)."""
+        edges = {}
+        for j, column in enumerate(self.columns):
+            values = self.values[:, j]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                edges[column] = np.empty(0)
+                continue
+            quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+            edges[column] = np.unique(quantiles)
+        return edges
+
+
+class DriftProfile:
+    """
+    Binned counts of the raw features and of the default probability over a stream of rows.
+
+    Numeric features are counted in the fixed bins defined by their inner edges (the first and
+    last bins are open, so values outside the training range are still counted). Categorical
+    features are counted per category. Missing values are counted separately.
+    """
+
+    def __init__(self, edges, categorical_columns, score_edges=SCORE_EDGES):
+        self.edges = {column: np.asarray(values, dtype=np.float64) for column, values in edges.items()}
+        self.categorical_columns = list(categorical_columns)
+        self.score_edges = np.asarray(score_edges, dtype=np.float64)
+        self.n_rows = 0
+        self.bin_counts = {column: np.zeros(len(values) + 1, dtype=np.int64) for column, values in self.edges.items()}
+        self.category_counts = {column: {} for column in self.categorical_columns}
+        self.missing = dict.fromkeys(self.features, 0)
+        self.score_counts = np.zeros(len(self.score_edges) + 1, dtype=np.int64)
+        self.score_sum = 0.0
+
+    @property
+    def features(self):
+        return list(self.edges) + self.categorical_columns
+
+    @classmethod
+    def empty_like(cls, other):
+        """Return an empty profile with the bins of other."""
+        return cls(other.edges, other.categorical_columns, other.score_edges)
+
+    def update(self, chunk, scores=None):
+        """
+        Add a chunk of raw application rows (and optionally their default probabilities).
+
+        Parameters:
+        - chunk (pd.DataFrame): Raw rows; features absent from the chunk are counted as missing.
+        - scores (np.ndarray or None): Default probabilities of the rows.
+        """
+        self.n_rows += len(chunk)
+        for column, edges in self.edges.items():
+            if column not in chunk:
+                self.missing[column] += len(chunk)
+                continue
+            values = _as_float(chunk[column])
+            missing = np.isnan(values)
+            self.missing[column] += int(missing.sum())
+            self.bin_counts[column] += np.bincount(np.searchsorted(edges, values[~missing], side='right'),
+                                                   minlength=len(edges) + 1)
+        for column in self.categorical_columns:
+            if column not in chunk:
+                self.missing[column] += len(chunk)
+                continue
+            counts = chunk[column].value_counts(dropna=True)
+            self.missing[column] += len(chunk) - int(counts.sum())
+            totals = self.category_counts[column]
+            for category, count in counts.items():
+                totals[category] = totals.get(category, 0) + int(count)
+        if scores is not None:
+            self.update_scores(scores)
+        return self
+
+    def update_scores(self, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        self.score_counts += np.bincount(np.searchsorted(self.score_edges, scores, side='right'),
+                                         minlength=len(self.score_edges) + 1)
+        self.score_sum += float(scores.sum())
+        return self
+
+    def merge(self, other):
+        """Add the counts of another profile with the same bins."""
+        self.n_rows += other.n_rows
+        for column in self.edges:
+            self.bin_counts[column] += other.bin_counts[column]
+        for column in self.categorical_columns:
+            totals = self.category_counts[column]
+            for category, count in other.category_counts[column].items():
+                totals[category] = totals.get(category, 0) + count
+        for column in self.missing:
+            self.missing[column] += other.missing[column]
+        self.score_counts += other.score_counts
+        self.score_sum += other.score_sum
+        return self
+
+    def distribution(self, column):
+        """Return the counts of a feature per bin or category (missing values excluded)."""
+        if column in self.edges:
+            edges = self.edges[column]
+            labels = ([f'<= {edges[0]:,.6g}'] if len(edges) else ['all'])
+            labels += [f'{low:,.6g} - {high:,.6g}' for low, high in zip(edges[:-1], edges[1:])]
+            labels += [f'> {edges[-1]:,.6g}'] if len(edges) else []
+            return pd.Series(self.bin_counts[column], index=labels)
+        return pd.Series(self.category_counts[column], dtype=np.int64)
+
+    def score_distribution(self):
+        edges = np.concatenate([[0.0], self.score_edges, [1.0]])
+        labels = [f'{low:.2f} - {high:.2f}' for low, high in zip(edges[:-1], edges[1:])]
+        return pd.Series(self.score_counts, index=labels)
+
+    @property
+    def n_scores(self):
+        return int(self.score_counts.sum())
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.n_scores if self.n_scores else np.nan
+
+    def missing_rate(self, column):
+        return self.missing[column] / self.n_rows if self.n_rows else np.nan
+
+    def to_dict(self):
+        return {'n_rows': self.n_rows,
+                'edges': {column: edges.tolist() for column, edges in self.edges.items()},
+                'bin_counts': {column: counts.tolist() for column, counts in self.bin_counts.items()},
+                'categorical_columns': self.categorical_columns,
+                'category_counts': self.category_counts,
+                'missing': self.missing,
+                'score_edges': self.score_edges.tolist(),
+                'score_counts': self.score_counts.tolist(),
+                'score_sum': self.score_sum}
+
+    @classmethod
+    def from_dict(cls, state):
+        profile = cls(state['edges'], state['categorical_columns'], state['score_edges'])
+        profile.n_rows = state['n_rows']
+        profile.bin_counts = {column: np.asarray(counts, dtype=np.int64) for column, counts in state['bin_counts'].items()}
+        profile.category_counts = {column: dict(counts) for column, counts in state['category_counts'].items()}
+        profile.missing = dict(state['missing'])
+        profile.score_counts = np.asarray(state['score_counts'], dtype=np.int64)
+        profile.score_sum = state['score_sum']
+        return profile
+
+
+def save_reference(profile, model_dir):
+    with open(os.path.join(model_dir, REFERENCE_FILE), 'w') as f:
+        json.dump(profile.to_dict(), f)
+
+
+def load_reference(model_dir):
+    """Return the reference profile saved with a model, None for models trained without one."""
+    try:
+        with open(os.path.join(resolve_model_dir(model_dir), REFERENCE_FILE)) as f:
+            return DriftProfile.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def _aligned(expected, actual):
+    expected, actual = expected.align(actual, fill_value=0)
+    return expected.to_numpy(dtype=np.float64), actual.to_numpy(dtype=np.float64)
+
+
+def psi(expected, actual):
+    """
+    Population stability index between two binned distributions (counts on the same bins).
+
+    Empty bins are smoothed with PSI_EPSILON so that a category absent from one side stays finite.
+    """
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    if not expected.sum() or not actual.sum():
+        return np.nan
+    p = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    q = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_statistic(expected, actual):
+    """Kolmogorov-Smirnov statistic (largest gap between the cumulative shares) on ordered bins."""
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    if not expected.sum() or not actual.sum():
+        return np.nan
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+
+def drift_status(value):
+    if np.isnan(value):
+        return 'n/a'
+    low, high = PSI_THRESHOLDS
+    return 'stable' if value < low else 'moderate' if value < high else 'significant'
+
+
+def compare(reference, current):
+    """
+    Compare a profile of incoming rows to the reference profile.
+
+    Parameters:
+    - reference (DriftProfile): Training profile (load_reference).
+    - current (DriftProfile): Profile of the incoming rows, built with the same bins.
+
+    Returns:
+    - pd.DataFrame: One row per feature, plus the default probability if both profiles hold
+      scores: psi, ks (numeric features and score only), missing rates and drift status.
+    """
+    rows = []
+    for column in reference.features:
+        if column in reference.edges:
+            expected, actual = reference.bin_counts[column], current.bin_counts[column]
+            ks = ks_statistic(expected, actual)
+        else:
+            # Pas d'ordre entre les catégories : KS non défini
+            expected, actual = _aligned(reference.distribution(column), current.distribution(column))
+            ks = np.nan
+        rows.append({'feature': column, 'psi': psi(expected, actual), 'ks': ks,
+                     'missing_reference': reference.missing_rate(column),
+                     'missing_current': current.missing_rate(column)})
+    if reference.n_scores and current.n_scores:
+        rows.append({'feature': SCORE_COLUMN, 'psi': psi(reference.score_counts, current.score_counts),
+                     'ks': ks_statistic(reference.score_counts, current.score_counts),
+                     'missing_reference': 0.0, 'missing_current': 0.0})
+    report = pd.DataFrame(rows).set_index('feature')
+    report['status'] = report['psi'].map(drift_status)
+    return report
+
+
+def profile_chunks(reference, chunks, model=None, transformer=None):
+    """
+    Profile raw application chunks in one pass, with the bins of the reference.
+
+    Parameters:
+    - reference (DriftProfile): Training profile giving the bins.
+    - chunks (iterable of pd.DataFrame): Raw application rows.
+    - model, transformer: Trained model and feature transformer; the default probabilities
+      are not profiled if model is None, and scoring them requires the transformer. The derived
+      features of the transformer (cleaned sentinels, ratios) are added to the rows before they
+      are profiled.
+
+    Returns:
+    - DriftProfile: Profile of the incoming rows.
+    """
+    from .scoring import model_default_proba
+
+    if model is not None and transformer is None:
+        raise ValueError("Profiling the default probabilities requires the transformer of the model.")
+    profile = DriftProfile.empty_like(reference)
+    for chunk in chunks:
+        if transformer is not None:
+            chunk = transformer.add_features(chunk)
+        scores = model_default_proba(model, transformer.transform(chunk)) if model is not None else None
+        profile.update(chunk, scores)
+    return profile
+
+
+def monitor_file(input_path, model_dir, chunksize=100_000, score=True):
+    """
+    Profile a CSV or Parquet file of applications and compare it to the reference of a model.
+
+    Returns:
+    - tuple: (DriftProfile of the file, comparison report)
+    """
+    from .batch_scoring import iter_chunks
+    from .scoring import load_artifacts, load_transformer
+
+    reference = load_reference(model_dir)
+    if reference is None:
+        raise FileNotFoundError(f"No {REFERENCE_FILE} in '{model_dir}': retrain the model to create it.")
+    model, transformer = load_artifacts(model_dir) if score else (None, load_transformer(model_dir))
+    current = profile_chunks(reference, iter_chunks(input_path, chunksize, reference.features), model, transformer)
+    return current, compare(reference, current)
+
+
+def main(argv=None):
+    from .scoring import MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Compare incoming applications to the training data of the model.")
+    parser.add_argument('input', help="CSV or Parquet file of applications")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Directory holding the model and its reference profile")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows profiled per chunk")
+    parser.add_argument('--no-score', action='store_true', help="Do not profile the default probabilities")
+    parser.add_argument('--report', default=None, help="Write the report and the profile to this JSON file")
+    args = parser.parse_args(argv)
+
+    current, report = monitor_file(args.input, args.model_dir, args.chunksize, score=not args.no_score)
+    print(f"{current.n_rows} rows profiled", file=sys.stderr)
+    print(report.to_string(float_format=lambda value: f'{value:.4f}'))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'report': json.loads(report.reset_index().to_json(orient='records')),
+                       'profile': current.to_dict()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Per-feature explanations of the default probability from LightGBM's TreeSHAP (pred_contrib).
+
+Contributions are given in log-odds for every original feature: the columns of a one-hot block
+(CODE_GENDER_*, NAME_INCOME_TYPE_*...) are summed back into their feature. For each row the
+contributions plus the 'bias' column add up to the raw score, so the uncalibrated probability
+is sigmoid(sum); the probabilities written by explain_file go through the calibrator of the
+model, like the scores of batch_scoring.
+
+Batch usage (from the repository root):
+    python -m app.scripts.explanations applications.csv explanations.csv --importance importance.json
+"""
+import argparse
+import functools
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .FeatureTransformer import ONE_HOT_COLUMNS
+from .batch_scoring import PROBABILITY_COLUMN, ScoreWriter, iter_chunks
+from .scoring import MODEL_DIR, booster_of, load_artifacts
+
+BIAS_COLUMN = 'bias'
+
+
+@functools.lru_cache(maxsize=8)
+def _grouping(column_names):
+    # Matrice (colonnes du modèle x features d'origine) : un seul produit matriciel regroupe un lot
+    groups = [next((column for column in ONE_HOT_COLUMNS if name.startswith(f'{column}_')), name)
+              for name in column_names]
+    features = list(dict.fromkeys(groups))
+    matrix = np.zeros((len(column_names), len(features)))
+    matrix[np.arange(len(column_names)), [features.index(group) for group in groups]] = 1.0
+    return features, matrix
+
+
+def feature_groups(column_names):
+    """Return the original features of the model columns (one-hot blocks grouped), in order."""
+    return list(_grouping(tuple(column_names))[0])
+
+
+def explain(model, features, column_names, num_threads=None):
+    """
+    Return the contribution of every original feature to the raw score of each row.
+
+    Parameters:
+    - model: Trained LightGBM classifier or Booster.
+    - features (np.ndarray): Transformed matrix (FeatureTransformer.transform).
+    - column_names (list): Model columns (transformer.column_names).
+    - num_threads (int or None): LightGBM threads (default: all).
+
+    Returns:
+    - pd.DataFrame: One column per original feature plus 'bias', in log-odds.
+    """
+    kwargs = {'num_threads': num_threads} if num_threads else {}
+    contributions = booster_of(model).predict(features, pred_contrib=True, **kwargs)
+    names, grouping = _grouping(tuple(column_names))
+    frame = pd.DataFrame(contributions[:, :-1] @ grouping, columns=names)
+    frame[BIAS_COLUMN] = contributions[:, -1]
+    return frame
+
+
+def probabilities_from(contributions, model=None):
+    """
+    Return the default probabilities implied by a contributions frame.
+
+    Parameters:
+    - contributions (pd.DataFrame): Rows of explain().
+    - model (object or None): Model explained; its calibrator, if any, is applied to the raw
+      probabilities so they match model_default_proba.
+
+    Returns:
+    - np.ndarray: Probabilities of default, one per row.
+    """
+    probabilities = 1.0 / (1.0 + np.exp(-contributions.to_numpy().sum(axis=1)))
+    # Pas d'isinstance : sous python -m, calibration est aussi chargé sous le nom __main__
+    calibrator = getattr(model, 'calibrator', None)
+    return probabilities if calibrator is None else calibrator.transform(probabilities)
+
+
+def top_reasons(contributions, n=5):
+    """
+    Return the n features weighing most on one decision.
+
+    Parameters:
+    - contributions (pd.Series): One row of explain() (bias included or not).
+    - n (int): Number of features returned.
+
+    Returns:
+    - pd.Series: Contributions sorted by absolute value (positive = towards default).
+    """
+    contributions = contributions.drop(BIAS_COLUMN, errors='ignore')
+    return contributions.loc[contributions.abs().sort_values(ascending=False).index[:n]]
+
+
+class ImportanceSummary:
+    """Running mean of the absolute contributions per feature (global importance), mergeable across batches."""
+
+    def __init__(self):
+        self.sums = None
+        self.count = 0
+
+    def update(self, contributions):
+        absolute = contributions.drop(columns=BIAS_COLUMN, errors='ignore').abs().sum()
+        self.sums = absolute if self.sums is None else self.sums.add(absolute, fill_value=0.0)
+        self.count += len(contributions)
+        return self
+
+    def merge(self, other):
+        if other.sums is not None:
+            self.sums = other.sums if self.sums is None else self.sums.add(other.sums, fill_value=0.0)
+        self.count += other.count
+        return self
+
+    def importance(self):
+        """Return the mean absolute contribution per feature, most important first."""
+        if self.sums is None:
+            return pd.Series(dtype=float)
+        return (self.sums / self.count).sort_values(ascending=False)
+
+
+def explain_chunks(model, transformer, chunks, num_threads=None):
+    """
+    Explain raw applicant chunks one after the other.
+
+    Yields:
+    - tuple: (chunk, calibrated probabilities, contributions)
+    """
+    for chunk in chunks:
+        contributions = explain(model, transformer.transform(chunk), transformer.column_names, num_threads)
+        yield chunk, probabilities_from(contributions, model), contributions
+
+
+def global_importance(model, transformer, data, chunksize=10_000):
+    """Return the ImportanceSummary of raw applicant rows, explained chunk by chunk."""
+    summary = ImportanceSummary()
+    chunks = (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+    for _, _, contributions in explain_chunks(model, transformer, chunks):
+        summary.update(contributions)
+    return summary
+
+
+def explain_file(input_path, output_path, model_dir=MODEL_DIR, chunksize=100_000, id_column='SK_ID_CURR',
+                 log=print):
+    """
+    Write the probability and per-feature contributions of every application of a file.
+
+    Returns:
+    - ImportanceSummary: Global importance over the whole file.
+    """
+    model, transformer = load_artifacts(model_dir)
+    columns = transformer.raw_features + ([id_column] if id_column else [])
+    writer = ScoreWriter(output_path)
+    summary = ImportanceSummary()
+    start = time.perf_counter()
+    total_rows = 0
+    try:
+        for chunk, probabilities, contributions in explain_chunks(model, transformer,
+                                                                  iter_chunks(input_path, chunksize, columns)):
+            contributions.insert(0, PROBABILITY_COLUMN, probabilities)
+            if id_column and id_column in chunk.columns:
+                contributions.insert(0, id_column, chunk[id_column].to_numpy())
+            writer.write(contributions)
+            summary.update(contributions.drop(columns=[PROBABILITY_COLUMN, id_column], errors='ignore'))
+            total_rows += len(chunk)
+            log(f"{total_rows} rows explained ({total_rows / (time.perf_counter() - start):,.0f} rows/s)")
+    finally:
+        writer.close()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain the default probability of loan applications.")
+    parser.add_argument('input', help="CSV or Parquet file of applications")
+    parser.add_argument('output', help="CSV or Parquet file receiving the contributions")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Directory holding the model artifacts")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows explained per batch")
+    parser.add_argument('--id-column', default='SK_ID_CURR', help="Identifier column copied to the output")
+    parser.add_argument('--importance', default=None, help="Write the global importance to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = explain_file(args.input, args.output, args.model_dir, args.chunksize, args.id_column,
+                           log=lambda message: print(message, file=sys.stderr))
+    importance = summary.importance()
+    print(importance.to_string())
+    if args.importance:
+        with open(args.importance, 'w') as f:
+            json.dump({'rows': summary.count, 'mean_abs_contribution': importance.to_dict()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Native LightGBM inference path with the min-max scaling folded into the trees.
+
+A split "x * scale + offset <= t" is rewritten as "x <= (t - offset) / scale", so the raw
+Booster predicts directly on the unscaled float32 matrix of the FeatureTransformer,
+without the sklearn wrapper nor a separate scaling step.
+
+Usage (from the repository root):
+    python -m app.scripts.fast_inference --model-dir model
+"""
+import argparse
+import os
+import re
+
+import lightgbm as lgb
+import numpy as np
+
+from .ModelRegistry import NATIVE_MODEL_FILE, resolve_model_dir
+from .calibration import load_calibration
+from .scoring import MODEL_DIR, _load_pickle, booster_of, load_transformer
+from .tracing import add, span
+
+# Bits de decision_type dans le format texte de LightGBM
+_CATEGORICAL_MASK = 1
+_MISSING_TYPE_SHIFT = 2
+_MISSING_NONE, _MISSING_ZERO, _MISSING_NAN = 0, 1, 2
+
+
+def _format(values):
+    return ' '.join(repr(float(value)) for value in values)
+
+
+def fold_scaling(model_text, scale, offset):
+    """
+    Rewrite the thresholds of a LightGBM text model trained on min-max scaled features.
+
+    Parameters:
+    - model_text (str): Model in LightGBM text format.
+    - scale (np.ndarray): Per-feature multiplier of the scaling.
+    - offset (np.ndarray): Per-feature offset of the scaling.
+
+    Returns:
+    - str: Model in text format predicting on unscaled features.
+    """
+    scale = np.asarray(scale, dtype=np.float64)
+    offset = np.asarray(offset, dtype=np.float64)
+    if (scale <= 0).any():
+        raise ValueError("Only strictly increasing scalings can be folded into the thresholds.")
+
+    def fold_infos(match):
+        infos = []
+        for j, info in enumerate(match.group(1).split(' ')):
+            bounds = re.fullmatch(r'\[(.+):(.+)\]', info)
+            if bounds:
+                low, high = (float(bound) for bound in bounds.groups())
+                info = f'[{(low - offset[j]) / scale[j]!r}:{(high - offset[j]) / scale[j]!r}]'
+            infos.append(info)
+        return 'feature_infos=' + ' '.join(infos)
+
+    def fold_tree(tree):
+        fields = dict(re.findall(r'^(split_feature|threshold|decision_type)=(.*)$', tree, flags=re.M))
+        if 'threshold' not in fields:
+            return tree  # arbre réduit à une feuille
+        features = np.array(fields['split_feature'].split(), dtype=np.int64)
+        thresholds = np.array(fields['threshold'].split(), dtype=np.float64)
+        decision_types = np.array(fields['decision_type'].split(), dtype=np.int64)
+
+        if (decision_types & _CATEGORICAL_MASK).any():
+            raise ValueError("Categorical splits cannot be folded.")
+        if (((decision_types >> _MISSING_TYPE_SHIFT) & 3) == _MISSING_ZERO).any():
+            raise ValueError("Splits treating zero as missing cannot be folded.")
+
+        folded = (thresholds - offset[features]) / scale[features]
+        return re.sub(r'^threshold=.*$', 'threshold=' + _format(folded), tree, count=1, flags=re.M)
+
+    model_text = re.sub(r'^feature_infos=(.*)$', fold_infos, model_text, count=1, flags=re.M)
+    # Les tailles d'arbres en octets changent avec les seuils : LightGBM relit alors les arbres séquentiellement
+    model_text = re.sub(r'^tree_sizes=.*\n', '', model_text, count=1, flags=re.M)
+    parts = re.split(r'(?=^Tree=\d+$)', model_text, flags=re.M)
+    return ''.join(fold_tree(part) if part.startswith('Tree=') else part for part in parts)
+
+
+def missing_value_fill(model_text, scale, offset):
+    """
+    Return the raw value to substitute for NaN, per feature, in the folded model.
+
+    Splits without a NaN missing type send NaN to the branch of 0 in the space the model was
+    trained in, i.e. the training minimum -offset / scale in the unscaled space. The value is
+    taken one float32 step below so that float32 rounding never moves it past a threshold
+    placed just above the minimum. Features with NaN-aware splits keep NaN.
+    """
+    minimum = (-np.asarray(offset, dtype=np.float64) / np.asarray(scale, dtype=np.float64)).astype(np.float32)
+    fill = np.nextafter(minimum, np.float32(-np.inf))
+    for features, decision_types in re.findall(r'^split_feature=(.*)\n(?:.*\n)*?decision_type=(.*)$',
+                                               model_text, flags=re.M):
+        features = np.array(features.split(), dtype=np.int64)
+        missing = (np.array(decision_types.split(), dtype=np.int64) >> _MISSING_TYPE_SHIFT) & 3
+        fill[features[missing == _MISSING_NAN]] = np.nan
+    return fill
+
+
+def export_native_model(model_dir=MODEL_DIR):
+    """
+    Export lgb_model.pkl to lgb_model.txt with the scaling of the transformer folded in.
+
+    Parameters:
+    - model_dir (str): Directory holding the model artifacts.
+
+    Returns:
+    - str: Path of the written text model.
+    """
+    model_dir = resolve_model_dir(model_dir)
+    model = _load_pickle(model_dir, 'lgb_model.pkl')
+    transformer = load_transformer(model_dir)
+    folded = fold_scaling(booster_of(model).model_to_string(), transformer.scale, transformer.offset)
+
+    path = os.path.join(model_dir, NATIVE_MODEL_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(folded)
+    os.replace(tmp_path, path)
+    return path
+
+
+class FastPredictor:
+    """Raw Booster predicting on the unscaled float32 matrix of a FeatureTransformer."""
+
+    def __init__(self, booster, transformer, nan_fill, num_threads=None, calibrator=None):
+        self.booster = booster
+        self.transformer = transformer
+        self.nan_fill = nan_fill
+        self.calibrator = calibrator
+        # None : un seul thread pour les petits lots (démarrage OpenMP coûteux), tous au-delà
+        self.num_threads = num_threads
+
+    def features(self, data):
+        matrix = self.transformer.transform(data, scale=False)
+        missing = np.isnan(matrix)
+        if missing.any():
+            matrix[missing] = np.take(self.nan_fill, np.nonzero(missing)[1])
+        return matrix
+
+    def predict_default_proba(self, data):
+        """Return the probability of default for raw applicant data (see FeatureTransformer.transform)."""
+        return self.predict_features(self.features(data))
+
+    def predict_features(self, features):
+        """Return the probability of default for a matrix built by features()."""
+        num_threads = self.num_threads
+        if num_threads is None:
+            num_threads = 1 if len(features) < 1000 else 0
+        with span('fast_inference.predict', rows=len(features)):
+            add('scoring.rows_scored', len(features))
+            probabilities = self.booster.predict(features, num_threads=num_threads)
+            return probabilities if self.calibrator is None else self.calibrator.transform(probabilities)
+
+
+def load_fast_predictor(model_dir=MODEL_DIR):
+    """
+    Load the native model of a model directory, exporting it first if needed.
+
+    Parameters:
+    - model_dir (str): Directory holding the model artifacts.
+
+    Returns:
+    - FastPredictor: Predictor on raw applicant data.
+    """
+    model_dir = resolve_model_dir(model_dir)
+    path = os.path.join(model_dir, NATIVE_MODEL_FILE)
+    pickled_path = os.path.join(model_dir, 'lgb_model.pkl')
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(pickled_path):
+        export_native_model(model_dir)
+
+    transformer = load_transformer(model_dir)
+    with open(path) as f:
+        model_text = f.read()
+    booster = lgb.Booster(model_str=model_text)
+    return FastPredictor(booster, transformer, missing_value_fill(model_text, transformer.scale, transformer.offset),
+                         calibrator=load_calibration(model_dir))
+
+
+def random_applicants(transformer, n_rows, seed=22):
+    """Draw raw applicants covering the training ranges of every feature, with some missing values."""
+    rng = np.random.default_rng(seed)
+    low = -transformer.offset.astype(np.float64) / transformer.scale
+    high = (1 - transformer.offset.astype(np.float64)) / transformer.scale
+    columns = {}
+    for column, kind, target in transformer._plan:
+        if column not in transformer.raw_features:
+            # Variables dérivées : calculées par le transformer à partir des colonnes brutes
+            continue
+        if kind == 'one_hot':
+            columns[column] = rng.choice(list(target), n_rows)
+        elif kind == 'binary':
+            columns[column] = rng.choice(list(target[1]), n_rows)
+        else:
+            values = rng.uniform(low[target], high[target], n_rows)
+            if kind == 'age':
+                values = -values * 365
+            values[rng.random(n_rows) < 0.1] = np.nan
+            columns[column] = values
+    return columns
+
+
+def check_parity(model_dir=MODEL_DIR, n_rows=100_000, tolerance=1e-6):
+    """
+    Compare the fast path with the pickled LGBMClassifier on random applicants.
+
+    Returns:
+    - dict: Maximum absolute difference and share of rows above the tolerance.
+    """
+    from .scoring import load_artifacts, predict_default_proba
+
+    model, transformer = load_artifacts(model_dir)
+    fast = load_fast_predictor(model_dir)
+    data = random_applicants(transformer, n_rows)
+
+    expected = predict_default_proba(model, transformer, data)
+    actual = fast.predict_default_proba(data)
+    differences = np.abs(expected - actual)
+    return {'rows': n_rows, 'max_abs_diff': float(differences.max()),
+            'share_above_tolerance': float((differences > tolerance).mean())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the native LightGBM model and check its parity.")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Directory holding the model artifacts")
+    parser.add_argument('--rows', type=int, default=100_000, help="Random applicants used for the parity check")
+    args = parser.parse_args(argv)
+
+    print("Exported", export_native_model(args.model_dir))
+    print("Parity:", check_parity(args.model_dir, args.rows))
+
+
+if __name__ == '__main__':
+    main()
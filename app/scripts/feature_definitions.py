@@ -0,0 +1,259 @@
+"""
+Declarative definitions of the features derived from the raw application columns.
+
+Training and serving build the model matrix from the same definitions: the FeatureTransformer
+fitted at training time keeps a copy of them (feature_transformer.pkl) and computes the derived
+columns of every request, vectorized, before encoding it. A model therefore keeps the
+definitions it was trained with even if FEATURE_DEFINITIONS changes later.
+
+- sentinels: placeholder values replaced by a missing value, with a 0/1 flag column so the
+  information is not lost. DAYS_EMPLOYED = 365243 (1000 years) marks applicants without a
+  salaried job, pensioners for the most part; converted to years it would be -1000.
+- ratios: numerator / denominator of two raw columns, missing when the denominator is 0 or
+  missing.
+
+The training pipeline reads its CSV through feature_chunks: the raw columns (sentinels cleaned)
+and the derived columns are written once to an Arrow file in the .cache directory next to the
+CSV, named after a hash of the definitions and of the columns read. Retraining, or scoring the
+same file again, reads that memory-mapped file instead of parsing the CSV and recomputing the
+features. Changing a definition changes the hash, so a stale cache is never read.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .tracing import add, span
+
+FEATURE_DEFINITIONS = {
+    'sentinels': {
+        'DAYS_EMPLOYED': {'value': 365243, 'flag': 'DAYS_EMPLOYED_ANOMALY'},
+    },
+    'ratios': {
+        'CREDIT_INCOME_RATIO': ['AMT_CREDIT', 'AMT_INCOME_TOTAL'],
+        'ANNUITY_INCOME_RATIO': ['AMT_ANNUITY', 'AMT_INCOME_TOTAL'],
+        'GOODS_CREDIT_RATIO': ['AMT_GOODS_PRICE', 'AMT_CREDIT'],
+    },
+}
+
+
+def definitions_hash(definitions=FEATURE_DEFINITIONS, columns=()):
+    """Return a short digest of the definitions (and of the raw columns read), stable across processes."""
+    payload = json.dumps({'definitions': definitions, 'columns': sorted(columns)}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def input_columns(definitions=FEATURE_DEFINITIONS):
+    """Return the raw columns the definitions are computed from."""
+    columns = list(definitions.get('sentinels', {}))
+    for numerator, denominator in definitions.get('ratios', {}).values():
+        columns += [numerator, denominator]
+    return list(dict.fromkeys(columns))
+
+
+def derived_columns(definitions=FEATURE_DEFINITIONS):
+    """Return the columns added by the definitions: sentinel flags, then ratios."""
+    flags = [spec['flag'] for spec in definitions.get('sentinels', {}).values()]
+    return flags + list(definitions.get('ratios', {}))
+
+
+def dependencies(definitions=FEATURE_DEFINITIONS):
+    """Return, for every column computed by the definitions (cleaned raw columns included), its raw inputs."""
+    result = {}
+    for column, spec in definitions.get('sentinels', {}).items():
+        result[column] = [column]
+        result[spec['flag']] = [column]
+    for name, (numerator, denominator) in definitions.get('ratios', {}).items():
+        result[name] = [numerator, denominator]
+    return result
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind in 'fiub':
+        return values.astype(np.float64, copy=False)
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _present(columns, name):
+    return name in columns and columns[name] is not None
+
+
+def compute_features(columns, definitions=FEATURE_DEFINITIONS):
+    """
+    Clean the sentinel values and compute the derived columns, vectorized.
+
+    Derived columns already present (chunks read from the feature cache) are not recomputed,
+    nor are the sentinels of a column whose flag is present.
+
+    Parameters:
+    - columns (pd.DataFrame or dict): Column name -> 1-D array; absent raw columns (or None)
+      give missing derived values.
+    - definitions (dict): Feature definitions.
+
+    Returns:
+    - dict: Column name -> float32 array of every computed column (cleaned raw columns included).
+    """
+    if isinstance(columns, pd.DataFrame):
+        n_rows = len(columns)
+    else:
+        n_rows = next((len(values) for values in columns.values() if values is not None), 0)
+    cleaned = {}
+
+    def raw(column):
+        if column in cleaned:
+            return cleaned[column]
+        if not _present(columns, column):
+            return np.full(n_rows, np.nan)
+        return _as_float(columns[column])
+
+    for column, spec in definitions.get('sentinels', {}).items():
+        if _present(columns, spec['flag']) or not _present(columns, column):
+            continue
+        values = raw(column)
+        is_sentinel = values == spec['value']
+        cleaned[column] = np.where(is_sentinel, np.nan, values)
+        cleaned[spec['flag']] = is_sentinel.astype(np.float64)
+
+    computed = dict(cleaned)
+    for name, (numerator, denominator) in definitions.get('ratios', {}).items():
+        if _present(columns, name):
+            continue
+        denominators = raw(denominator)
+        # Division limitée aux dénominateurs non nuls : pas d'avertissement, les autres lignes restent manquantes
+        computed[name] = np.divide(raw(numerator), denominators, out=np.full(n_rows, np.nan),
+                                   where=denominators != 0)
+    return {column: values.astype(np.float32) for column, values in computed.items()}
+
+
+def add_features(frame, definitions=FEATURE_DEFINITIONS):
+    """Return a DataFrame of raw rows with the sentinels cleaned and the derived columns added."""
+    computed = compute_features(frame, definitions)
+    return frame.assign(**computed) if computed else frame
+
+
+def feature_cache_paths(csv_path, columns, definitions=FEATURE_DEFINITIONS):
+    """Return the (arrow, metadata) paths of the feature cache of a CSV, columns and definitions."""
+    from .dataset_store import CACHE_DIR_NAME
+
+    directory = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR_NAME)
+    stem = f"{os.path.splitext(os.path.basename(csv_path))[0]}.features-{definitions_hash(definitions, columns)}"
+    return os.path.join(directory, f'{stem}.arrow'), os.path.join(directory, f'{stem}.meta.json')
+
+
+def _cache_is_fresh(arrow_path, meta_path, fingerprint):
+    if not os.path.exists(arrow_path):
+        return False
+    try:
+        with open(meta_path) as f:
+            return json.load(f).get('fingerprint') == fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def _cache_schema(chunk, computed_columns):
+    from .dataset_schema import column_kind
+
+    # Types fixés sur le premier bloc : un entier avec des manquants dans un bloc suivant reste un
+    # entier (nullable), les colonnes calculées sont en float32
+    fields = []
+    for name in chunk.columns:
+        if name in computed_columns:
+            kind = pa.float32()
+        else:
+            kind = {'category': pa.string(), 'int': pa.int64(), 'bool': pa.int64()}.get(
+                column_kind(name, chunk[name]), pa.float64())
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def _write_through(chunks, arrow_path, meta_path, fingerprint, source, definitions):
+    # Les blocs sont transmis au fur et à mesure et écrits dans le cache pendant le premier parcours
+    tmp_path = f'{arrow_path}.{os.getpid()}.tmp'
+    computed_columns = set(dependencies(definitions))
+    try:
+        os.makedirs(os.path.dirname(arrow_path), exist_ok=True)
+        sink = pa.OSFile(tmp_path, 'wb')
+    except OSError:
+        # Répertoire du cache non accessible en écriture : lecture sans cache
+        sink = None
+    writer = None
+    n_rows = 0
+    try:
+        for chunk in chunks:
+            if sink is not None:
+                try:
+                    if writer is None:
+                        schema = _cache_schema(chunk, computed_columns)
+                        writer = ipc.new_file(sink, schema)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    n_rows += len(chunk)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Valeurs incompatibles avec les types du premier bloc : la lecture continue sans cache
+                    sink.close()
+                    os.remove(tmp_path)
+                    sink = None
+            yield chunk
+
+        if sink is not None and writer is not None:
+            writer.close()
+            sink.close()
+            sink = None
+            os.replace(tmp_path, arrow_path)
+            tmp_meta = f'{meta_path}.{os.getpid()}.tmp'
+            with open(tmp_meta, 'w') as f:
+                json.dump({'source': os.path.abspath(source), 'fingerprint': fingerprint, 'num_rows': n_rows,
+                           'definitions': definitions}, f)
+            os.replace(tmp_meta, meta_path)
+            add('feature_definitions.cache_builds')
+    finally:
+        if sink is not None:
+            # Parcours interrompu ou fichier vide : pas de cache partiel
+            sink.close()
+            os.remove(tmp_path)
+
+
+def feature_chunks(csv_path, columns, chunksize=100_000, definitions=FEATURE_DEFINITIONS, cache=True):
+    """
+    Yield the raw columns of a CSV with the derived features, as DataFrames of at most chunksize rows.
+
+    The first pass parses the CSV, computes the features and writes the feature cache while
+    yielding the chunks; the next passes read the memory-mapped cache.
+
+    Parameters:
+    - csv_path (str): Source CSV file.
+    - columns (list): Raw columns to read; columns absent from the file are ignored.
+    - chunksize (int): Number of rows per chunk.
+    - definitions (dict): Feature definitions.
+    - cache (bool): Read and write the feature cache.
+
+    Yields:
+    - pd.DataFrame: Raw rows (sentinels cleaned) followed by the derived columns.
+    """
+    from .dataset_store import source_fingerprint
+
+    wanted = list(dict.fromkeys(list(columns) + input_columns(definitions)))
+    arrow_path, meta_path = feature_cache_paths(csv_path, wanted, definitions)
+    fingerprint = source_fingerprint(csv_path)
+
+    if cache and _cache_is_fresh(arrow_path, meta_path, fingerprint):
+        add('feature_definitions.cache_hits')
+        table = ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas()
+        return
+
+    def computed_chunks():
+        selected = set(wanted)
+        with span('feature_definitions.read_csv', path=csv_path):
+            for chunk in pd.read_csv(csv_path, usecols=lambda name: name in selected, chunksize=chunksize):
+                yield add_features(chunk, definitions)
+
+    if cache:
+        yield from _write_through(computed_chunks(), arrow_path, meta_path, fingerprint, csv_path, definitions)
+    else:
+        yield from computed_chunks()
@@ -0,0 +1,328 @@
+"""
+Hyperparameter search with k-fold cross-validation for the LightGBM default model.
+
+The training rows are encoded and binned once (see my_credit_risk_model) and the binned
+LightGBM Dataset is saved with save_binary; every worker of the process pool loads that file,
+so no trial pays for re-binning. Each trial runs lgb.cv with early stopping.
+
+Strategies:
+- random: every sampled configuration is cross-validated with the full round budget,
+- halving: successive halving, all configurations start with a small round budget and only
+  the best 1/eta of them go on to a budget eta times larger.
+
+Every finished trial is appended to a JSONL checkpoint with a fingerprint of the training data
+and the cross-validation settings; rerunning the same command skips the trials already recorded
+with the same ones, so an interrupted search resumes where it stopped. The best configuration is
+refitted on the training rows and saved in the model/ layout, in model_candidate/ by default so
+the served model is not replaced: register it to serve it (see registry_cli).
+
+Usage (from the repository root):
+    python -m app.scripts.hyperparameter_search --data data/application_train.csv --trials 30 --workers 4
+    python -m app.scripts.registry_cli register model_candidate --data data/application_train.csv --activate
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from .my_credit_risk_model import (DEFAULT_DATA_PATH, MODEL_PARAMS, RANDOM_STATE, StageReport, build_dataset,
+                                   calibrate, predict_rows, prepare_training_matrix, save_artifacts,
+                                   save_calibrator)
+from .dataset_store import source_fingerprint
+from .drift_monitoring import save_reference
+from .tracing import traced
+
+CHECKPOINT_FILE = 'search_trials.jsonl'
+# Dossier du meilleur modèle, distinct du modèle servi (model/)
+CANDIDATE_DIR = 'model_candidate'
+# Un essai du checkpoint n'est repris que si ces champs sont identiques
+RESUME_KEYS = ('params', 'nfold', 'early_stopping_rounds', 'seed', 'data')
+
+# (loi, borne basse, borne haute) ; les paramètres de binning (max_bin...) sont exclus,
+# le Dataset étant construit une seule fois
+SEARCH_SPACE = {
+    'num_leaves': ('int_log', 8, 256),
+    'learning_rate': ('log', 0.01, 0.3),
+    'min_data_in_leaf': ('int_log', 5, 500),
+    'feature_fraction': ('uniform', 0.5, 1.0),
+    'bagging_fraction': ('uniform', 0.5, 1.0),
+    'lambda_l2': ('log', 1e-3, 10.0),
+}
+
+# min_data_in_leaf varie d'un essai à l'autre : pas de filtrage des features à la construction
+DATASET_PARAMS = {'verbosity': -1, 'feature_pre_filter': False}
+
+# Dataset binaire chargé une seule fois par processus de travail
+_worker_dataset = None
+
+
+def sample_params(rng, space=SEARCH_SPACE):
+    """Draw one configuration from the search space."""
+    params = {}
+    for name, (law, low, high) in space.items():
+        if law == 'uniform':
+            params[name] = float(rng.uniform(low, high))
+        elif law == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = int(round(np.exp(rng.uniform(np.log(low), np.log(high)))))
+    params['bagging_freq'] = 1
+    return params
+
+
+def sample_configurations(n_trials, seed=RANDOM_STATE):
+    """Draw the configurations of a search; the same seed always gives the same trials."""
+    rng = np.random.default_rng(seed)
+    return [sample_params(rng) for _ in range(n_trials)]
+
+
+def _init_worker(binary_path):
+    global _worker_dataset
+    _worker_dataset = lgb.Dataset(binary_path, params=DATASET_PARAMS)
+
+
+def _run_trial(trial):
+    params = {**MODEL_PARAMS, **trial['params'], 'seed': trial['seed'], 'metric': 'auc',
+              'num_threads': trial['num_threads']}
+    start = time.perf_counter()
+    history = lgb.cv(params, _worker_dataset, num_boost_round=trial['budget'], nfold=trial['nfold'],
+                     stratified=True, seed=trial['seed'],
+                     callbacks=[lgb.early_stopping(trial['early_stopping_rounds'], verbose=False)])
+    # Avec l'arrêt anticipé, l'historique s'arrête à la meilleure itération
+    auc_mean, auc_std = history['valid auc-mean'], history['valid auc-stdv']
+    return {**trial, 'auc_mean': float(auc_mean[-1]), 'auc_std': float(auc_std[-1]),
+            'best_iteration': len(auc_mean), 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def load_checkpoint(path):
+    """Return the finished trials of a checkpoint, keyed by (trial_id, budget)."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # Dernière ligne tronquée par une interruption
+                continue
+            done[(result['trial_id'], result['budget'])] = result
+    return done
+
+
+class TrialRunner:
+    """
+    Cross-validate configurations on a process pool and record the results in a checkpoint.
+
+    Parameters:
+    - executor (ProcessPoolExecutor): Pool whose workers hold the binned Dataset.
+    - checkpoint_path (str): JSONL file of finished trials.
+    - nfold (int): Number of cross-validation folds.
+    - early_stopping_rounds (int): Rounds without AUC improvement that stop a trial.
+    - num_threads (int): LightGBM threads per trial.
+    - log (callable): Progress reporting function.
+    - seed (int): Seed of the cross-validation folds and of LightGBM.
+    - data_fingerprint (dict or None): Path, size, modification time and row count of the
+      training data; trials recorded on other data are run again.
+    """
+
+    def __init__(self, executor, checkpoint_path, nfold=5, early_stopping_rounds=20, num_threads=1, log=print,
+                 seed=RANDOM_STATE, data_fingerprint=None):
+        self.executor = executor
+        self.checkpoint_path = checkpoint_path
+        self.nfold = nfold
+        self.early_stopping_rounds = early_stopping_rounds
+        self.num_threads = num_threads
+        self.log = log
+        self.seed = seed
+        self.data_fingerprint = data_fingerprint
+        self.done = load_checkpoint(checkpoint_path)
+
+    def run(self, configurations, budget):
+        """
+        Cross-validate (trial_id, params) pairs with a round budget.
+
+        Returns:
+        - list of dict: One result per configuration, in the input order.
+        """
+        results = {}
+        pending = []
+        for trial_id, params in configurations:
+            trial = {'trial_id': trial_id, 'params': params, 'budget': budget, 'nfold': self.nfold,
+                     'early_stopping_rounds': self.early_stopping_rounds, 'seed': self.seed,
+                     'data': self.data_fingerprint, 'num_threads': self.num_threads}
+            previous = self.done.get((trial_id, budget))
+            # Reprise : un essai déjà enregistré avec les mêmes paramètres, données et réglages de
+            # validation croisée n'est pas relancé
+            if previous is not None and all(previous.get(key) == trial[key] for key in RESUME_KEYS):
+                results[trial_id] = previous
+            else:
+                pending.append(trial)
+        if len(pending) < len(configurations):
+            self.log(f"Budget {budget}: {len(configurations) - len(pending)} trials resumed from the checkpoint")
+
+        with open(self.checkpoint_path, 'a') as checkpoint:
+            for result in self.executor.map(_run_trial, pending):
+                checkpoint.write(json.dumps(result) + '\n')
+                checkpoint.flush()
+                self.done[(result['trial_id'], budget)] = result
+                results[result['trial_id']] = result
+                self.log(f"Trial {result['trial_id']:>3} budget {budget}: AUC {result['auc_mean']:.4f} "
+                         f"± {result['auc_std']:.4f} ({result['best_iteration']} rounds, {result['seconds']:.1f}s)")
+        return [results[trial_id] for trial_id, _ in configurations]
+
+
+def random_search(runner, configurations, max_rounds):
+    """Cross-validate every configuration with the full budget."""
+    return runner.run(list(enumerate(configurations)), max_rounds)
+
+
+def successive_halving(runner, configurations, min_rounds, max_rounds, eta=3):
+    """
+    Keep the best 1/eta configurations of each rung and multiply their budget by eta.
+
+    Returns:
+    - list of dict: Results of every rung.
+    """
+    survivors = list(enumerate(configurations))
+    budget = min_rounds
+    all_results = []
+    while True:
+        results = runner.run(survivors, budget)
+        all_results += results
+        if budget >= max_rounds or len(survivors) <= 1:
+            return all_results
+        ranked = sorted(results, key=lambda result: result['auc_mean'], reverse=True)
+        kept = {result['trial_id'] for result in ranked[:max(1, len(survivors) // eta)]}
+        survivors = [(trial_id, params) for trial_id, params in survivors if trial_id in kept]
+        budget = min(budget * eta, max_rounds)
+
+
+def best_result(results):
+    # À AUC égale, le plus gros budget l'emporte
+    return max(results, key=lambda result: (result['auc_mean'], result['budget']))
+
+
+@traced('hyperparameter_search.run_search')
+def run_search(data_path=DEFAULT_DATA_PATH, output_dir=CANDIDATE_DIR, strategy='halving', n_trials=30, nfold=5,
+               min_rounds=50, max_rounds=1000, eta=3, early_stopping_rounds=20, workers=None,
+               checkpoint_path=None, chunksize=100_000, work_dir=None, seed=RANDOM_STATE, log=print):
+    """
+    Search the LightGBM parameters, then refit and save the best model.
+
+    Parameters:
+    - data_path (str): Training CSV.
+    - output_dir (str): Directory receiving the model artifacts of the best configuration
+      (not the served model directory: register it with registry_cli to serve it).
+    - strategy (str): 'random' or 'halving'.
+    - n_trials (int): Number of sampled configurations.
+    - nfold (int): Number of cross-validation folds.
+    - min_rounds (int): Round budget of the first successive halving rung.
+    - max_rounds (int): Largest round budget.
+    - eta (int): Successive halving reduction factor.
+    - early_stopping_rounds (int): Rounds without AUC improvement that stop a trial.
+    - workers (int or None): Processes of the pool (CPU count if None).
+    - checkpoint_path (str or None): JSONL checkpoint, output_dir/search_trials.jsonl if None.
+    - chunksize (int): Rows read per chunk when encoding the CSV.
+    - work_dir (str or None): Directory of the temporary matrix and binned Dataset.
+    - seed (int): Seed of the configuration sampling, of the cross-validation folds and of LightGBM.
+    - log (callable): Progress reporting function.
+
+    Returns:
+    - dict: Best configuration, CV and test AUC and per-stage report.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or os.path.join(output_dir, CHECKPOINT_FILE)
+    report = StageReport(log)
+    configurations = sample_configurations(n_trials, seed)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        data = prepare_training_matrix(data_path, tmp_dir, chunksize, report)
+        matrix, labels = data['matrix'], data['labels']
+        data_fingerprint = {'path': os.path.abspath(data_path), **source_fingerprint(data_path), 'rows': len(labels)}
+
+        with report.stage('bin dataset'):
+            binary_path = os.path.join(tmp_dir, 'train.bin')
+            dataset = build_dataset(matrix, labels, data['train_idx'], params=DATASET_PARAMS)
+            dataset.construct()
+            dataset.save_binary(binary_path)
+            del dataset
+
+        with report.stage('search'):
+            num_threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(binary_path,)) as executor:
+                runner = TrialRunner(executor, checkpoint_path, nfold, early_stopping_rounds, num_threads, log,
+                                     seed, data_fingerprint)
+                if strategy == 'random':
+                    results = random_search(runner, configurations, max_rounds)
+                else:
+                    results = successive_halving(runner, configurations, min_rounds, max_rounds, eta)
+            best = best_result(results)
+
+        with report.stage('refit'):
+            params = {**MODEL_PARAMS, **best['params'], 'seed': seed}
+            booster = lgb.train(params, lgb.Dataset(binary_path, params=DATASET_PARAMS),
+                                num_boost_round=best['best_iteration'])
+            test_idx = data['test_idx']
+            prob_test = predict_rows(booster, matrix, test_idx)
+            auc_score_test = roc_auc_score(labels[test_idx], prob_test)
+
+        with report.stage('calibrate'):
+            calibrator, calibration_result = calibrate(prob_test, labels[test_idx])
+        transformer, scaler, profile = data['transformer'], data['scaler'], data['profile']
+        profile.update_scores(calibrator.transform(prob_test))
+        del matrix, data
+
+    with report.stage('save'):
+        save_artifacts(output_dir, booster, scaler, transformer)
+        save_reference(profile, output_dir)
+        save_calibrator(output_dir, calibrator)
+
+    result = {'strategy': strategy, 'n_trials': n_trials, 'nfold': nfold, 'params': params,
+              'num_boost_round': best['best_iteration'], 'auc_cv': best['auc_mean'], 'auc_cv_std': best['auc_std'],
+              'auc_test': float(auc_score_test), 'calibration': calibration_result, 'checkpoint': checkpoint_path,
+              'stages': report.stages}
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search of the LightGBM model.")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="Training CSV (application_train.csv layout)")
+    parser.add_argument('--output-dir', default=CANDIDATE_DIR,
+                        help="Directory receiving the best model artifacts (register it to serve it)")
+    parser.add_argument('--strategy', choices=['random', 'halving'], default='halving')
+    parser.add_argument('--trials', type=int, default=30, help="Number of sampled configurations")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--min-rounds', type=int, default=50, help="Round budget of the first halving rung")
+    parser.add_argument('--max-rounds', type=int, default=1000)
+    parser.add_argument('--eta', type=int, default=3, help="Successive halving reduction factor")
+    parser.add_argument('--early-stopping-rounds', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--checkpoint', default=None, help="JSONL file of finished trials (resumed if present)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows read per chunk")
+    parser.add_argument('--work-dir', default=None, help="Directory of the temporary matrix and binned Dataset")
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE, help="Seed of the configuration sampling, CV folds and LightGBM")
+    args = parser.parse_args(argv)
+
+    result = run_search(args.data, args.output_dir, args.strategy, args.trials, args.folds, args.min_rounds,
+                        args.max_rounds, args.eta, args.early_stopping_rounds, args.workers, args.checkpoint,
+                        args.chunksize, args.work_dir, args.seed)
+
+    print(f"Best CV AUC: {result['auc_cv']:.4f} ± {result['auc_cv_std']:.4f} "
+          f"({result['num_boost_round']} rounds)")
+    print(f"Test AUC Score: {result['auc_test']:.4f}")
+    print(json.dumps(result['params'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Append-only ingestion of loan application batches into a partition store.
+
+Every batch becomes an uncompressed Arrow IPC partition (compact dtypes of dataset_schema, same
+schema as the first partition) listed in manifest.json. Integer columns are stored as int32 at
+least: the first batch fixes the schema of the store, so its value ranges must not fix the width
+(a count of 348 in a later batch would not fit the int8 of a first batch with small counts). The manifest also keeps a watermark:
+the largest value of the watermark column (SK_ID_CURR by default) ingested so far. Rows at or
+below the watermark are skipped, so replaying a batch does not duplicate it. Partitions and
+manifest are written atomically; a single writer is expected.
+
+Readers (dataset_store, PartitionedDataset) only open the partitions they have not seen yet.
+
+Usage (from the repository root):
+    python -m app.scripts.ingestion data/application_train.csv
+    python -m app.scripts.ingestion nouvelles_demandes.csv --store data/partitions
+"""
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from .PartitionedDataset import MANIFEST_FILE, read_manifest
+from .dataset_schema import compact_dtypes
+from .dataset_store import DEFAULT_STORE_PATH
+
+DEFAULT_WATERMARK_COLUMN = 'SK_ID_CURR'
+# Largeur minimale des entiers du magasin, indépendante des valeurs du premier lot
+STORE_INTEGER_TYPE = np.int32
+
+
+def _write_atomic(path, write):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _store_schema(store_dir, manifest):
+    if not manifest['partitions']:
+        return None
+    with pa.memory_map(os.path.join(store_dir, manifest['partitions'][0]['name']), 'r') as source:
+        return ipc.open_file(source).schema
+
+
+def _normalize(table):
+    # Index int32 pour toutes les colonnes dictionnaire : une partition ultérieure avec plus de
+    # modalités garde le même schéma
+    fields = [pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+              if pa.types.is_dictionary(field.type) else field for field in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+def conform(table, schema):
+    """
+    Cast a batch to the schema of the store (column order, types, dictionary encoding).
+
+    Columns missing from the batch are filled with nulls; columns unknown to the store raise
+    a ValueError.
+    """
+    unknown = [name for name in table.column_names if name not in schema.names]
+    if unknown:
+        raise ValueError(f"Columns {unknown} are not in the dataset schema.")
+
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+            continue
+        column = table.column(field.name)
+        if column.type == field.type:
+            columns.append(column)
+        elif column.null_count == len(column):
+            columns.append(pa.nulls(table.num_rows, field.type))
+        elif pa.types.is_dictionary(field.type):
+            values = column.cast(pa.string()) if pa.types.is_dictionary(column.type) else column
+            columns.append(pc.dictionary_encode(values.cast(field.type.value_type)).cast(field.type))
+        else:
+            try:
+                columns.append(column.cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Column '{field.name}' cannot be stored as {field.type}: {e}") from e
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def ingest(batch, store_dir=DEFAULT_STORE_PATH, watermark_column=DEFAULT_WATERMARK_COLUMN, source=None):
+    """
+    Append a batch of applications to the store as a new partition.
+
+    Parameters:
+    - batch (str or pd.DataFrame): CSV file or DataFrame of new applications.
+    - store_dir (str): Partition store directory (created on the first batch).
+    - watermark_column (str): Monotonic identifier column used to skip already ingested rows.
+    - source (str or None): Description of the batch recorded in the manifest.
+
+    Returns:
+    - dict or None: Manifest entry of the new partition, None if every row was already ingested.
+    """
+    if isinstance(batch, str):
+        source = source or os.path.basename(batch)
+        batch = pd.read_csv(batch)
+    manifest = read_manifest(store_dir)
+    if manifest['partitions']:
+        watermark_column = manifest.get('watermark_column')
+    watermark = manifest.get('watermark')
+
+    # Filigrane : les lignes déjà ingérées (identifiant <= filigrane) sont ignorées
+    if watermark_column and watermark_column in batch.columns:
+        if watermark is not None:
+            batch = batch[batch[watermark_column] > watermark]
+        if len(batch):
+            watermark = batch[watermark_column].max().item()
+    if not len(batch):
+        return None
+
+    # Types compacts du cache Arrow du CSV (catégories, booléens, float32), entiers en int32 au moins
+    table = pa.Table.from_pandas(compact_dtypes(batch, STORE_INTEGER_TYPE), preserve_index=False)
+    schema = _store_schema(store_dir, manifest)
+    table = _normalize(table) if schema is None else conform(table, schema)
+
+    os.makedirs(store_dir, exist_ok=True)
+    name = f'part-{len(manifest["partitions"]):06d}.arrow'
+
+    def write_partition(path):
+        with pa.OSFile(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _write_atomic(os.path.join(store_dir, name), write_partition)
+
+    entry = {'name': name, 'rows': table.num_rows, 'source': source,
+             'ingested_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')}
+    manifest['partitions'].append(entry)
+    manifest['watermark_column'] = watermark_column
+    manifest['watermark'] = watermark
+
+    def write_manifest(path):
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    # Le manifeste est écrit en dernier : un lecteur ne voit jamais une partition incomplète
+    _write_atomic(os.path.join(store_dir, MANIFEST_FILE), write_manifest)
+    return entry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append application batches to the partition store.")
+    parser.add_argument('batches', nargs='+', help="CSV files of new applications, ingested in order")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="Partition store directory")
+    parser.add_argument('--watermark-column', default=DEFAULT_WATERMARK_COLUMN,
+                        help="Monotonic identifier column (used when the store is created)")
+    args = parser.parse_args(argv)
+
+    for batch in args.batches:
+        entry = ingest(batch, args.store, args.watermark_column)
+        if entry is None:
+            print(f"{batch}: no new rows (already ingested)")
+        else:
+            print(f"{batch}: {entry['rows']} rows -> {entry['name']}")
+    manifest = read_manifest(args.store)
+    print(f"{len(manifest['partitions'])} partitions, watermark {manifest['watermark_column']} = {manifest['watermark']}")
+
+
+if __name__ == '__main__':
+    main()
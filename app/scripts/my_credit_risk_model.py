@@ -1,102 +1,404 @@
-import pandas as pd
+"""
+Training pipeline of the LightGBM default model.
+
+The CSV is read in chunks restricted to used_features and is never held in memory as a whole.
+The derived features of FEATURE_DEFINITIONS (sentinels cleaned, ratios) are added to every chunk
+and cached on disk during the first pass (see feature_definitions), so the second pass and later
+trainings on the same file read the cache instead of the CSV:
+1. fit the FeatureTransformer (vocabularies, training means) in one pass,
+2. encode the chunks into a float32 memory-mapped matrix on disk,
+3. scale it in place with a MinMaxScaler fitted on the training rows,
+4. build the LightGBM Dataset from that matrix batch by batch (lgb.Sequence) and train,
+5. compute the ROC AUC on the train and test rows, predicted by batches,
+6. calibrate the held-out probabilities and choose the cost-based decision threshold
+   (see calibration).
+
+The reference profile used by drift_monitoring (binned training distributions and held-out
+default probabilities) is collected during the same passes.
+
+Wall-clock time and peak memory are reported for every stage.
+
+Usage (from the repository root):
+    python -m app.scripts.my_credit_risk_model --data data/application_train.csv --output-dir model
+
+With --registry the artifacts are registered as a new version of a model registry instead
+(see ModelRegistry), --activate makes it the version served by the running app and server:
+    python -m app.scripts.my_credit_risk_model --registry model --activate
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import joblib
+import lightgbm as lgb
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
+import pandas as pd
 from sklearn.metrics import roc_curve, roc_auc_score
-import lightgbm as lgb
-import joblib
-import matplotlib.pyplot as plt
-
-# Load dataset
-df = pd.read_csv('/Users/camille/repo/Hetic/repo_M2/loan_project/data/application_train.csv')
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import MinMaxScaler
 
-# Function to convert age representation
-def convert_age(age_days_negative):
-    age_days_positive = -age_days_negative
-    age_years = age_days_positive / 365
-    return age_years
+from .FeatureTransformer import FeatureTransformer
+from .ModelRegistry import ModelRegistry, file_hash
+from .calibration import (CALIBRATION_FILE, COST_FALSE_NEGATIVE, COST_FALSE_POSITIVE, METHODS, Calibrator,
+                          calibration_report, save_calibration)
+from .drift_monitoring import DriftProfile, UniformSample, is_categorical_feature, save_reference
+from .feature_definitions import FEATURE_DEFINITIONS, definitions_hash, derived_columns, feature_chunks
+from .scoring import MODEL_DIR, TRANSFORMER_FILE
+from .tracing import span, traced
 
-# Apply age conversion to DAYS_BIRTH and DAYS_EMPLOYED columns
-df['DAYS_BIRTH'] = df['DAYS_BIRTH'].apply(convert_age)
-df['DAYS_EMPLOYED'] = df['DAYS_EMPLOYED'].apply(convert_age)
+DEFAULT_DATA_PATH = os.path.join('data', 'application_train.csv')
 
 # Select features
 used_features = [
     'TARGET', 'NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY',
-    'CNT_CHILDREN', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_GOODS_PRICE', 
-    'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'DAYS_BIRTH', 'DAYS_EMPLOYED', 
+    'CNT_CHILDREN', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'AMT_GOODS_PRICE',
+    'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'DAYS_BIRTH', 'DAYS_EMPLOYED',
     'CNT_FAM_MEMBERS', 'EXT_SOURCE_1', 'EXT_SOURCE_2', 'EXT_SOURCE_3'
 ]
 
-# Create reduced dataframe with selected columns
-reduced_df = df[used_features].copy()
+# Same settings as LGBMClassifier(n_estimators=100, class_weight='balanced', random_state=22)
+MODEL_PARAMS = {'objective': 'binary', 'learning_rate': 0.1, 'num_leaves': 31, 'seed': 22, 'verbosity': -1}
+NUM_BOOST_ROUND = 100
+TEST_SIZE = 0.2
+RANDOM_STATE = 22
+
+
+def peak_memory_mb():
+    """Return the peak resident memory of the process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class StageReport:
+    """Wall-clock time and peak resident memory at the end of each pipeline stage."""
+
+    def __init__(self, log=print):
+        self.stages = []
+        self.log = log
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        with span(f'stage.{name}'):
+            yield
+        seconds = time.perf_counter() - start
+        peak = peak_memory_mb()
+        self.stages.append({'stage': name, 'seconds': round(seconds, 3), 'peak_rss_mb': round(peak, 1)})
+        self.log(f"[{name}] {seconds:.2f}s, peak RSS {peak:.0f} MB")
+
+
+class MemmapSequence(lgb.Sequence):
+    """Rows of a memory-mapped matrix selected by sorted indices, read by LightGBM batch by batch."""
+
+    def __init__(self, matrix, indices, batch_size=65_536):
+        self.matrix = matrix
+        self.indices = indices
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        # Entier, tranche ou liste : l'indexation avancée de NumPy couvre les trois cas.
+        # LightGBM attend des float64, la conversion ne porte que sur le lot demandé.
+        return self.matrix[self.indices[idx]].astype(np.float64)
+
+
+def read_chunks(data_path, chunksize, feature_cache=True):
+    """Read only used_features of the CSV, chunk by chunk, with the derived features (cached on disk)."""
+    return feature_chunks(data_path, used_features, chunksize, FEATURE_DEFINITIONS, cache=feature_cache)
+
 
 # Function to preprocess data
+@traced
 def preprocess_data(df):
-    columns_to_one_hot = ['CODE_GENDER', 'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE']
-
-    # One-hot encode categorical columns
-    for column in columns_to_one_hot:
-        df = pd.concat([df, pd.get_dummies(df[column], prefix=column)], axis=1)
-        df = df.drop([column], axis=1)
-
-    # Label encode binary categorical columns
-    binary_encoder = LabelEncoder()
-    df['NAME_CONTRACT_TYPE'] = binary_encoder.fit_transform(df['NAME_CONTRACT_TYPE'])
-    df['FLAG_OWN_CAR'] = binary_encoder.fit_transform(df['FLAG_OWN_CAR'])
-    df['FLAG_OWN_REALTY'] = binary_encoder.fit_transform(df['FLAG_OWN_REALTY'])
-
-    # Fill missing values with mean
-    df = df.fillna(df.mean())
-
-    return df
-
-# Preprocess data
-processed_df = preprocess_data(reduced_df)
-
-# Split data into train and test sets
-X = processed_df.drop('TARGET', axis=1)
-y = processed_df['TARGET']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=22)
-
-# Scale features
-scaler = MinMaxScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# Train LightGBM model
-model = lgb.LGBMClassifier(n_estimators=100, class_weight='balanced', random_state=22)
-model.fit(X_train_scaled, y_train)
-
-# Save model and scaler
-joblib.dump(model, 'lgb_model.pkl')
-joblib.dump(scaler, 'scaler.pkl')
-
-# Save column names used for scaling
-with open('column_names.pkl', 'wb') as f:
-    joblib.dump(X.columns.tolist(), f)
-
-# Calculate ROC curve metrics
-prob_train = model.predict_proba(X_train_scaled)
-prob_test = model.predict_proba(X_test_scaled)
-
-# Calculate ROC curve
-fpr_train, tpr_train, _ = roc_curve(y_train, prob_train[:, 1])
-fpr_test, tpr_test, _ = roc_curve(y_test, prob_test[:, 1])
-
-# Plot ROC curve
-plt.figure(figsize=(8, 6))
-plt.plot(fpr_train, tpr_train, label='Train')
-plt.plot(fpr_test, tpr_test, label='Test')
-plt.plot([0, 1], [0, 1], linestyle='--', label='Random Guess')
-plt.xlabel('False Positive Rate')
-plt.ylabel('True Positive Rate')
-plt.title('ROC Curve')
-plt.legend()
-plt.show()
-
-# Calculate AUC score
-auc_score_train = roc_auc_score(y_train, prob_train[:, 1])
-auc_score_test = roc_auc_score(y_test, prob_test[:, 1])
-print("Train AUC:", auc_score_train)
-print("Test AUC:", auc_score_test)
+    # In-memory variant: fit vocabularies, one-hot layout and training means (ages converted
+    # to years, binary columns label encoded, one-hot encoding, derived features, missing values
+    # filled with the mean)
+    transformer = FeatureTransformer.fit(df, used_features[1:], FEATURE_DEFINITIONS)
+    processed = transformer.transform(df, scale=False)
+
+    processed_df = pd.DataFrame(processed, columns=transformer.column_names, index=df.index)
+    processed_df['TARGET'] = df['TARGET']
+
+    return processed_df, transformer
+
+
+def prepare_training_matrix(data_path, work_dir, chunksize=100_000, report=None, feature_cache=True):
+    """
+    Encode the dataset into a scaled float32 matrix memory-mapped in work_dir.
+
+    Parameters:
+    - data_path (str): Training CSV.
+    - work_dir (str): Directory receiving the memory-mapped matrix.
+    - chunksize (int): Rows read per chunk.
+    - report (StageReport or None): Receives the timing of each stage.
+    - feature_cache (bool): Read (or build) the feature cache of the CSV instead of parsing it twice.
+
+    Returns:
+    - dict: matrix, labels, train_idx, test_idx, transformer, scaler and the reference
+      profile of the training rows.
+    """
+    report = report or StageReport(log=lambda message: None)
+
+    chunk_sizes = []
+    features = used_features[1:] + derived_columns(FEATURE_DEFINITIONS)
+    numeric_features = [column for column in features if not is_categorical_feature(column)]
+    sample = UniformSample(numeric_features)
+
+    def counted_chunks():
+        for chunk in read_chunks(data_path, chunksize, feature_cache):
+            chunk_sizes.append(len(chunk))
+            # Échantillon uniforme de taille fixe : bornes des classes du profil de référence
+            sample.update(chunk)
+            yield chunk
+
+    with report.stage('fit transformer'):
+        transformer = FeatureTransformer.fit_chunks(counted_chunks(), used_features[1:], FEATURE_DEFINITIONS)
+        n_rows = sum(chunk_sizes)
+
+    # Same split as train_test_split on the full DataFrame; sorted for sequential disk reads
+    train_idx, test_idx = train_test_split(np.arange(n_rows), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    train_idx.sort()
+    test_idx.sort()
+    train_mask = np.zeros(n_rows, dtype=bool)
+    train_mask[train_idx] = True
+    profile = DriftProfile(sample.bin_edges(),
+                           [column for column in used_features[1:] if is_categorical_feature(column)])
+
+    with report.stage('encode'):
+        matrix = np.lib.format.open_memmap(os.path.join(work_dir, 'features.npy'), mode='w+',
+                                           dtype=np.float32, shape=(n_rows, len(transformer.column_names)))
+        labels = np.empty(n_rows, dtype=np.int8)
+        scaler = MinMaxScaler()
+        start = 0
+        for chunk in read_chunks(data_path, chunksize, feature_cache):
+            end = start + len(chunk)
+            encoded = transformer.transform(chunk, scale=False)
+            matrix[start:end] = encoded
+            labels[start:end] = chunk['TARGET'].to_numpy()
+            # Scaler fitted on the training rows only
+            chunk_train = train_mask[start:end]
+            if chunk_train.any():
+                scaler.partial_fit(encoded[chunk_train])
+                profile.update(chunk[chunk_train])
+            start = end
+
+    with report.stage('scale'):
+        transformer.set_scaler(scaler)
+        for start in range(0, n_rows, chunksize):
+            block = matrix[start:start + chunksize]
+            block *= transformer.scale
+            block += transformer.offset
+        matrix.flush()
+
+    return {'matrix': matrix, 'labels': labels, 'train_idx': train_idx, 'test_idx': test_idx,
+            'transformer': transformer, 'scaler': scaler, 'profile': profile}
+
+
+def balanced_weights(labels):
+    """Sample weights equivalent to class_weight='balanced'."""
+    counts = np.bincount(labels, minlength=2)
+    class_weights = len(labels) / (2 * np.maximum(counts, 1))
+    return class_weights[labels]
+
+
+def build_dataset(matrix, labels, indices, params=None):
+    """Build the LightGBM Dataset of the selected rows from the memory-mapped matrix, batch by batch."""
+    y = labels[indices]
+    return lgb.Dataset(MemmapSequence(matrix, indices), label=y, weight=balanced_weights(y),
+                       params=params or {'verbosity': -1}, free_raw_data=True)
+
+
+def predict_rows(booster, matrix, indices, batch_size=100_000):
+    """Predict the probability of default of the selected rows by batches."""
+    return np.concatenate([booster.predict(matrix[indices[start:start + batch_size]])
+                           for start in range(0, len(indices), batch_size)])
+
+
+def save_roc_plot(path, y_train, prob_train, y_test, prob_test):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fpr_train, tpr_train, _ = roc_curve(y_train, prob_train)
+    fpr_test, tpr_test, _ = roc_curve(y_test, prob_test)
+
+    plt.figure(figsize=(8, 6))
+    plt.plot(fpr_train, tpr_train, label='Train')
+    plt.plot(fpr_test, tpr_test, label='Test')
+    plt.plot([0, 1], [0, 1], linestyle='--', label='Random Guess')
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('ROC Curve')
+    plt.legend()
+    plt.savefig(path)
+    plt.close()
+
+
+def save_artifacts(output_dir, booster, scaler, transformer):
+    """Write the model artifacts in the layout loaded by the Model page."""
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump(booster, os.path.join(output_dir, 'lgb_model.pkl'))
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    with open(os.path.join(output_dir, 'column_names.pkl'), 'wb') as f:
+        joblib.dump(transformer.column_names, f)
+    # Fitted preprocessing (vocabularies, training means and scaling) used for serving
+    joblib.dump(transformer.to_dict(), os.path.join(output_dir, TRANSFORMER_FILE))
+
+
+def calibrate(prob_test, y_test, method='isotonic', cost_false_negative=COST_FALSE_NEGATIVE,
+              cost_false_positive=COST_FALSE_POSITIVE):
+    """
+    Fit the calibrator and the decision threshold on the held-out probabilities.
+
+    Returns:
+    - tuple: (Calibrator, report dict), (None, None) if method is None.
+    """
+    if method is None:
+        return None, None
+    calibrator = Calibrator.fit(prob_test, y_test, method)
+    calibrator.optimize_threshold(prob_test, y_test, cost_false_negative, cost_false_positive)
+    return calibrator, calibration_report(prob_test, y_test, calibrator)
+
+
+def save_calibrator(output_dir, calibrator):
+    """Write calibration.json, or remove the one of a previous model when the new one is not calibrated."""
+    if calibrator is not None:
+        save_calibration(calibrator, output_dir)
+    elif os.path.exists(os.path.join(output_dir, CALIBRATION_FILE)):
+        os.remove(os.path.join(output_dir, CALIBRATION_FILE))
+
+
+@traced('my_credit_risk_model.train_model')
+def train_model(data_path=DEFAULT_DATA_PATH, output_dir=MODEL_DIR, chunksize=100_000, work_dir=None,
+                roc_plot=None, params=None, num_boost_round=NUM_BOOST_ROUND, calibration='isotonic',
+                cost_false_negative=COST_FALSE_NEGATIVE, cost_false_positive=COST_FALSE_POSITIVE, feature_cache=True,
+                log=print):
+    """
+    Run the whole training pipeline and save the artifacts.
+
+    Parameters:
+    - data_path (str): Training CSV.
+    - output_dir (str): Directory receiving lgb_model.pkl, scaler.pkl, column_names.pkl,
+      feature_transformer.pkl, reference_profile.json and calibration.json.
+    - chunksize (int): Rows read per chunk.
+    - work_dir (str or None): Directory of the temporary memory-mapped matrix (system temp if None).
+    - roc_plot (str or None): Path of the ROC curve image, no plot if None.
+    - params (dict or None): LightGBM parameters, MODEL_PARAMS if None.
+    - num_boost_round (int): Number of boosting iterations.
+    - calibration (str or None): 'isotonic' or 'platt', no calibration if None.
+    - cost_false_negative, cost_false_positive (float): Costs of the decision threshold.
+    - feature_cache (bool): Read (or build) the feature cache of the CSV (see feature_definitions).
+    - log (callable): Progress reporting function.
+
+    Returns:
+    - dict: AUC scores, calibration and per-stage report.
+    """
+    report = StageReport(log)
+    params = params or MODEL_PARAMS
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        data = prepare_training_matrix(data_path, tmp_dir, chunksize, report, feature_cache)
+        matrix, labels = data['matrix'], data['labels']
+        train_idx, test_idx = data['train_idx'], data['test_idx']
+
+        with report.stage('build dataset'):
+            dataset = build_dataset(matrix, labels, train_idx)
+            dataset.construct()
+
+        with report.stage('train'):
+            booster = lgb.train(params, dataset, num_boost_round=num_boost_round)
+            del dataset
+
+        with report.stage('evaluate'):
+            prob_train = predict_rows(booster, matrix, train_idx)
+            prob_test = predict_rows(booster, matrix, test_idx)
+            y_train, y_test = labels[train_idx], labels[test_idx]
+            auc_score_train = roc_auc_score(y_train, prob_train)
+            auc_score_test = roc_auc_score(y_test, prob_test)
+            if roc_plot:
+                save_roc_plot(roc_plot, y_train, prob_train, y_test, prob_test)
+
+        with report.stage('calibrate'):
+            calibrator, calibration_result = calibrate(prob_test, y_test, calibration, cost_false_negative,
+                                                       cost_false_positive)
+        transformer, scaler, profile = data['transformer'], data['scaler'], data['profile']
+        # Distribution des probabilités de référence : lignes de test, non vues à l'entraînement,
+        # sur la même échelle (calibrée) que les probabilités servies
+        profile.update_scores(prob_test if calibrator is None else calibrator.transform(prob_test))
+        # Le fichier mappé doit être libéré avant la suppression du dossier temporaire
+        del matrix, data
+
+    with report.stage('save'):
+        save_artifacts(output_dir, booster, scaler, transformer)
+        save_reference(profile, output_dir)
+        save_calibrator(output_dir, calibrator)
+
+    result = {'n_rows': int(len(labels)), 'auc_train': float(auc_score_train), 'auc_test': float(auc_score_test),
+              'params': params, 'num_boost_round': num_boost_round, 'calibration': calibration_result,
+              'features': used_features[1:], 'derived_features': derived_columns(FEATURE_DEFINITIONS),
+              'feature_definitions_hash': definitions_hash(FEATURE_DEFINITIONS),
+              'data_path': os.path.abspath(data_path), 'stages': report.stages}
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Out-of-core training of the LightGBM default model.")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="Training CSV (application_train.csv layout)")
+    parser.add_argument('--output-dir', default=MODEL_DIR, help="Directory receiving the model artifacts")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows read per chunk")
+    parser.add_argument('--work-dir', default=None, help="Directory of the temporary memory-mapped matrix")
+    parser.add_argument('--roc-plot', default=None, help="Save the ROC curve to this image file")
+    parser.add_argument('--num-boost-round', type=int, default=NUM_BOOST_ROUND)
+    parser.add_argument('--calibration', choices=METHODS + ['none'], default='isotonic',
+                        help="Calibration of the held-out probabilities")
+    parser.add_argument('--cost-fn', type=float, default=COST_FALSE_NEGATIVE,
+                        help="Cost of granting a loan that defaults (false negative)")
+    parser.add_argument('--cost-fp', type=float, default=COST_FALSE_POSITIVE,
+                        help="Cost of refusing a loan that would be repaid (false positive)")
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help="Parse the CSV and compute the derived features without the on-disk feature cache")
+    parser.add_argument('--registry', default=None,
+                        help="Register the artifacts as a new version of this registry (--output-dir is ignored)")
+    parser.add_argument('--activate', action='store_true', help="Make the registered version the active one")
+    args = parser.parse_args(argv)
+
+    options = {'num_boost_round': args.num_boost_round,
+               'calibration': None if args.calibration == 'none' else args.calibration,
+               'cost_false_negative': args.cost_fn, 'cost_false_positive': args.cost_fp,
+               'feature_cache': not args.no_feature_cache}
+    version = None
+    if args.registry is None:
+        result = train_model(args.data, args.output_dir, args.chunksize, args.work_dir, args.roc_plot, **options)
+    else:
+        with tempfile.TemporaryDirectory(dir=args.work_dir) as output_dir:
+            result = train_model(args.data, output_dir, args.chunksize, args.work_dir, args.roc_plot, **options)
+            version = ModelRegistry(args.registry).register(output_dir, {'data_hash': file_hash(args.data)},
+                                                             activate=args.activate)
+
+    print(f"Train AUC Score: {result['auc_train']:.4f}")
+    print(f"Test AUC Score: {result['auc_test']:.4f}")
+    calibration = result['calibration']
+    if calibration is not None:
+        print(f"Calibration ({calibration['method']}): Brier {calibration['brier_raw']:.4f} -> "
+              f"{calibration['brier_calibrated']:.4f}, mean probability {calibration['mean_score_raw']:.3f} -> "
+              f"{calibration['mean_score_calibrated']:.3f} (default rate {calibration['default_rate']:.3f}), "
+              f"decision threshold {calibration['threshold']:.4f}")
+    print(f"{'stage':<16}{'seconds':>10}{'peak RSS (MB)':>16}")
+    for stage in result['stages']:
+        print(f"{stage['stage']:<16}{stage['seconds']:>10.2f}{stage['peak_rss_mb']:>16.0f}")
+    if version is not None:
+        print(f"Registered {version} in {args.registry}{' (active)' if args.activate else ''}")
+
+
+if __name__ == '__main__':
+    main()
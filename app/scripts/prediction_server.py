@@ -0,0 +1,316 @@
+"""
+Local HTTP scoring service for the LightGBM default model.
+
+Concurrent requests are coalesced into micro-batches: the first pending request opens a
+window of --batch-window-ms milliseconds, every request arriving in that window is scored
+by the same predict_proba call.
+
+Usage (from the repository root):
+    python -m app.scripts.prediction_server --port 8000 --batch-window-ms 2
+
+Endpoints:
+- POST /predict  body: one applicant (JSON object) or a list of applicants
+- GET  /metrics  latency percentiles, throughput and batching counters
+- GET  /health    status and served model version
+
+--model-dir may be a model registry (see ModelRegistry): when another version is activated
+the server loads it in the background and swaps it in between two batches, without restart.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from .ModelRegistry import ActiveModel
+from .fast_inference import load_fast_predictor
+from .scoring import MODEL_DIR, load_artifacts, predict_default_proba
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+# Valeurs acceptées pour une variable d'un demandeur (une liste ou un objet ferait échouer tout le lot)
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+class ServerMetrics:
+    """Request counters and a sliding window of request latencies."""
+
+    def __init__(self, window=10_000):
+        self.started_at = time.perf_counter()
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_request(self, latency, n_records):
+        self.requests += 1
+        self.records += n_records
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started_at
+        latencies = np.fromiter(self.latencies, dtype=float) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            'uptime_s': round(uptime, 3),
+            'requests': self.requests,
+            'records': self.records,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_size': round(self.records / self.batches, 2) if self.batches else 0.0,
+            'latency_p50_ms': round(float(p50), 3),
+            'latency_p99_ms': round(float(p99), 3),
+            'requests_per_s': round(self.requests / uptime, 1) if uptime else 0.0,
+            'records_per_s': round(self.records / uptime, 1) if uptime else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent scoring requests into a single model call.
+
+    Parameters:
+    - predict (callable): Function scoring a list of applicant dicts, returning probabilities.
+    - window_ms (float): Time the first request of a batch waits for others to join.
+    - max_batch_size (int): Number of records that closes a batch immediately.
+    - metrics (ServerMetrics or None): Counters updated with every batch.
+    """
+
+    def __init__(self, predict, window_ms=2.0, max_batch_size=512, metrics=None):
+        self.predict = predict
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.metrics = metrics
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, records):
+        """Queue a list of applicant dicts and wait for their probabilities."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            records = [record for item_records, _ in batch for record in item_records]
+            try:
+                # Le modèle tourne dans un thread pour ne pas bloquer la boucle pendant le calcul
+                probabilities = await loop.run_in_executor(None, self.predict, records)
+            except Exception as e:
+                if len(batch) == 1:
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                else:
+                    # Requêtes rescorées une à une : seule la requête fautive reçoit l'erreur
+                    await self._run_separately(batch)
+                continue
+
+            if self.metrics is not None:
+                self.metrics.batches += 1
+            start = 0
+            for item_records, future in batch:
+                end = start + len(item_records)
+                if not future.done():
+                    future.set_result(probabilities[start:end].tolist())
+                start = end
+
+    async def _run_separately(self, batch):
+        loop = asyncio.get_running_loop()
+        for records, future in batch:
+            try:
+                probabilities = await loop.run_in_executor(None, self.predict, records)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if self.metrics is not None:
+                self.metrics.batches += 1
+            if not future.done():
+                future.set_result(probabilities.tolist())
+
+
+class PredictionServer:
+    """Minimal HTTP/1.1 server (keep-alive, JSON) in front of a MicroBatcher."""
+
+    def __init__(self, batcher, metrics, active_model=None):
+        self.batcher = batcher
+        self.metrics = metrics
+        self.active_model = active_model
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Corps de taille inconnue : la suite de la connexion ne peut pas être lue
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {'error': 'body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                status, payload = await self._dispatch(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            if self.active_model is None:
+                return 200, {'status': 'ok'}
+            return 200, {'status': 'ok', 'model_version': self.active_model.version_name,
+                         'model_swaps': self.active_model.swaps, 'model_error': self.active_model.last_error}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics.snapshot()
+        if method == 'POST' and path == '/predict':
+            return await self._predict(body)
+        return 404, {'error': f'no route for {method} {path}'}
+
+    async def _predict(self, body):
+        start = time.perf_counter()
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            self.metrics.errors += 1
+            return 400, {'error': 'body is not valid JSON'}
+
+        records = payload if isinstance(payload, list) else [payload]
+        if not records or not all(isinstance(record, dict) for record in records):
+            self.metrics.errors += 1
+            return 400, {'error': 'expected an applicant object or a list of applicant objects'}
+        invalid = next((name for record in records for name, value in record.items()
+                        if not isinstance(value, SCALAR_TYPES)), None)
+        if invalid is not None:
+            self.metrics.errors += 1
+            return 400, {'error': f"field '{invalid}' must be a string, a number, a boolean or null"}
+
+        try:
+            probabilities = await self.batcher.submit(records)
+        except Exception as e:
+            self.metrics.errors += 1
+            return 500, {'error': str(e)}
+
+        self.metrics.record_request(time.perf_counter() - start, len(records))
+        return 200, {'probabilities': probabilities}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                  500: 'Internal Server Error'}.get(status, '')
+        head = (f'HTTP/1.1 {status} {reason}\r\n'
+                f'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8000, model_dir=MODEL_DIR, window_ms=2.0, max_batch_size=512,
+                fast=False):
+    """Load the artifacts and serve predictions until cancelled, swapping in new model versions."""
+    if fast:
+        active = ActiveModel(model_dir, loader=load_fast_predictor,
+                             warmup=lambda predictor: predictor.predict_default_proba([{}]))
+
+        def predict(records):
+            return active.get().predict_default_proba(records)
+    else:
+        # Premier appel hors requête : les structures internes de LightGBM sont initialisées
+        active = ActiveModel(model_dir, loader=load_artifacts,
+                             warmup=lambda artifacts: predict_default_proba(*artifacts, [{}]))
+
+        def predict(records):
+            model, transformer = active.get()
+            return predict_default_proba(model, transformer, records)
+
+    active.get()
+
+    metrics = ServerMetrics()
+    batcher = MicroBatcher(predict, window_ms=window_ms, max_batch_size=max_batch_size, metrics=metrics)
+    batcher.start()
+    server = PredictionServer(batcher, metrics, active)
+
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Serving predictions on http://{host}:{port} (window {window_ms} ms, max batch {max_batch_size})")
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local micro-batching scoring server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Directory holding the model artifacts, or a model registry")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="Time a batch stays open for concurrent requests")
+    parser.add_argument('--max-batch-size', type=int, default=512, help="Records that close a batch early")
+    parser.add_argument('--fast', action='store_true', help="Use the native LightGBM Booster with folded scaling")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.model_dir, args.batch_window_ms, args.max_batch_size,
+                          args.fast))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Command line of the local model registry (see ModelRegistry).
+
+Usage (from the repository root):
+    python -m app.scripts.registry_cli list
+    python -m app.scripts.registry_cli register model_candidate --data data/application_train.csv --activate
+    python -m app.scripts.registry_cli activate v0002
+    python -m app.scripts.registry_cli show v0002
+
+The app, the prediction server and the batch jobs read --registry (default: model) as a
+model directory: once a version is active they load its bundle, and a running app or server
+switches to a newly activated version without restart.
+"""
+import argparse
+import json
+import os
+
+from .ModelRegistry import ModelRegistry, file_hash
+from .scoring import MODEL_DIR
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local registry of versioned model bundles.")
+    parser.add_argument('--registry', default=MODEL_DIR, help="Registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="List the registered versions")
+    register = commands.add_parser('register', help="Register the artifacts of a model directory")
+    register.add_argument('source_dir', help="Directory holding lgb_model.pkl and the preprocessing artifacts")
+    register.add_argument('--data', default=None, help="Training CSV, hashed into the metadata")
+    register.add_argument('--activate', action='store_true', help="Make the new version the active one")
+    activate = commands.add_parser('activate', help="Make a version the active one (also used to roll back)")
+    activate.add_argument('version')
+    show = commands.add_parser('show', help="Print the metadata of a version")
+    show.add_argument('version', nargs='?', default=None, help="Version (default: the active one)")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'list':
+        for row in registry.summary():
+            auc = f"{row['auc_test']:.4f}" if row['auc_test'] is not None else 'n/a'
+            print(f"{'*' if row['active'] else ' '} {row['version']}  {row['created_at'] or '':<26}"
+                  f"AUC test {auc}  rows {row['n_rows'] or 'n/a'}")
+    elif args.command == 'register':
+        metadata = {'data_path': os.path.abspath(args.data), 'data_hash': file_hash(args.data)} if args.data else None
+        version = registry.register(args.source_dir, metadata, activate=args.activate)
+        print(f"Registered {version}{' (active)' if args.activate else ''}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"Active version: {args.version}")
+    else:
+        version = args.version or registry.active
+        if version is None:
+            parser.error(f"no active version in '{args.registry}'")
+        print(json.dumps(registry.metadata(version), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import os
+
+import joblib
+import lightgbm as lgb
+
+from .FeatureTransformer import FeatureTransformer
+from .ModelRegistry import VERSIONS_DIR, resolve_model_dir
+from .calibration import CALIBRATION_FILE, CalibratedModel, load_calibration
+from .drift_monitoring import REFERENCE_FILE
+from .tracing import add, span, traced
+
+MODEL_DIR = 'model'
+TRANSFORMER_FILE = 'feature_transformer.pkl'
+
+
+# Fichiers dont le remplacement change la version du modèle
+ARTIFACT_FILES = ['lgb_model.pkl', 'scaler.pkl', 'column_names.pkl', TRANSFORMER_FILE, REFERENCE_FILE,
+                  CALIBRATION_FILE]
+
+
+def artifact_version(model_dir=MODEL_DIR):
+    """
+    Return a hashable token (size and mtime of each artifact) that changes when a file is replaced.
+
+    For a registry the token is the one of the active bundle, so it also changes on activation.
+    """
+    model_dir = resolve_model_dir(model_dir)
+    version = []
+    for name in ARTIFACT_FILES:
+        try:
+            stat = os.stat(os.path.join(model_dir, name))
+        except FileNotFoundError:
+            continue
+        version.append((name, stat.st_size, stat.st_mtime_ns))
+    return (os.path.abspath(model_dir), tuple(version))
+
+
+def _load_pickle(model_dir, name):
+    # Les bundles du registre ne sont jamais réécrits : leurs tableaux numpy sont mappés en mémoire
+    # (partagés entre processus, chargés à la demande). Un dossier simple peut être réécrit par
+    # un entraînement, il est lu normalement.
+    in_registry = os.path.basename(os.path.dirname(os.path.abspath(model_dir))) == VERSIONS_DIR
+    return joblib.load(os.path.join(model_dir, name), mmap_mode='r' if in_registry else None)
+
+
+def load_transformer(model_dir=MODEL_DIR):
+    """
+    Load the fitted feature transformer of a model directory.
+
+    Models trained before the transformer was persisted only ship column_names.pkl and
+    scaler.pkl; the transformer is then rebuilt from those two files.
+
+    Parameters:
+    - model_dir (str): Directory holding the model artifacts, or a registry (active version).
+
+    Returns:
+    - FeatureTransformer: Transformer producing the scaled model matrix.
+    """
+    model_dir = resolve_model_dir(model_dir)
+    transformer_path = os.path.join(model_dir, TRANSFORMER_FILE)
+    if os.path.exists(transformer_path):
+        state = _load_pickle(model_dir, TRANSFORMER_FILE)
+        # Sauvegardé sous forme de dict : indépendant du chemin d'import (scripts.* ou app.scripts.*)
+        return FeatureTransformer.from_dict(state) if isinstance(state, dict) else state
+
+    scaler = _load_pickle(model_dir, 'scaler.pkl')
+    with open(os.path.join(model_dir, 'column_names.pkl'), 'rb') as f:
+        column_names = joblib.load(f)
+    return FeatureTransformer.from_artifacts(column_names, scaler)
+
+
+@traced
+def load_artifacts(model_dir=MODEL_DIR):
+    """
+    Load the trained model and its feature transformer.
+
+    Models saved with a calibration.json are returned as a CalibratedModel: model_default_proba
+    then returns calibrated probabilities.
+
+    Parameters:
+    - model_dir (str): Directory holding lgb_model.pkl and the preprocessing artifacts,
+      or a registry (active version).
+
+    Returns:
+    - tuple: (model, transformer)
+    """
+    model_dir = resolve_model_dir(model_dir)
+    model = _load_pickle(model_dir, 'lgb_model.pkl')
+    calibrator = load_calibration(model_dir)
+    if calibrator is not None:
+        model = CalibratedModel(model, calibrator)
+    return model, load_transformer(model_dir)
+
+
+def booster_of(model):
+    """Return the lgb.Booster of a model saved as LGBMClassifier or as a raw Booster."""
+    if isinstance(model, CalibratedModel):
+        model = model.model
+    return model if isinstance(model, lgb.Booster) else model.booster_
+
+
+def model_default_proba(model, features, num_threads=None):
+    """
+    Return the probability of default for an already transformed feature matrix.
+
+    lgb_model.pkl holds an LGBMClassifier for models trained in memory and a raw Booster for
+    models trained by the out-of-core pipeline; both are supported, as well as a CalibratedModel
+    wrapping either.
+    """
+    with span('scoring.predict_proba', rows=len(features)):
+        add('scoring.rows_scored', len(features))
+        calibrator = None
+        if isinstance(model, CalibratedModel):
+            model, calibrator = model.model, model.calibrator
+        kwargs = {'num_threads': num_threads} if num_threads else {}
+        if isinstance(model, lgb.Booster):
+            probabilities = model.predict(features, **kwargs)
+        else:
+            probabilities = model.predict_proba(features, **kwargs)[:, 1]
+        return probabilities if calibrator is None else calibrator.transform(probabilities)
+
+
+def predict_default_proba(model, transformer, data, num_threads=None):
+    """
+    Return the probability of default for raw applicant data.
+
+    Parameters:
+    - model: Trained LightGBM classifier or Booster.
+    - transformer (FeatureTransformer): Fitted feature transformer.
+    - data: One applicant (dict), a list of applicants or a batch of columns.
+    - num_threads (int or None): LightGBM threads used for the prediction (default: all).
+
+    Returns:
+    - np.ndarray: Probabilities of default.
+    """
+    return model_default_proba(model, transformer.transform(data), num_threads)
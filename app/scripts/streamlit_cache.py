@@ -0,0 +1,262 @@
+"""
+Process-wide Streamlit caches for the datasets and model artifacts used by the pages.
+
+Loaders import their heavy modules (lightgbm, sklearn, pyarrow) on first use rather than when
+a page is opened. Each cache is bounded, so a long-running server keeps a fixed footprint.
+"""
+import contextlib
+import time
+
+import streamlit as st
+
+MAX_CACHED_FRAMES = 8
+MAX_CACHED_MODELS = 2
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FRAMES, show_spinner=False)
+def _cached_columns(columns, version):
+    from .dataset_store import load_columns
+    return load_columns(list(columns), csv_path=version[0])
+
+
+def get_columns(columns):
+    """
+    Return dataset columns shared by every session until the CSV changes.
+
+    The DataFrame is shared and not copied, so callers must not modify it in place.
+
+    Parameters:
+    - columns (list): Columns to load.
+
+    Returns:
+    - pd.DataFrame: DataFrame with the requested columns.
+    """
+    from .dataset_store import dataset_version
+    return _cached_columns(tuple(columns), dataset_version())
+
+
+@st.cache_resource(max_entries=MAX_CACHED_MODELS, show_spinner=False)
+def _active_model(model_dir):
+    from .ModelRegistry import ActiveModel
+    from .scoring import predict_default_proba
+    return ActiveModel(model_dir, warmup=lambda artifacts: predict_default_proba(*artifacts, [{}]))
+
+
+def get_artifacts_state(model_dir='model'):
+    """
+    Return (version, (model, transformer)) of the model currently served to every session.
+
+    The first call loads the model; when an artifact file is replaced or another registry
+    version is activated, the new model is loaded in the background and the sessions keep
+    the previous one until it is ready.
+    """
+    active = _active_model(model_dir)
+    if not active.loaded:
+        with st.spinner("Chargement du modèle..."):
+            return active.state()
+    return active.state()
+
+
+def get_artifacts(model_dir='model'):
+    """
+    Return (model, transformer), loaded on first use and swapped when an artifact file is replaced.
+
+    Parameters:
+    - model_dir (str): Directory holding the model artifacts, or a model registry.
+
+    Returns:
+    - tuple: (model, transformer)
+    """
+    return get_artifacts_state(model_dir)[1]
+
+
+@st.cache_resource(max_entries=MAX_CACHED_MODELS)
+def get_prediction_cache(model_dir='model', max_size=10_000, ttl=3600.0):
+    """Return the PredictionCache shared by every session (emptied when the served model changes)."""
+    from .PredictionCache import PredictionCache
+    active = _active_model(model_dir)
+    return PredictionCache(max_size=max_size, ttl=ttl, model_dir=model_dir, version_source=lambda: active.version)
+
+
+@st.cache_resource(max_entries=MAX_CACHED_MODELS, show_spinner="Calcul de l'importance globale des variables...")
+def _cached_importance(model_dir, version, data_version, sample_size, _artifacts):
+    from .dataset_store import load_columns
+    from .explanations import global_importance
+    model, transformer = _artifacts
+    data = load_columns(transformer.raw_features, csv_path=data_version[0])
+    sample = data.sample(n=min(sample_size, len(data)), random_state=22)
+    return global_importance(model, transformer, sample).importance()
+
+
+def get_global_importance(model_dir='model', sample_size=10_000, state=None):
+    """
+    Return the mean absolute contribution per feature over a sample of the dataset.
+
+    Computed once per model and dataset version.
+
+    Parameters:
+    - model_dir (str): Directory holding the model artifacts, or a model registry.
+    - sample_size (int): Number of rows explained.
+    - state (tuple or None): (version, (model, transformer)) already returned by
+      get_artifacts_state, so that the importance comes from the same model; current model if None.
+
+    Returns:
+    - pd.Series: Global importance, most important feature first.
+    """
+    from .dataset_store import dataset_version
+    version, artifacts = state or get_artifacts_state(model_dir)
+    return _cached_importance(model_dir, version, dataset_version(), sample_size, artifacts)
+
+
+@st.cache_resource(max_entries=MAX_CACHED_FRAMES, show_spinner=False)
+def _cached_target_cube(columns, version):
+    from .TargetCube import TargetCube
+    from .dataset_store import load_columns
+    return TargetCube.build(load_columns(list(columns) + ['TARGET'], csv_path=version[0]), list(columns))
+
+
+def get_target_cube(columns):
+    """
+    Return the target aggregates of a few columns, built once per dataset version.
+
+    Only these columns and the target are read, unlike load_target_cube which aggregates
+    every column of the dataset.
+
+    Parameters:
+    - columns (list): Columns to aggregate.
+
+    Returns:
+    - TargetCube: Aggregates shared by every session.
+    """
+    from .dataset_store import dataset_version
+    return _cached_target_cube(tuple(columns), dataset_version())
+
+
+@st.cache_resource(max_entries=MAX_CACHED_MODELS, show_spinner="Construction des index de segments...")
+def _cached_segment_index(columns, version):
+    from .SegmentIndex import SegmentIndex
+    from .dataset_store import load_columns
+    # Les lignes ne sont lues que le temps de construire les bitmaps
+    return SegmentIndex.build(load_columns(list(columns) + ['TARGET'], csv_path=version[0]), list(columns))
+
+
+def get_segment_index(columns):
+    """
+    Return the bitmap index of the categories of the columns, built once per dataset version.
+
+    Parameters:
+    - columns (list): Columns to index.
+
+    Returns:
+    - SegmentIndex: Index shared by every session.
+    """
+    from .dataset_store import dataset_version
+    return _cached_segment_index(tuple(columns), dataset_version())
+
+
+@st.cache_resource(max_entries=MAX_CACHED_MODELS, show_spinner=False)
+def _cached_reference(model_dir, version):
+    from .drift_monitoring import load_reference
+    # version[0] : dossier résolu du modèle servi (bundle actif pour un registre)
+    return load_reference(version[0])
+
+
+def get_reference_profile(model_dir='model'):
+    """Return the reference profile saved with the model (None if the model has none)."""
+    return _cached_reference(model_dir, get_artifacts_state(model_dir)[0])
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _cached_partition_profile(model_dir, version, store_dir, index, name, _artifacts):
+    from .dataset_store import partitioned_dataset
+    from .drift_monitoring import profile_chunks
+    reference = _cached_reference(model_dir, version)
+    model, transformer = _artifacts
+    # Variables dérivées du profil : calculées par profile_chunks, absentes des partitions
+    columns = [column for column in reference.features if column in transformer.raw_features]
+    rows = partitioned_dataset(store_dir).load_columns(columns, first_partition=index, stop_partition=index + 1)
+    return profile_chunks(reference, [rows], model, transformer)
+
+
+def get_partitions_profile(first_partition=0, model_dir='model', store_dir=None):
+    """
+    Return the drift profile of the ingested partitions from first_partition on.
+
+    Each partition is profiled once per model version; the profiles are then merged, so a new
+    partition only costs the profiling of its own rows.
+
+    Returns:
+    - DriftProfile: Profile of the partitions (with the bins of the reference profile).
+    """
+    from .dataset_store import DEFAULT_STORE_PATH, partitioned_dataset
+    from .drift_monitoring import DriftProfile
+    store_dir = store_dir or DEFAULT_STORE_PATH
+    version, artifacts = get_artifacts_state(model_dir)
+    store = partitioned_dataset(store_dir)
+    profile = DriftProfile.empty_like(_cached_reference(model_dir, version))
+    for index, entry in enumerate(store.partitions[first_partition:], start=first_partition):
+        profile.merge(_cached_partition_profile(model_dir, version, store_dir, index, entry['name'], artifacts))
+    return profile
+
+
+@st.cache_resource
+def _timing_registry():
+    # Un seul registre par processus, partagé par toutes les sessions
+    return {}
+
+
+def _trace_panel(page_span):
+    # Panneau de débogage : spans de l'exécution qui vient de se terminer, imbriqués sous la page
+    from .tracing import counters, recent_spans
+    depths, rows = {}, []
+    for span in recent_spans(page_span.trace_id):
+        depths[span.span_id] = depths.get(span.parent_id, -1) + 1
+        rows.append({'Étape': '· ' * depths[span.span_id] + span.name,
+                     'Début (ms)': round((span.start_ns - page_span.start_ns) / 1e6, 1),
+                     'Durée (ms)': round(span.duration_s * 1000, 2),
+                     'Erreur': span.error or ''})
+    with st.sidebar.expander("Traces de la dernière exécution"):
+        st.dataframe(rows, hide_index=True)
+        compteurs = counters()
+        if compteurs:
+            st.caption(', '.join(f'{name} : {value:g}' for name, value in sorted(compteurs.items())))
+
+
+@contextlib.contextmanager
+def page_timer(page, started_at):
+    """
+    Record the import time and render time of a page run.
+
+    Import time runs from started_at (taken before the page imports) until the block is entered.
+    Render time is the duration of the block. The first run of a page in the process is kept
+    separately as its cold start.
+
+    With tracing enabled (LOAN_TRACE, see tracing) the block is a 'page.<name>' span and the
+    spans of the run are listed in a debug panel of the sidebar.
+
+    Parameters:
+    - page (str): Page name.
+    - started_at (float): time.perf_counter() value taken at the top of the page script.
+    """
+    from .tracing import Span, span
+    entered = time.perf_counter()
+    with span(f'page.{page}', import_s=entered - started_at) as page_span:
+        yield
+    import_s, render_s = entered - started_at, time.perf_counter() - entered
+    if isinstance(page_span, Span):
+        _trace_panel(page_span)
+
+    registry = _timing_registry()
+    timings = registry.get(page)
+    if timings is None:
+        registry[page] = {'page': page, 'runs': 1, 'cold_import_s': import_s, 'first_render_s': render_s,
+                          'last_import_s': import_s, 'last_render_s': render_s}
+    else:
+        timings['runs'] += 1
+        timings['last_import_s'] = import_s
+        timings['last_render_s'] = render_s
+
+
+def timing_report():
+    """Return the recorded page timings (one dict per page, in seconds)."""
+    return [dict(timings) for timings in _timing_registry().values()]
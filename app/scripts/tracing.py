@@ -0,0 +1,263 @@
+"""
+Lightweight tracing of the data loading, analytics, scoring and training code.
+
+Disabled by default: a traced function then costs one flag check, and span() returns a shared
+no-op context manager. Enable it with the LOAN_TRACE environment variable:
+
+    LOAN_TRACE=1 streamlit run app/home.py                 # spans appended to traces.jsonl
+    LOAN_TRACE=/tmp/loan.jsonl python -m app.scripts.my_credit_risk_model
+
+Each line of the file is an OTLP/JSON export request (resourceSpans for the spans,
+resourceMetrics for the counters), the layout written by the file exporter of the
+OpenTelemetry collector, so it can be replayed into any OTLP-compatible backend. Spans nest
+through a context variable (threads and asyncio tasks keep their own parent). The last spans
+are also kept in memory for the debug panel of the Streamlit pages.
+"""
+import atexit
+import collections
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+ENV_VARIABLE = 'LOAN_TRACE'
+DEFAULT_TRACE_FILE = 'traces.jsonl'
+SERVICE_NAME = 'loan-default-app'
+# Spans gardés en mémoire pour le panneau de débogage
+RECENT_SPANS = 5000
+# Écriture du fichier au plus une fois par seconde (ou dès que le tampon est plein)
+FLUSH_INTERVAL_S = 1.0
+BUFFER_SIZE = 1000
+
+_STATUS_ERROR = 2
+_SPAN_KIND_INTERNAL = 1
+
+
+class _Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.recent = collections.deque(maxlen=RECENT_SPANS)
+        self.counters = collections.Counter()
+        self.flushed_at = time.monotonic()
+
+
+_tracer = _Tracer()
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Timed operation with attributes, child of the span active when it is entered."""
+
+    __slots__ = ('name', 'attributes', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'error',
+                 '_token', '_start')
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent is not None else f'{random.getrandbits(128):032x}'
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        _record(self)
+        return False
+
+    @property
+    def duration_s(self):
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self):
+        """Return the span as a dict (name, ids, start, duration in seconds, attributes, error)."""
+        return {'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'start_ns': self.start_ns, 'duration_s': self.duration_s,
+                'attributes': dict(self.attributes), 'error': self.error}
+
+    def to_otlp(self):
+        span = {'traceId': self.trace_id, 'spanId': self.span_id, 'name': self.name, 'kind': _SPAN_KIND_INTERNAL,
+                'startTimeUnixNano': str(self.start_ns), 'endTimeUnixNano': str(self.end_ns),
+                'attributes': _otlp_attributes(self.attributes)}
+        if self.parent_id is not None:
+            span['parentSpanId'] = self.parent_id
+        if self.error is not None:
+            span['status'] = {'code': _STATUS_ERROR, 'message': self.error}
+        return span
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _resource():
+    return {'attributes': _otlp_attributes({'service.name': SERVICE_NAME, 'process.pid': os.getpid()})}
+
+
+def _record(span):
+    with _tracer.lock:
+        _tracer.recent.append(span)
+        if _tracer.path is None:
+            return
+        _tracer.buffer.append(span)
+        due = (len(_tracer.buffer) >= BUFFER_SIZE
+               or (span.parent_id is None and time.monotonic() - _tracer.flushed_at >= FLUSH_INTERVAL_S))
+    if due:
+        flush()
+
+
+def span(name, **attributes):
+    """
+    Return a context manager timing a block as a span (a shared no-op when tracing is disabled).
+
+    Parameters:
+    - name (str): Span name, e.g. 'dataset_store.build_cache'.
+    - attributes: Attributes of the span (str, int, float or bool), more can be set on the
+      returned object with set_attribute.
+    """
+    if not _tracer.enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name=None):
+    """
+    Decorator recording every call of a function as a span.
+
+    Usable as @traced or @traced('span.name'); the default name is module.qualname.
+    """
+    def decorate(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    if callable(name):
+        func, name = name, None
+        return decorate(func)
+    return decorate
+
+
+def add(name, value=1):
+    """Increment a counter (exported as a cumulative OTLP sum)."""
+    if _tracer.enabled:
+        with _tracer.lock:
+            _tracer.counters[name] += value
+
+
+def is_enabled():
+    return _tracer.enabled
+
+
+def enable(path=DEFAULT_TRACE_FILE):
+    """Start recording spans; they are appended to path (kept in memory only if path is None)."""
+    _tracer.path = path
+    _tracer.enabled = True
+
+
+def disable():
+    flush()
+    _tracer.enabled = False
+
+
+def counters():
+    with _tracer.lock:
+        return dict(_tracer.counters)
+
+
+def recent_spans(trace_id=None):
+    """Return the spans kept in memory (those of one trace if trace_id is given), in start order."""
+    with _tracer.lock:
+        spans = [span for span in _tracer.recent if trace_id is None or span.trace_id == trace_id]
+    return sorted(spans, key=lambda span: span.start_ns)
+
+
+def current_span():
+    """Return the active span, None outside of any span or when tracing is disabled."""
+    return _current_span.get()
+
+
+def flush():
+    """Append the buffered spans and the current counters to the trace file."""
+    with _tracer.lock:
+        spans, _tracer.buffer = _tracer.buffer, []
+        path = _tracer.path
+        values = dict(_tracer.counters)
+        _tracer.flushed_at = time.monotonic()
+    if path is None or not (spans or values):
+        return
+
+    scope = {'name': 'app.scripts.tracing'}
+    lines = []
+    if spans:
+        lines.append({'resourceSpans': [{'resource': _resource(), 'scopeSpans': [
+            {'scope': scope, 'spans': [span.to_otlp() for span in spans]}]}]})
+    if values:
+        now = str(time.time_ns())
+        metrics = [{'name': name, 'sum': {'aggregationTemporality': 2, 'isMonotonic': True, 'dataPoints': [
+            {'asDouble': float(value), 'timeUnixNano': now}]}} for name, value in sorted(values.items())]
+        lines.append({'resourceMetrics': [{'resource': _resource(), 'scopeMetrics': [
+            {'scope': scope, 'metrics': metrics}]}]})
+    # Une ligne par requête d'export, écrite en une fois (plusieurs processus peuvent partager le fichier)
+    with open(path, 'a') as f:
+        f.write(''.join(json.dumps(line) + '\n' for line in lines))
+
+
+def _configure_from_environment():
+    value = os.environ.get(ENV_VARIABLE, '').strip()
+    if value.lower() in ('', '0', 'false', 'no', 'off'):
+        return
+    enable(DEFAULT_TRACE_FILE if value.lower() in ('1', 'true', 'yes', 'on') else value)
+
+
+_configure_from_environment()
+atexit.register(flush)
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+
+# Variables pouvant varier dans une simulation : (colonne brute, conversion depuis la saisie,
+# bornes et pas des curseurs de la page Model)
+SWEEP_FEATURES = {
+    'AMT_CREDIT': ('AMT_CREDIT', None, (10_000, 2_000_000, 10_000)),
+    'AMT_INCOME_TOTAL': ('AMT_INCOME_TOTAL', None, (10_000, 500_000, 5_000)),
+    'AMT_GOODS_PRICE': ('AMT_GOODS_PRICE', None, (10_000, 2_000_000, 10_000)),
+    'AGE': ('DAYS_BIRTH', lambda years: -years * 365, (18, 100, 1)),
+}
+
+
+def sweep_matrix(transformer, record, grids):
+    """
+    Build the model matrix of every combination of the swept values around one applicant.
+
+    The applicant is encoded once; the row is repeated and only the swept columns, and the
+    derived columns computed from them (ratios), are overwritten with their vectorized encoding.
+
+    Parameters:
+    - transformer (FeatureTransformer): Fitted feature transformer.
+    - record (dict): Raw applicant (dataset values).
+    - grids (dict): Swept feature (key of SWEEP_FEATURES) -> 1-D array of values, one or two features.
+
+    Returns:
+    - np.ndarray: Float32 matrix of shape (product of the grid sizes, n_features), the first
+      feature varying slowest.
+    """
+    if not 1 <= len(grids) <= 2:
+        raise ValueError("A sweep varies one or two features.")
+    axes = [np.asarray(values, dtype=np.float64) for values in grids.values()]
+    mesh = np.meshgrid(*axes, indexing='ij')
+
+    base = transformer.transform(record)
+    matrix = np.repeat(base, mesh[0].size, axis=0)
+    columns = {}
+    for feature, values in zip(grids, mesh):
+        column, convert, _ = SWEEP_FEATURES[feature]
+        columns[column] = convert(values.ravel()) if convert else values.ravel()
+    columns.update(transformer.derived_from(record, columns))
+    for column, raw in columns.items():
+        j, encoded = transformer.transform_column(column, raw)
+        matrix[:, j] = encoded
+    return matrix
+
+
+def sweep(model, transformer, record, grids):
+    """
+    Score every combination of the swept values with a single model call.
+
+    Parameters:
+    - model: Trained LightGBM classifier or Booster.
+    - transformer (FeatureTransformer): Fitted feature transformer.
+    - record (dict): Raw applicant (dataset values).
+    - grids (dict): Swept feature (key of SWEEP_FEATURES) -> 1-D array of values.
+
+    Returns:
+    - tuple: (probabilities shaped like the grid, {'grid_s': float, 'score_s': float, 'points': int})
+    """
+    # Import différé : la page Model lit SWEEP_FEATURES sans charger LightGBM
+    from .scoring import model_default_proba
+
+    start = time.perf_counter()
+    matrix = sweep_matrix(transformer, record, grids)
+    built = time.perf_counter()
+    probabilities = model_default_proba(model, matrix)
+    scored = time.perf_counter()
+
+    shape = tuple(len(values) for values in grids.values())
+    return probabilities.reshape(shape), {'grid_s': built - start, 'score_s': scored - built,
+                                          'points': len(matrix)}
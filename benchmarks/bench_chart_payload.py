@@ -0,0 +1,76 @@
+"""
+Payload size and build time of the Analyse_globale_des_prets charts.
+
+Compares the previous charts (px.histogram over every client, px.pie over a full value_counts)
+with the server-side aggregates (AgeHistogram, TargetCube). The payload is the Plotly JSON that
+Streamlit sends to the browser; its serialization time is included in the build time.
+
+Usage (from the repository root):
+    python benchmarks/bench_chart_payload.py --data data/application_train.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scripts.AgeHistogram import AgeHistogram  # noqa: E402
+from app.scripts.TargetCube import TargetCube  # noqa: E402
+from app.scripts.dataset_store import DEFAULT_CSV_PATH, load_columns  # noqa: E402
+
+
+def raw_charts(loan_data):
+    counts = loan_data['NAME_CONTRACT_TYPE'].value_counts()
+    figures = [px.pie(values=counts.values, names=counts.index)]
+    for target_value in (0, 1):
+        ages = -loan_data.loc[loan_data['TARGET'] == target_value, 'DAYS_BIRTH'] / 365
+        figures.append(px.histogram(x=ages, nbins=10))
+    return figures
+
+
+def build_aggregates(loan_data):
+    # Calculé une fois par version du jeu de données dans l'application
+    return TargetCube.build(loan_data, ['NAME_CONTRACT_TYPE']), AgeHistogram.build(loan_data)
+
+
+def aggregated_charts(aggregates):
+    cube, histogram = aggregates
+    counts = cube.stats('NAME_CONTRACT_TYPE')['count']
+    figures = [px.pie(values=counts.values, names=counts.index)]
+    figures += [histogram.plot(target_value, title='', color='green') for target_value in (0, 1)]
+    return figures
+
+
+def measure(build, data, repeat):
+    best, payload = float('inf'), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = sum(len(figure.to_json()) for figure in build(data))
+        best = min(best, time.perf_counter() - start)
+    return best, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=DEFAULT_CSV_PATH)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    loan_data = load_columns(['NAME_CONTRACT_TYPE', 'TARGET', 'DAYS_BIRTH'], csv_path=args.data)
+    print(f"{len(loan_data):,} rows")
+    raw_time, raw_payload = measure(raw_charts, loan_data, args.repeat)
+    start = time.perf_counter()
+    aggregates = build_aggregates(loan_data)
+    aggregation_time = time.perf_counter() - start
+    agg_time, agg_payload = measure(aggregated_charts, aggregates, args.repeat)
+    print(f"raw charts       : {raw_time * 1000:8.1f} ms, payload {raw_payload / 1024:10.1f} KiB")
+    print(f"aggregated charts: {agg_time * 1000:8.1f} ms, payload {agg_payload / 1024:10.1f} KiB"
+          f" (aggregates built once per dataset version in {aggregation_time * 1000:.1f} ms)")
+    print(f"payload x{raw_payload / agg_payload:.0f} smaller, build x{raw_time / agg_time:.1f} faster")
+
+
+if __name__ == '__main__':
+    main()
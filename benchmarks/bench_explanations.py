@@ -0,0 +1,51 @@
+"""
+Throughput of the TreeSHAP explanations (pred_contrib grouped by original feature).
+
+Compares explaining rows one call at a time with explaining them in batches.
+
+Usage (from the repository root):
+    python benchmarks/bench_explanations.py --rows 20000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scripts.explanations import explain  # noqa: E402
+from app.scripts.fast_inference import random_applicants  # noqa: E402
+from app.scripts.scoring import load_artifacts  # noqa: E402
+
+
+def explanations_per_second(model, features, column_names, batch_size):
+    start = time.perf_counter()
+    for begin in range(0, len(features), batch_size):
+        explain(model, features[begin:begin + batch_size], column_names, num_threads=1 if batch_size == 1 else None)
+    return len(features) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default='model')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--single-rows', type=int, default=1_000, help="Rows explained one call at a time")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    model, transformer = load_artifacts(args.model_dir)
+    features = transformer.transform(random_applicants(transformer, args.rows))
+    explain(model, features[:10], transformer.column_names)
+
+    single = explanations_per_second(model, features[:args.single_rows], transformer.column_names, 1)
+    print(f"{'one row per call':>22}: {single:12,.0f} explanations/s")
+    for batch_size in (100, 1_000, 10_000):
+        if batch_size > args.rows:
+            break
+        rate = explanations_per_second(model, features, transformer.column_names, batch_size)
+        print(f"{f'batches of {batch_size:,}':>22}: {rate:12,.0f} explanations/s (x{rate / single:.0f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Latency comparison of the pickled LGBMClassifier path and the native folded Booster path.
+
+Usage (from the repository root):
+    python benchmarks/bench_fast_inference.py --repeat 2000 --batch-size 10000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scripts.fast_inference import check_parity, load_fast_predictor, random_applicants  # noqa: E402
+from app.scripts.scoring import load_artifacts, predict_default_proba  # noqa: E402
+
+SAMPLE = {
+    'NAME_CONTRACT_TYPE': 'Cash loans', 'CODE_GENDER': 'F', 'FLAG_OWN_CAR': 'N', 'FLAG_OWN_REALTY': 'Y',
+    'NAME_INCOME_TYPE': 'Working', 'NAME_EDUCATION_TYPE': 'Higher education', 'DAYS_BIRTH': -30 * 365,
+    'AMT_INCOME_TOTAL': 50000, 'AMT_CREDIT': 100000, 'AMT_GOODS_PRICE': 100000,
+}
+
+
+def time_per_call(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default='model')
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    model, transformer = load_artifacts(args.model_dir)
+    fast = load_fast_predictor(args.model_dir)
+    batch = random_applicants(transformer, args.batch_size)
+
+    print("parity:", check_parity(args.model_dir))
+    rows = [
+        ('single row', lambda: predict_default_proba(model, transformer, SAMPLE, num_threads=1),
+         lambda: fast.predict_default_proba(SAMPLE), args.repeat, 1),
+        (f'batch of {args.batch_size}', lambda: predict_default_proba(model, transformer, batch),
+         lambda: fast.predict_default_proba(batch), max(1, args.repeat // 100), args.batch_size),
+    ]
+    for label, pickled, native, repeat, n_rows in rows:
+        before = time_per_call(pickled, repeat) / n_rows
+        after = time_per_call(native, repeat) / n_rows
+        print(f"{label:>18}: LGBMClassifier {before * 1e6:9.2f} us/row | Booster {after * 1e6:9.2f} us/row"
+              f" | x{before / after:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the per-row preprocessing of the Model page.
+
+Compares the former pandas-based preprocess_input (one-row DataFrame, per-request category
+codes and means, scaler.transform) with FeatureTransformer.transform on a dict.
+
+Usage (from the repository root):
+    python benchmarks/bench_preprocess.py --repeat 2000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scripts.scoring import load_transformer  # noqa: E402
+
+SAMPLE = {
+    'NAME_CONTRACT_TYPE': 'Cash loans', 'CODE_GENDER': 'F', 'FLAG_OWN_CAR': 'N', 'FLAG_OWN_REALTY': 'Y',
+    'NAME_INCOME_TYPE': 'Working', 'NAME_EDUCATION_TYPE': 'Higher education', 'DAYS_BIRTH': -30 * 365,
+    'AMT_INCOME_TOTAL': 50000, 'AMT_CREDIT': 100000, 'AMT_GOODS_PRICE': 100000,
+}
+
+
+def legacy_preprocess_input(data, scaler, column_names):
+    # Copie de l'ancienne implémentation de pages/Model.py (tests de dtype adaptés aux chaînes pandas >= 3)
+    for col in column_names:
+        if col not in data.columns:
+            data[col] = np.nan
+    data_encode = data.copy()
+    categorical_cols = ['NAME_CONTRACT_TYPE', 'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY',
+                        'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE']
+    for col in categorical_cols:
+        if pd.api.types.is_string_dtype(data_encode[col].dtype):
+            data_encode[col] = data_encode[col].astype('category').cat.codes
+    data_encode = data_encode.fillna(data_encode.mean(numeric_only=True))
+    return scaler.transform(data_encode[column_names])
+
+
+def time_per_call(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default='model')
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    import joblib
+    scaler = joblib.load(os.path.join(args.model_dir, 'scaler.pkl'))
+    with open(os.path.join(args.model_dir, 'column_names.pkl'), 'rb') as f:
+        column_names = joblib.load(f)
+    transformer = load_transformer(args.model_dir)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        before = time_per_call(
+            lambda: legacy_preprocess_input(pd.DataFrame({k: [v] for k, v in SAMPLE.items()}), scaler, column_names),
+            args.repeat)
+    after = time_per_call(lambda: transformer.transform(SAMPLE), args.repeat)
+
+    print(f"pandas preprocess_input      : {before * 1e6:10.1f} us/row")
+    print(f"FeatureTransformer.transform : {after * 1e6:10.1f} us/row")
+    print(f"speed-up                     : {before / after:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
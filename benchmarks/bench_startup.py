@@ -0,0 +1,75 @@
+"""
+Cold-start timing of the Streamlit pages.
+
+Each page runs in a fresh Python process with Streamlit's AppTest, twice: the first run pays
+for the imports and the cache loads (cold start), the second one shows the cost of a rerun.
+The import and render times recorded by page_timer are reported along with them.
+
+Usage (from the repository root, with data/application_train.csv and model/ present):
+    python benchmarks/bench_startup.py --output startup.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+
+
+def run_page(page_path, timeout):
+    # Exécuté dans le processus enfant : les imports de la page y sont à froid
+    sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest
+    from scripts.streamlit_cache import timing_report
+
+    app = AppTest.from_file(page_path, default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    app.run()
+    warm = time.perf_counter() - start
+
+    name = os.path.splitext(os.path.basename(page_path))[0]
+    recorded = next((timings for timings in timing_report() if timings['page'] == name), {})
+    return {'page': name, 'cold_run_s': round(cold, 3), 'warm_run_s': round(warm, 3),
+            'cold_import_s': round(recorded.get('cold_import_s', float('nan')), 3),
+            'first_render_s': round(recorded.get('first_render_s', float('nan')), 3),
+            'errors': [str(element.value) for element in app.exception]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cwd', default=ROOT, help="Directory holding data/ and model/")
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    parser.add_argument('--page', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.page:
+        print(json.dumps(run_page(args.page, args.timeout)))
+        return
+
+    pages = [os.path.join(APP_DIR, 'home.py')] + sorted(glob.glob(os.path.join(APP_DIR, 'pages', '*.py')))
+    results = []
+    for page in pages:
+        output = subprocess.run([sys.executable, '-W', 'ignore', os.path.abspath(__file__), '--page', page,
+                                 '--timeout', str(args.timeout)],
+                                cwd=args.cwd, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{result['page']:<32} cold {result['cold_run_s']:7.3f}s (imports {result['cold_import_s']:.3f}s, "
+              f"render {result['first_render_s']:.3f}s) | rerun {result['warm_run_s']:.3f}s"
+              + (f" | errors: {result['errors']}" if result['errors'] else ''))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': time.time(), 'pages': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
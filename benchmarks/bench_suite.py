@@ -0,0 +1,352 @@
+"""
+Benchmark suite of the data loading, analytics, training and scoring hot paths.
+
+Runs on a synthetic application_train.csv (benchmarks/synthetic_data.py, generated once per
+row count in the work directory). Every case runs in a fresh Python process, so its peak
+resident memory is its own and the imports are cold:
+
+    load_csv_cold            load_csv with the columnar cache rebuilt from the CSV
+    load_csv_warm            load_csv from the existing cache
+    borrower_analyzer        BorrowerCharacteristicsAnalyzer methods over the analysed columns
+    loan_analyzer            LoanApprovalAnalyzer charts over the analysed columns
+    segment_index            SegmentIndex build and filtered three-column default-rate queries
+    preprocess_data          my_credit_risk_model.preprocess_data on the full dataset
+    train_model              out-of-core training pipeline (my_credit_risk_model.train_model)
+    model_preprocess_input   pages/Model.preprocess_input on form values, per call
+    predict_single           one-row default probability, per call
+    predict_batch            default probability of the dataset rows by batches
+
+Every run is appended to a JSON history (time, peak RSS and extra metrics per case). With a
+stored baseline, cases slower or heavier than the tolerance are reported as regressions and
+the exit status is 1.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py --rows 1000000 --save-baseline
+    python benchmarks/bench_suite.py --rows 1000000
+    python benchmarks/bench_suite.py --rows 10000000 --cases load_csv_cold train_model --baseline none
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_HISTORY = os.path.join(BENCH_DIR, 'history.json')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Valeurs du formulaire de la page Model
+FORM_SAMPLE = {
+    'NAME_CONTRACT_TYPE': 'Prêts personnels', 'CODE_GENDER': 'Femme', 'FLAG_OWN_CAR': 'Non',
+    'FLAG_OWN_REALTY': 'Oui', 'NAME_INCOME_TYPE': 'Travailleur', 'NAME_EDUCATION_TYPE': 'Enseignement supérieur',
+    'DAYS_BIRTH': -30 * 365, 'DAYS_EMPLOYED': -5 * 365, 'CNT_CHILDREN': 0, 'CNT_FAM_MEMBERS': 2,
+    'AMT_INCOME_TOTAL': 50000, 'AMT_CREDIT': 100000, 'AMT_ANNUITY': 10000, 'AMT_GOODS_PRICE': 100000,
+    'EXT_SOURCE_1': None, 'EXT_SOURCE_2': 0.5, 'EXT_SOURCE_3': None,
+}
+
+
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS et en kilo-octets sous Linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return time.perf_counter() - start
+
+
+def _analysed_columns(data):
+    from app.scripts.LoanApprovalAnalyzer import LoanApprovalAnalyzer
+    return [column for column in LoanApprovalAnalyzer(data).columns_to_analyze if column in data.columns]
+
+
+# Cas exécutés dans le processus enfant ; chacun renvoie au moins la durée mesurée en secondes
+
+def case_load_csv_cold(args):
+    from loan_analysis_functions import load_csv
+    from app.scripts.dataset_store import cache_paths
+    shutil.rmtree(os.path.dirname(cache_paths(args.data)[0]), ignore_errors=True)
+    seconds = _timed(lambda: load_csv(args.data))
+    return {'seconds': seconds}
+
+
+def case_load_csv_warm(args):
+    from loan_analysis_functions import load_csv
+    data = None
+
+    def load():
+        nonlocal data
+        data = load_csv(args.data)
+    seconds = _timed(load)
+    return {'seconds': seconds, 'columns': int(data.shape[1])}
+
+
+def case_borrower_analyzer(args):
+    from loan_analysis_functions import load_csv
+    from app.scripts.BorrowerCharacteristicsAnalyzer import BorrowerCharacteristicsAnalyzer
+    from app.scripts.dataset_schema import is_categorical_column
+    data = load_csv(args.data)
+    columns = _analysed_columns(data)
+
+    def run():
+        analyzer = BorrowerCharacteristicsAnalyzer(data)
+        analyzer.identify_best_borrower_characteristics(columns)
+        analyzer.identify_worst_borrower_characteristics(columns)
+        for column in columns:
+            analyzer.calculate_default_rate(column)
+            if is_categorical_column(data[column]):
+                analyzer.plot_default_rates(column)
+    return {'seconds': _timed(run, args.repeat) / args.repeat, 'columns': len(columns)}
+
+
+def case_loan_analyzer(args):
+    from loan_analysis_functions import load_csv
+    from app.scripts.LoanApprovalAnalyzer import LoanApprovalAnalyzer
+    data = load_csv(args.data)
+    columns = _analysed_columns(data)
+
+    def run():
+        analyzer = LoanApprovalAnalyzer(data)
+        for column in columns:
+            analyzer.plot_loan_approval_stats(column)
+        analyzer.plot_loan_repayment_pie()
+    return {'seconds': _timed(run, args.repeat) / args.repeat, 'columns': len(columns)}
+
+
+def case_segment_index(args):
+    from loan_analysis_functions import load_csv
+    from app.scripts.SegmentIndex import SegmentIndex
+    data = load_csv(args.data)
+    columns = _analysed_columns(data)
+    index = None
+
+    def build():
+        nonlocal index
+        index = SegmentIndex.build(data, columns)
+    build_seconds = _timed(build)
+    by = ['NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'REGION_RATING_CLIENT']
+    filters = {'CODE_GENDER': ['F'], 'FLAG_OWN_CAR': ['N']}
+    query_seconds = _timed(lambda: index.query(by, filters), args.repeat) / args.repeat
+    return {'seconds': build_seconds + query_seconds, 'build_s': build_seconds, 'query_ms': query_seconds * 1000}
+
+
+def case_preprocess_data(args):
+    from loan_analysis_functions import load_csv
+    from app.scripts.my_credit_risk_model import preprocess_data, used_features
+    data = load_csv(args.data, used_features)
+    seconds = _timed(lambda: preprocess_data(data))
+    return {'seconds': seconds, 'rows_per_s': len(data) / seconds}
+
+
+def case_train_model(args):
+    from app.scripts.my_credit_risk_model import train_model
+    result = {}
+
+    def train():
+        # Sans cache de features : chaque exécution mesure la lecture complète du CSV
+        result.update(train_model(args.data, os.path.join(args.work_dir, 'model'), num_boost_round=args.rounds,
+                                  feature_cache=False, log=lambda message: None))
+    seconds = _timed(train)
+    stages = {stage['stage']: stage['seconds'] for stage in result['stages']}
+    return {'seconds': seconds, 'auc_test': result['auc_test'], 'num_boost_round': args.rounds, 'stages': stages}
+
+
+def case_model_preprocess_input(args):
+    import importlib.util
+    sys.path.insert(0, APP_DIR)
+    spec = importlib.util.spec_from_file_location('model_page', os.path.join(APP_DIR, 'pages', 'Model.py'))
+    page = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(page)
+    page.MODEL_DIR = os.path.join(args.work_dir, 'model')
+    _, transformer = page.get_artifacts(page.MODEL_DIR)
+    page.preprocess_input(FORM_SAMPLE, transformer)
+    repeat = args.repeat * 1000
+    seconds = _timed(lambda: page.preprocess_input(FORM_SAMPLE, transformer), repeat)
+    return {'seconds': seconds, 'per_call_us': seconds / repeat * 1e6}
+
+
+def _model_and_rows(args, n_rows):
+    import pandas as pd
+    from app.scripts.scoring import load_artifacts
+    model, transformer = load_artifacts(os.path.join(args.work_dir, 'model'))
+    rows = pd.read_csv(args.data, usecols=transformer.raw_features, nrows=n_rows)
+    return model, transformer, rows
+
+
+def case_predict_single(args):
+    from app.scripts.scoring import predict_default_proba
+    model, transformer, rows = _model_and_rows(args, 1000)
+    records = rows.to_dict('records')
+    predict_default_proba(model, transformer, records[0])
+    seconds = _timed(lambda: [predict_default_proba(model, transformer, record) for record in records], args.repeat)
+    calls = len(records) * args.repeat
+    return {'seconds': seconds, 'per_call_us': seconds / calls * 1e6}
+
+
+def case_predict_batch(args):
+    from app.scripts.scoring import predict_default_proba
+    model, transformer, rows = _model_and_rows(args, None)
+    batch_size = 100_000
+
+    def predict():
+        for start in range(0, len(rows), batch_size):
+            predict_default_proba(model, transformer, rows.iloc[start:start + batch_size])
+    seconds = _timed(predict)
+    return {'seconds': seconds, 'rows_per_s': len(rows) / seconds}
+
+
+CASES = {
+    'load_csv_cold': case_load_csv_cold,
+    'load_csv_warm': case_load_csv_warm,
+    'borrower_analyzer': case_borrower_analyzer,
+    'loan_analyzer': case_loan_analyzer,
+    'segment_index': case_segment_index,
+    'preprocess_data': case_preprocess_data,
+    'train_model': case_train_model,
+    'model_preprocess_input': case_model_preprocess_input,
+    'predict_single': case_predict_single,
+    'predict_batch': case_predict_batch,
+}
+# Les cas de prédiction utilisent le modèle entraîné par train_model dans le dossier de travail
+MODEL_CASES = {'model_preprocess_input', 'predict_single', 'predict_batch'}
+
+
+def run_case(name, args):
+    # Exécuté dans le processus enfant
+    import warnings
+    warnings.simplefilter('ignore')
+    sys.path.insert(0, ROOT)
+    result = CASES[name](args)
+    result['peak_rss_mb'] = peak_memory_mb()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(run, baseline, time_tolerance, memory_tolerance):
+    """
+    Compare a run to the baseline run.
+
+    Returns:
+    - list: (case, metric, baseline value, current value) of every case slower or heavier than
+      the baseline by more than the tolerance (relative).
+    """
+    regressions = []
+    for name, result in run['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for metric, tolerance in (('seconds', time_tolerance), ('peak_rss_mb', memory_tolerance)):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append((name, metric, reference[metric], result[metric]))
+    return regressions
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path, value):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows of the synthetic dataset")
+    parser.add_argument('--data', default=None, help="Use this CSV instead of the synthetic dataset")
+    parser.add_argument('--work-dir', default=os.path.join(BENCH_DIR, '.work'),
+                        help="Directory of the synthetic data and of the trained model")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions of the short cases")
+    parser.add_argument('--rounds', type=int, default=100, help="Boosting rounds of train_model")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON file the run is appended to")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline run ('none' to skip the check)")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--time-tolerance', type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument('--memory-tolerance', type=float, default=0.20, help="Allowed relative peak RSS increase")
+    parser.add_argument('--case', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args)))
+        return
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    synthetic = args.data is None
+    if synthetic:
+        args.data = os.path.join(args.work_dir, f'application_train_{args.rows}.csv')
+        if not os.path.exists(args.data):
+            sys.path.insert(0, BENCH_DIR)
+            from synthetic_data import write_dataset
+            print(f"Generating {args.rows} synthetic rows in {args.data}...")
+            write_dataset(args.data, args.rows)
+    args.data = os.path.abspath(args.data)
+    args.work_dir = os.path.abspath(args.work_dir)
+
+    if (MODEL_CASES & set(args.cases) and 'train_model' not in args.cases
+            and not os.path.exists(os.path.join(args.work_dir, 'model', 'lgb_model.pkl'))):
+        args.cases = ['train_model'] + args.cases
+
+    run = {'timestamp': time.time(), 'commit': git_commit(), 'rows': args.rows if synthetic else None,
+           'data': args.data, 'python': platform.python_version(), 'machine': platform.machine(),
+           'cpu_count': os.cpu_count(), 'results': {}}
+    for name in [name for name in CASES if name in args.cases]:
+        command = [sys.executable, os.path.abspath(__file__), '--case', name, '--data', args.data,
+                   '--work-dir', args.work_dir, '--repeat', str(args.repeat), '--rounds', str(args.rounds)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode:
+            sys.exit(f"{name} failed:\n{completed.stderr[-2000:]}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        run['results'][name] = result
+        extra = (f"{result['per_call_us']:10.1f} us/call" if 'per_call_us' in result
+                 else f"{result['rows_per_s']:10,.0f} rows/s" if 'rows_per_s' in result else '')
+        print(f"{name:<24}{result['seconds']:10.3f}s{result['peak_rss_mb']:10.0f} MB  {extra}")
+
+    history = _read_json(args.history, [])
+    history.append(run)
+    _write_json(args.history, history)
+
+    regressions = []
+    baseline_path = DEFAULT_BASELINE if args.baseline == 'none' else args.baseline
+    baseline = None if args.baseline == 'none' else _read_json(baseline_path, None)
+    if baseline is not None:
+        if baseline.get('data') != run['data'] or baseline.get('cpu_count') != run['cpu_count']:
+            print(f"Baseline ({baseline.get('data')}, {baseline.get('cpu_count')} CPUs) was measured on other "
+                  "data or hardware: comparison skipped.")
+        else:
+            regressions = find_regressions(run, baseline, args.time_tolerance, args.memory_tolerance)
+            for name, metric, before, after in regressions:
+                print(f"REGRESSION {name}: {metric} {before:.3f} -> {after:.3f} (x{after / before:.2f})")
+            if not regressions:
+                print(f"No regression against the baseline of commit {baseline.get('commit')}.")
+    if args.save_baseline:
+        _write_json(baseline_path, run)
+        print(f"Baseline saved to {baseline_path}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
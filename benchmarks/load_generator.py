@@ -0,0 +1,107 @@
+"""
+Load generator for the prediction server.
+
+Opens --concurrency keep-alive connections and sends single-applicant /predict requests
+for --duration seconds, then prints client-side latency percentiles and throughput next to
+the server /metrics counters.
+
+Usage (server started with python -m app.scripts.prediction_server):
+    python benchmarks/load_generator.py --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+INCOME_TYPES = ['Working', 'Commercial associate', 'Pensioner', 'State servant']
+EDUCATION_TYPES = ['Secondary / secondary special', 'Higher education', 'Incomplete higher']
+
+
+def random_applicant(rng):
+    credit = rng.uniform(45_000, 2_000_000)
+    return {
+        'NAME_CONTRACT_TYPE': rng.choice(['Cash loans', 'Revolving loans']),
+        'CODE_GENDER': rng.choice(['F', 'M']),
+        'FLAG_OWN_CAR': rng.choice(['Y', 'N']),
+        'FLAG_OWN_REALTY': rng.choice(['Y', 'N']),
+        'CNT_CHILDREN': rng.randint(0, 3),
+        'AMT_INCOME_TOTAL': rng.uniform(25_000, 500_000),
+        'AMT_CREDIT': credit,
+        'AMT_GOODS_PRICE': credit * 0.9,
+        'NAME_INCOME_TYPE': rng.choice(INCOME_TYPES),
+        'NAME_EDUCATION_TYPE': rng.choice(EDUCATION_TYPES),
+        'DAYS_BIRTH': -rng.randint(20 * 365, 69 * 365),
+        'DAYS_EMPLOYED': -rng.randint(0, 40 * 365),
+        'CNT_FAM_MEMBERS': rng.randint(1, 5),
+        'EXT_SOURCE_2': rng.random(),
+    }
+
+
+async def _request(reader, writer, host, method, path, body=b''):
+    writer.write((f'{method} {path} HTTP/1.1\r\nHost: {host}\r\n'
+                  f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n').encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    payload = await reader.readexactly(length)
+    return int(status_line.split()[1]), json.loads(payload)
+
+
+async def _client(host, port, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            body = json.dumps(random_applicant(rng)).encode()
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, 'POST', '/predict', body)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, duration):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(host, port, deadline, latencies, errors, seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_metrics = await _request(reader, writer, host, 'GET', '/metrics')
+    writer.close()
+
+    latencies_ms = np.asarray(latencies) * 1000
+    print(f"requests      : {len(latencies)} ok, {len(errors)} errors in {elapsed:.1f}s")
+    print(f"throughput    : {len(latencies) / elapsed:,.0f} req/s")
+    if len(latencies_ms):
+        p50, p99 = np.percentile(latencies_ms, [50, 99])
+        print(f"latency (cli) : p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print("server        :", json.dumps(server_metrics))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.concurrency, args.duration))
+
+
+if __name__ == '__main__':
+    main()
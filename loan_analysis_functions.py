@@ -1,10 +1,16 @@
 import pandas as pd
 import plotly.express as px
 
-def load_csv(csv_filename):
-    """Load a CSV file and handle exceptions."""
+from app.scripts.TargetCube import TargetCube
+from app.scripts.dataset_schema import is_categorical_column
+from app.scripts.dataset_store import load_columns
+from app.scripts.tracing import traced
+
+@traced
+def load_csv(csv_filename, columns=None):
+    """Load a CSV file (through the shared columnar cache) and handle exceptions."""
     try:
-        return pd.read_csv(csv_filename)
+        return load_columns(columns, csv_path=csv_filename)
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_filename}' not found.")
         return None
@@ -12,38 +18,47 @@ def load_csv(csv_filename):
         print(f"Error occurred while loading CSV file: {e}")
         return None
 
-def calculate_repayment_rate(data, column, target_column='TARGET'):
+def _target_cube(cube, target_column):
+    """Return the given aggregate cube, or an empty one filled column by column on demand."""
+    if cube is None or cube.target_column != target_column:
+        return TargetCube(target_column)
+    return cube
+
+def calculate_repayment_rate(data, column, target_column='TARGET', cube=None):
     """Calculate repayment rate (percentage of non-defaulters) for a specific column."""
-    repayment_rates = data.groupby(column)[target_column].mean() * 100
+    repayment_rates = _target_cube(cube, target_column).mean(column, data) * 100
     return repayment_rates
 
-def generate_observations(data, columns_to_analyze, target_column='TARGET'):
+@traced
+def generate_observations(data, columns_to_analyze, target_column='TARGET', cube=None):
     """Generate dynamic observations based on specified columns."""
     observations = []
+    cube = _target_cube(cube, target_column)
 
     for column in columns_to_analyze:
         if column not in data.columns:
             print(f"Column '{column}' not found in the dataset. Skipping...")
             continue
         
-        if data[column].dtype == 'object':
+        if is_categorical_column(data[column]):
             # For categorical columns
-            repayment_rates = calculate_repayment_rate(data, column, target_column)
+            repayment_rates = calculate_repayment_rate(data, column, target_column, cube)
             top_category = repayment_rates.idxmax()
             top_repayment_rate = repayment_rates.max()
             observations.append(f"'{top_category}' for '{column}' has the highest repayment rate ({top_repayment_rate:.1f}%).")
 
     return observations
 
-def plot_loan_approval_stats(data, column, target_column='TARGET', top_n=10):
+@traced
+def plot_loan_approval_stats(data, column, target_column='TARGET', top_n=10, cube=None):
     """Plot loan approval statistics for a specified column using Plotly Express."""
     if column not in data.columns:
         print(f"Column '{column}' not found in the dataset.")
         return
     
     try:
-        # Group by the specified column and calculate aggregate statistics
-        grouped_data = data.groupby(column)[target_column].agg(['sum', 'count', 'mean']).reset_index()
+        # Read the aggregate statistics of the column from the cube
+        grouped_data = _target_cube(cube, target_column).stats(column, data).reset_index()
         grouped_data.columns = [column, 'Defaulters', 'Total', 'Defaulter Rate']
         grouped_data.sort_values(by='Total', ascending=False, inplace=True)
         
@@ -58,36 +73,40 @@ def plot_loan_approval_stats(data, column, target_column='TARGET', top_n=10):
     except Exception as e:
         print(f"Error occurred for column '{column}': {e}")
 
-def identify_best_borrower_characteristics(data, columns_to_analyze, target_column='TARGET'):
+@traced
+def identify_best_borrower_characteristics(data, columns_to_analyze, target_column='TARGET', cube=None):
     """Identify characteristics associated with higher repayment rates (non-defaulters)."""
     best_characteristics = {}
+    cube = _target_cube(cube, target_column)
     
     for column in columns_to_analyze:
         if column not in data.columns:
             print(f"Column '{column}' not found in the dataset. Skipping...")
             continue
         
-        if data[column].dtype == 'object':
+        if is_categorical_column(data[column]):
             # For categorical columns
-            repayment_rates = calculate_repayment_rate(data, column, target_column)
+            repayment_rates = calculate_repayment_rate(data, column, target_column, cube)
             best_category = repayment_rates.idxmax()
             best_repayment_rate = repayment_rates.max()
             best_characteristics[column] = {'best_category': best_category, 'repayment_rate': best_repayment_rate}
     
     return best_characteristics
 
-def identify_worst_borrower_characteristics(data, columns_to_analyze, target_column='TARGET'):
+@traced
+def identify_worst_borrower_characteristics(data, columns_to_analyze, target_column='TARGET', cube=None):
     """Identify characteristics associated with lower repayment rates (higher default rates)."""
     worst_characteristics = {}
+    cube = _target_cube(cube, target_column)
     
     for column in columns_to_analyze:
         if column not in data.columns:
             print(f"Column '{column}' not found in the dataset. Skipping...")
             continue
         
-        if data[column].dtype == 'object':
+        if is_categorical_column(data[column]):
             # For categorical columns
-            repayment_rates = calculate_repayment_rate(data, column, target_column)
+            repayment_rates = calculate_repayment_rate(data, column, target_column, cube)
             worst_category = repayment_rates.idxmin()  # Find category with the lowest repayment rate
             worst_repayment_rate = repayment_rates.min()
             worst_characteristics[column] = {'worst_category': worst_category, 'repayment_rate': worst_repayment_rate}